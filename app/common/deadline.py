@@ -0,0 +1,78 @@
+import math, time
+from typing import Any, Optional
+from app.core.exceptions import DeadlineExceededError
+
+DEFAULT_SAFETY_MARGIN = 1.0  # Seconds kept back so the handler can return before Lambda kills it
+
+class Deadline:
+    """
+    Absolute point in time by which a piece of work must be done, derived from the Lambda remaining time.
+    Each stage asks it for a per-call timeout sized to what is left instead of using fixed (or no) timeouts.
+    """
+    def __init__(
+        self,
+        expires_at: float,
+        clock=time.monotonic
+    ):
+        self.expires_at = expires_at
+        self._clock = clock
+
+    @classmethod
+    def from_lambda_context(
+        cls,
+        context: Any,
+        safety_margin: float = DEFAULT_SAFETY_MARGIN
+    ) -> "Deadline":
+        """Build a deadline from context.get_remaining_time_in_millis(), or an unbounded one outside Lambda."""
+        get_remaining_time = getattr(context, "get_remaining_time_in_millis", None)
+        remaining_ms = get_remaining_time() if callable(get_remaining_time) else None
+        if not isinstance(remaining_ms, (int, float)) or isinstance(remaining_ms, bool):
+            return cls.unbounded()
+        return cls.after(remaining_ms / 1000 - safety_margin)
+
+    @classmethod
+    def after(cls, seconds: float) -> "Deadline":
+        return cls(time.monotonic() + seconds)
+
+    @classmethod
+    def unbounded(cls) -> "Deadline":
+        return cls(math.inf)
+
+    def remaining(self) -> float:
+        return self.expires_at - self._clock()
+
+    def expired(self, reserve: float = 0) -> bool:
+        """True when less than `reserve` seconds are left."""
+        return self.remaining() <= reserve
+
+    def check(
+        self,
+        operation: str,
+        reserve: float = 0
+    ) -> None:
+        """Raise DeadlineExceededError if `operation` cannot start with at least `reserve` seconds left."""
+        if self.expired(reserve):
+            raise DeadlineExceededError(f"Not enough time left to run {operation} ({self.remaining():.2f}s remaining).")
+
+    def timeout(
+        self,
+        cap: Optional[float] = None,
+        reserve: float = 0,
+        minimum: Optional[float] = None
+    ) -> Optional[float]:
+        """
+        Timeout for the next call: what is left (minus `reserve`), never above `cap`.
+        Raises DeadlineExceededError when nothing is left, unless a `minimum` timeout is granted anyway.
+        """
+        available = self.remaining() - reserve
+        if available <= 0 and minimum is None:
+            raise DeadlineExceededError(f"Deadline exceeded ({self.remaining():.2f}s remaining).")
+
+        if math.isinf(available):
+            return cap
+        timeout = available if cap is None else min(cap, available)
+        return max(minimum, timeout) if minimum is not None else timeout
+
+    def with_reserve(self, seconds: float) -> "Deadline":
+        """A deadline `seconds` earlier, keeping that time back for a later stage."""
+        return Deadline(self.expires_at - seconds, self._clock)
@@ -0,0 +1,48 @@
+import json
+from typing import Any, Union
+
+try:
+    import orjson
+except ImportError:  # orjson is optional, the stdlib decoder gives the same results more slowly
+    orjson = None
+
+BACKEND = "orjson" if orjson is not None else "json"
+DECODED_BODY_ATTRIBUTE = "_json_codec_body"
+_MISSING = object()
+
+def loads(data: Union[bytes, bytearray, str]) -> Any:
+    """Decode a JSON document with the fastest available backend."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+def decode_response(
+    response: Any,
+    path: str = None,
+    default: Any = _MISSING
+) -> Any:
+    """
+    Decode the JSON body of a requests response, at most once per response: the whole document is parsed and kept on
+    the response, so reading several fields costs a single parse. A dotted `path` ("mobile_bucket.items") only selects
+    what is returned from that document; it neither speeds up the parse nor frees the rest while the response lives.
+    """
+    body = vars(response).get(DECODED_BODY_ATTRIBUTE, _MISSING)
+    if body is _MISSING:
+        body = loads(response.content)
+        setattr(response, DECODED_BODY_ATTRIBUTE, body)
+    return extract(body, path, default) if path else body
+
+def extract(
+    document: Any,
+    path: str,
+    default: Any = _MISSING
+) -> Any:
+    """Return the subtree of a decoded document at a dotted path, or `default` (KeyError without one) if it is missing."""
+    node = document
+    for key in path.split("."):
+        if not isinstance(node, dict) or key not in node:
+            if default is _MISSING:
+                raise KeyError(path)
+            return default
+        node = node[key]
+    return node
@@ -1,12 +1,115 @@
-import logging
+import json, logging, os, re
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional
+
+DEFAULT_LEVEL = "INFO"
+DEFAULT_MAX_FIELD_LENGTH = 1024
+DEFAULT_SAMPLE_ITEMS = 3
+REDACTED = "***"
+
+# Keys whose values are never written, and the same secrets when they appear inside a message
+SECRET_KEY_PATTERN = re.compile(r"token|cookie|password|secret|authorization|api_key", re.IGNORECASE)
+SECRET_VALUE_PATTERN = re.compile(
+    r"((?:access_token|refresh_token|cookie|password|secret|api_key|authorization)['\"]?\s*[:=]\s*['\"]?)[^'\",\s}&)]+",
+    re.IGNORECASE
+)
+TELEGRAM_BOT_TOKEN_PATTERN = re.compile(r"\d{6,}:[\w-]{30,}")
+
+def redact(text: str) -> str:
+    """Mask credentials and Telegram bot tokens in a formatted message."""
+    return TELEGRAM_BOT_TOKEN_PATTERN.sub(REDACTED, SECRET_VALUE_PATTERN.sub(rf"\1{REDACTED}", text))
+
+def truncate(
+    text: str,
+    max_length: int
+) -> str:
+    if len(text) <= max_length:
+        return text
+    return f"{text[:max_length]}... ({len(text) - max_length} more chars)"
+
+class PayloadSample:
+    """
+    Defers rendering an API payload until a handler actually emits the record, and then renders only its first items.
+    Pass it as a logging argument: LOGGER.debug("Raw API response: %s", PayloadSample(page)).
+    """
+    __slots__ = ("payload", "max_items")
+
+    def __init__(
+        self,
+        payload: Any,
+        max_items: int = DEFAULT_SAMPLE_ITEMS
+    ):
+        self.payload = payload
+        self.max_items = max_items
+
+    def __str__(self) -> str:
+        if isinstance(self.payload, (list, tuple)) and len(self.payload) > self.max_items:
+            return f"{list(self.payload[:self.max_items])} ... ({len(self.payload) - self.max_items} more items)"
+        return str(self.payload)
+
+class JsonFormatter(logging.Formatter):
+    """One JSON document per record, with the message formatted, redacted and truncated only when it is emitted."""
+    def __init__(
+        self,
+        max_field_length: int = DEFAULT_MAX_FIELD_LENGTH
+    ):
+        super().__init__()
+        self.max_field_length = max_field_length
+
+    def format(self, record: logging.LogRecord) -> str:
+        document: Dict[str, Any] = {
+            "timestamp": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": self._clean(record.getMessage()),
+        }
+        for key, value in (getattr(record, "fields", None) or {}).items():
+            document[key] = REDACTED if SECRET_KEY_PATTERN.search(key) else self._clean_value(value)
+        if record.exc_info:
+            document["exception"] = self._clean(self.formatException(record.exc_info))
+        return json.dumps(document, default=str, ensure_ascii=False)
+
+    def _clean(self, text: str) -> str:
+        return truncate(redact(text), self.max_field_length)
+
+    def _clean_value(self, value: Any) -> Any:
+        if value is None or isinstance(value, (bool, int, float)):
+            return value
+        return self._clean(str(value))
+
+def parse_module_levels(spec: Optional[str]) -> Dict[str, str]:
+    """Parse LOG_LEVELS, a comma separated list of logger=LEVEL pairs such as "app.core.database_handler=DEBUG"."""
+    levels = {}
+    for entry in (spec or "").split(","):
+        name, _, level = entry.partition("=")
+        if name.strip() and level.strip():
+            levels[name.strip()] = level.strip().upper()
+    return levels
+
+def configure_logging() -> logging.Logger:
+    """
+    Install the JSON handler on the root logger, at LOG_LEVEL, with per-module overrides from LOG_LEVELS.
+    Safe to call again, e.g. after the environment changed: the handler is replaced, not added twice.
+    """
+    root = logging.getLogger()
+    root.setLevel(os.getenv("LOG_LEVEL", DEFAULT_LEVEL).upper())
+    # In Lambda the runtime's own root handler would write every record a second time, in plain text
+    in_lambda = bool(os.getenv("AWS_LAMBDA_FUNCTION_NAME"))
+    for handler in [handler for handler in root.handlers if in_lambda or getattr(handler, "_json_logging", False)]:
+        root.removeHandler(handler)
 
-def create_logger():
-    logger = logging.getLogger()
-    logger.setLevel(logging.INFO)
-    formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
     stream_handler = logging.StreamHandler()
-    stream_handler.setFormatter(formatter)
-    logger.addHandler(stream_handler)
-    return logger
+    stream_handler.setFormatter(JsonFormatter(int(os.getenv("LOG_MAX_FIELD_LENGTH", DEFAULT_MAX_FIELD_LENGTH))))
+    stream_handler._json_logging = True
+    root.addHandler(stream_handler)
+
+    for name, level in parse_module_levels(os.getenv("LOG_LEVELS")).items():
+        logging.getLogger(name).setLevel(level)
+    return root
+
+def get_logger(name: str) -> logging.Logger:
+    """Module logger, named after the module so LOG_LEVELS can target it."""
+    return logging.getLogger(name)
 
-LOGGER = create_logger()
\ No newline at end of file
+configure_logging()
+LOGGER = get_logger("app")
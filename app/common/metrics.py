@@ -0,0 +1,178 @@
+import json, os, sys, threading, time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+DEFAULT_NAMESPACE = "TooGoodNotify"
+MAX_METRICS_PER_DOCUMENT = 100  # EMF limits per log line
+MAX_VALUES_PER_METRIC = 100
+
+def stdout_sink(line: str) -> None:
+    """Lambda forwards stdout to CloudWatch Logs, which extracts EMF lines into metrics without any API call."""
+    sys.stdout.write(line + "\n")
+    sys.stdout.flush()
+
+class Metrics:
+    """
+    Per-invocation stage timings, call counts, byte sizes and dimensioned distributions, written at the end of the invocation as CloudWatch
+    Embedded Metric Format lines. Recording is an append under a lock, so stages can be timed from worker threads.
+    """
+    def __init__(
+        self,
+        namespace: Optional[str] = None,
+        sink: Callable[[str], None] = stdout_sink,
+        enabled: Optional[bool] = None,
+        clock: Callable[[], float] = time.perf_counter
+    ):
+        self.namespace = namespace or os.getenv("METRICS_NAMESPACE", DEFAULT_NAMESPACE)
+        self.sink = sink
+        self.enabled = os.getenv("METRICS_ENABLED", "true").lower() == "true" if enabled is None else enabled
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._latencies: Dict[str, List[float]] = {}
+        self._counts: Dict[str, float] = {}
+        self._bytes: Dict[str, float] = {}
+        self._observations: Dict[Tuple[Tuple[Tuple[str, str], ...], Tuple[Tuple[str, Any], ...]], Dict[str, Tuple[str, List[float]]]] = {}
+
+    @contextmanager
+    def timer(self, stage: str) -> Iterator[None]:
+        """Time the enclosed block as one call of `stage`; a block that raises also counts as a `stage` error."""
+        if not self.enabled:
+            yield
+            return
+        start = self._clock()
+        try:
+            yield
+
+        except BaseException:
+            self.increment(f"{stage}Errors")
+            raise
+
+        finally:
+            self.record_latency(stage, (self._clock() - start) * 1000)
+
+    def record_latency(
+        self,
+        stage: str,
+        milliseconds: float
+    ) -> None:
+        if not self.enabled:
+            return
+        with self._lock:
+            self._latencies.setdefault(stage, []).append(milliseconds)
+
+    def increment(
+        self,
+        name: str,
+        value: float = 1
+    ) -> None:
+        if not self.enabled:
+            return
+        with self._lock:
+            self._counts[name] = self._counts.get(name, 0) + value
+
+    def add_bytes(
+        self,
+        name: str,
+        size: int
+    ) -> None:
+        if not self.enabled:
+            return
+        with self._lock:
+            self._bytes[name] = self._bytes.get(name, 0) + size
+
+    def observe(
+        self,
+        name: str,
+        value: float,
+        unit: str,
+        properties: Optional[Dict[str, Any]] = None,
+        **dimensions: str
+    ) -> None:
+        """
+        Record one sample of a distribution under extra dimensions, e.g. observe("TimeToNotify", 42, "Seconds", Window="morning").
+        `properties` are written next to the sample for Logs Insights without becoming dimensions, so a high-cardinality
+        value such as a store id does not create one CloudWatch metric per value.
+        """
+        if not self.enabled:
+            return
+        key = (tuple(sorted(dimensions.items())), tuple(sorted((properties or {}).items())))
+        with self._lock:
+            unit_and_samples = self._observations.setdefault(key, {}).setdefault(name, (unit, []))
+            unit_and_samples[1].append(value)
+
+    def reset(self) -> None:
+        with self._lock:
+            self._latencies, self._counts, self._bytes, self._observations = {}, {}, {}, {}
+
+    @contextmanager
+    def invocation(self, handler: str) -> Iterator[None]:
+        """Record one handler invocation, timed as a stage of its own, and flush its metrics when it returns or raises."""
+        self.reset()
+        try:
+            with self.timer(handler):
+                yield
+
+        finally:
+            self.flush(Handler=handler)
+
+    def flush(self, **dimensions: str) -> List[str]:
+        """Write what was recorded since the last flush as EMF lines, with the given dimensions, and return them."""
+        with self._lock:
+            latencies, counts, sizes, observations = self._latencies, self._counts, self._bytes, self._observations
+            self._latencies, self._counts, self._bytes, self._observations = {}, {}, {}, {}
+        if not self.enabled:
+            return []
+
+        # Latencies keep every sample (up to the EMF limit) so CloudWatch can build percentiles from them
+        values: Dict[str, object] = {}
+        units: Dict[str, str] = {}
+        for stage, samples in latencies.items():
+            values[f"{stage}Latency"] = [round(sample, 3) for sample in samples[:MAX_VALUES_PER_METRIC]]
+            units[f"{stage}Latency"] = "Milliseconds"
+            values[f"{stage}Calls"] = len(samples)
+            units[f"{stage}Calls"] = "Count"
+        for name, count in counts.items():
+            values[name], units[name] = count, "Count"
+        for name, size in sizes.items():
+            values[name], units[name] = size, "Bytes"
+
+        lines = self._documents(values, units, dimensions)
+        for (extra_dimensions, properties), metrics in observations.items():
+            lines.extend(self._documents(
+                {name: [round(sample, 3) for sample in samples[:MAX_VALUES_PER_METRIC]] for name, (_, samples) in metrics.items()},
+                {name: unit for name, (unit, _) in metrics.items()},
+                {**dimensions, **dict(extra_dimensions)},
+                dict(properties)
+            ))
+        for line in lines:
+            self.sink(line)
+        return lines
+
+    def _documents(
+        self,
+        values: Dict[str, object],
+        units: Dict[str, str],
+        dimensions: Dict[str, str],
+        properties: Optional[Dict[str, Any]] = None
+    ) -> List[str]:
+        names = list(values)
+        lines = []
+        for start in range(0, len(names), MAX_METRICS_PER_DOCUMENT):
+            chunk = names[start:start + MAX_METRICS_PER_DOCUMENT]
+            document = {
+                "_aws": {
+                    "Timestamp": int(time.time() * 1000),
+                    "CloudWatchMetrics": [{
+                        "Namespace": self.namespace,
+                        "Dimensions": [sorted(dimensions)],
+                        "Metrics": [{"Name": name, "Unit": units[name]} for name in chunk],
+                    }],
+                },
+                **(properties or {}),
+                **dimensions,
+                **{name: values[name] for name in chunk},
+            }
+            lines.append(json.dumps(document, separators=(",", ":")))
+        return lines
+
+METRICS = Metrics()
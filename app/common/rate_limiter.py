@@ -0,0 +1,130 @@
+import random, threading, time
+from email.utils import parsedate_to_datetime
+from typing import Callable, Dict, Optional
+
+class TokenBucket:
+    """Thread-safe token bucket: `rate` tokens per second, bursts of up to `capacity` tokens."""
+    def __init__(
+        self,
+        rate: float,
+        capacity: float,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        self.rate = rate
+        self.capacity = capacity
+        self._clock = clock
+        self._tokens = capacity
+        self._updated_at = clock()
+        self._blocked_until = 0.0
+        self._lock = threading.Lock()
+
+    def try_acquire(self, tokens: float = 1) -> float:
+        """Take tokens if available and return 0, otherwise return the number of seconds to wait before retrying."""
+        with self._lock:
+            now = self._clock()
+            if now < self._blocked_until:
+                return self._blocked_until - now
+
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated_at) * self.rate)
+            self._updated_at = now
+            if self._tokens >= tokens:
+                self._tokens -= tokens
+                return 0.0
+            return (tokens - self._tokens) / self.rate
+
+    def acquire(
+        self,
+        tokens: float = 1,
+        timeout: Optional[float] = None
+    ) -> bool:
+        """Block until tokens are available. Return False if that would take longer than timeout seconds."""
+        deadline = None if timeout is None else self._clock() + timeout
+        while True:
+            wait_time = self.try_acquire(tokens)
+            if wait_time <= 0:
+                return True
+            if deadline is not None and self._clock() + wait_time > deadline:
+                return False
+            time.sleep(wait_time)
+
+    def block_for(self, seconds: float) -> None:
+        """Refuse all tokens for the given number of seconds (e.g. a server-provided Retry-After)."""
+        with self._lock:
+            self._blocked_until = max(self._blocked_until, self._clock() + seconds)
+
+class AdaptiveRateLimiter(TokenBucket):
+    """
+    Token bucket whose rate follows AIMD: it grows slowly on success and is cut multiplicatively
+    when the server throttles (429) or flags the client (403), honouring Retry-After when provided.
+    """
+    def __init__(
+        self,
+        rate: float,
+        capacity: float,
+        min_rate: float,
+        max_rate: float,
+        increase_step: float = 0.05,
+        decrease_factor: float = 0.5,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        super().__init__(rate, capacity, clock)
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.increase_step = increase_step
+        self.decrease_factor = decrease_factor
+
+    def on_success(self) -> None:
+        with self._lock:
+            self.rate = min(self.max_rate, self.rate + self.increase_step)
+
+    def on_throttle(self, retry_after: Optional[float] = None) -> None:
+        with self._lock:
+            self.rate = max(self.min_rate, self.rate * self.decrease_factor)
+            self._tokens = 0.0
+        if retry_after:
+            self.block_for(retry_after)
+
+class RateLimiterRegistry:
+    """Container-wide rate limiters keyed by account/IP, so limits survive warm invocations and are shared by all clients."""
+    _limiters: Dict[str, TokenBucket] = {}
+    _lock = threading.Lock()
+
+    @classmethod
+    def get(
+        cls,
+        key: str,
+        factory: Callable[[], TokenBucket]
+    ) -> TokenBucket:
+        with cls._lock:
+            limiter = cls._limiters.get(key)
+            if limiter is None:
+                limiter = cls._limiters[key] = factory()
+            return limiter
+
+    @classmethod
+    def clear(cls) -> None:
+        with cls._lock:
+            cls._limiters.clear()
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Parse a Retry-After header given either as delay-seconds or as an HTTP date."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+
+    except (TypeError, ValueError):
+        return None
+
+def decorrelated_jitter(
+    previous_delay: Optional[float],
+    base: float,
+    cap: float
+) -> float:
+    """Next backoff delay using "decorrelated jitter": uniform between base and three times the previous delay, capped."""
+    return min(cap, random.uniform(base, (previous_delay or base) * 3))
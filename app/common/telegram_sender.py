@@ -0,0 +1,166 @@
+import threading, time, requests
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+from typing import Dict, Iterable, List, Optional, Union
+from requests.adapters import HTTPAdapter
+from app.common.constants import TELEGRAM_API_URL, TELEGRAM_MIN_REQUEST_TIMEOUT, TELEGRAM_REQUEST_TIMEOUT
+from app.common.deadline import Deadline
+from app.common.json_codec import decode_response
+from app.common.logger import get_logger
+from app.common.metrics import METRICS
+from app.common.rate_limiter import RateLimiterRegistry, TokenBucket, parse_retry_after
+
+LOGGER = get_logger(__name__)
+
+# Telegram Bot API quotas: ~30 messages per second per bot, ~1 per second per chat, 20 per minute per group
+GLOBAL_RATE = 30.0
+GLOBAL_BURST = 30
+CHAT_RATE = 1.0
+GROUP_CHAT_RATE = 20 / 60
+CHAT_BURST = 3
+MAX_CONCURRENT_SENDS = 8
+MAX_RETRIES = 3
+MAX_RATE_LIMIT_WAIT = 30  # Seconds a message may wait on rate limits when there is no deadline
+
+ChatId = Union[str, int]
+
+class TelegramSender:
+    """
+    Sends Telegram messages over a pooled session with JSON POST bodies, within Telegram's global and per-chat quotas.
+    A 429 is retried after the `retry_after` Telegram returns, and batches are sent concurrently.
+    One sender per bot lives as long as the Lambda container, so warm invocations reuse its connections.
+    """
+    _senders: Dict[str, "TelegramSender"] = {}
+    _lock = threading.Lock()
+
+    def __init__(
+        self,
+        bot_token: str,
+        max_workers: int = MAX_CONCURRENT_SENDS
+    ):
+        self.url = TELEGRAM_API_URL.format(token=bot_token)
+        self.bot_id = bot_token.split(":", 1)[0]
+        self.session = requests.Session()
+        self.session.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=max_workers))
+        self.max_workers = max_workers
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self.global_limiter = RateLimiterRegistry.get(f"telegram:{self.bot_id}", lambda: TokenBucket(GLOBAL_RATE, GLOBAL_BURST))
+
+    @classmethod
+    def for_bot(cls, bot_token: str) -> "TelegramSender":
+        """Return the container-wide sender for a bot token."""
+        with cls._lock:
+            sender = cls._senders.get(bot_token)
+            if sender is None:
+                sender = cls._senders[bot_token] = cls(bot_token)
+            return sender
+
+    @classmethod
+    def clear(cls) -> None:
+        with cls._lock:
+            for sender in cls._senders.values():
+                sender.session.close()
+            cls._senders.clear()
+
+    def send(
+        self,
+        chat_id: ChatId,
+        text: str,
+        parse_mode: str = "Markdown",
+        disable_web_page_preview: bool = True,
+        timeout: Optional[float] = TELEGRAM_REQUEST_TIMEOUT,
+        deadline: Optional[Deadline] = None
+    ) -> bool:
+        """Send one message. Return True once Telegram accepted it, False if it could not be delivered."""
+        payload = {
+            "chat_id": chat_id,
+            "text": text,
+            "parse_mode": parse_mode,
+            "disable_web_page_preview": disable_web_page_preview,
+        }
+        try:
+            response = self._post(payload, timeout, deadline)
+            if response is None:
+                return False
+            response.raise_for_status()
+            LOGGER.info("Telegram message sent successfully to chat_id: %s", chat_id)
+            return True
+
+        except requests.RequestException as e:
+            LOGGER.error("Failed to send Telegram message to chat_id: %s. Error: %s", chat_id, e)
+
+        except Exception as e:
+            LOGGER.error("Unexpected error while sending Telegram message: %s", e)
+        return False
+
+    def send_many(
+        self,
+        chat_id: ChatId,
+        texts: Iterable[str],
+        parse_mode: str = "Markdown",
+        disable_web_page_preview: bool = True,
+        timeout: Optional[float] = TELEGRAM_REQUEST_TIMEOUT,
+        deadline: Optional[Deadline] = None
+    ) -> List[bool]:
+        """Send several messages concurrently (within the rate limits) and return their delivery results in order."""
+        texts = list(texts)
+        if len(texts) <= 1:
+            return [self.send(chat_id, text, parse_mode, disable_web_page_preview, timeout, deadline) for text in texts]
+
+        futures = [
+            self._get_executor().submit(self.send, chat_id, text, parse_mode, disable_web_page_preview, timeout, deadline)
+            for text in texts
+        ]
+        return [future.result() for future in futures]
+
+    def _post(
+        self,
+        payload: Dict[str, object],
+        timeout: Optional[float],
+        deadline: Optional[Deadline]
+    ) -> Optional[requests.Response]:
+        """POST within the global and per-chat quotas, retrying 429s after Telegram's retry_after. Return None if rate limits outlast the budget."""
+        chat_limiter = self._chat_limiter(payload["chat_id"])
+        budget_end = time.monotonic() + (max(0.0, deadline.remaining()) if deadline else MAX_RATE_LIMIT_WAIT)
+        for attempt in range(MAX_RETRIES + 1):
+            for limiter in (chat_limiter, self.global_limiter):
+                if not limiter.acquire(timeout=max(0.0, budget_end - time.monotonic())):
+                    LOGGER.error("Telegram rate limit would delay the message to chat_id: %s past its budget.", payload['chat_id'])
+                    return None
+
+            request_timeout = deadline.timeout(cap=timeout, minimum=TELEGRAM_MIN_REQUEST_TIMEOUT) if deadline else timeout
+            with METRICS.timer("TelegramRequest"):
+                response = self.session.post(self.url, json=payload, timeout=request_timeout)
+            if response.status_code != HTTPStatus.TOO_MANY_REQUESTS:
+                return response
+
+            retry_after = self._retry_after(response)
+            chat_limiter.block_for(retry_after)
+            if attempt == MAX_RETRIES or time.monotonic() + retry_after > budget_end:
+                return response
+
+            LOGGER.warning("Telegram returned 429 for chat_id: %s, retrying in %.0fs (attempt %d/%d).", payload['chat_id'], retry_after, attempt + 1, MAX_RETRIES)
+            time.sleep(retry_after)
+
+    def _chat_limiter(self, chat_id: ChatId) -> TokenBucket:
+        # Group and channel ids are negative and have a much lower quota
+        rate = GROUP_CHAT_RATE if str(chat_id).startswith("-") else CHAT_RATE
+        return RateLimiterRegistry.get(f"telegram:{self.bot_id}:{chat_id}", lambda: TokenBucket(rate, CHAT_BURST))
+
+    @staticmethod
+    def _retry_after(response: requests.Response) -> float:
+        """Delay requested by Telegram, from the JSON `parameters.retry_after` or the Retry-After header."""
+        try:
+            retry_after = decode_response(response, "parameters.retry_after", default=None)
+            if retry_after is not None:
+                return float(retry_after)
+
+        except ValueError:
+            pass
+        return parse_retry_after(response.headers.get("Retry-After")) or 1.0
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="telegram-sender")
+            return self._executor
@@ -1,8 +1,12 @@
-import os, json, requests, boto3
-from typing import Optional
-from urllib.parse import quote
-from app.common.logger import LOGGER
-from app.common.constants import LOCALIZATIONS_FILE_PATH, TELEGRAM_API_URL
+import os, json
+from typing import Any, List, Optional, Tuple
+from app.common.deadline import Deadline
+from app.common.logger import get_logger
+from app.common.constants import LOCALIZATIONS_FILE_PATH, TELEGRAM_REQUEST_TIMEOUT
+from app.common.telegram_sender import TelegramSender
+from app.core.aws_clients import AwsClients
+
+LOGGER = get_logger(__name__)
 
 class Utils:
     @classmethod
@@ -51,36 +55,47 @@ class Utils:
         text: str, 
         chat_id: Optional[str] = None,
         parse_mode: str = "Markdown",
-        disable_web_page_preview: bool = True
-    ):
+        disable_web_page_preview: bool = True,
+        timeout: Optional[float] = TELEGRAM_REQUEST_TIMEOUT,
+        deadline: Optional[Deadline] = None
+    ) -> bool:
         """Send a message via Telegram to a specific user or default chat."""
+        sender, chat_id = Utils._get_telegram_sender(chat_id)
+        if sender is None:
+            return False
+        return sender.send(chat_id, text, parse_mode, disable_web_page_preview, timeout, deadline)
+
+    @staticmethod
+    def send_telegram_messages(
+        texts: List[str], 
+        chat_id: Optional[str] = None,
+        parse_mode: str = "Markdown",
+        disable_web_page_preview: bool = True,
+        timeout: Optional[float] = TELEGRAM_REQUEST_TIMEOUT,
+        deadline: Optional[Deadline] = None
+    ) -> List[bool]:
+        """Send several Telegram messages concurrently to a specific user or default chat."""
+        sender, chat_id = Utils._get_telegram_sender(chat_id)
+        if sender is None:
+            return [False] * len(texts)
+        return sender.send_many(chat_id, texts, parse_mode, disable_web_page_preview, timeout, deadline)
+
+    @staticmethod
+    def _get_telegram_sender(
+        chat_id: Optional[str]
+    ) -> Tuple[Optional[TelegramSender], Optional[str]]:
+        """Resolve the container-wide sender for the configured bot and the target chat."""
         bot_token = Utils.get_environment_variable("TELEGRAM_BOT_TOKEN")
         if not bot_token:
             LOGGER.error("Telegram bot token is missing.")
-            return
+            return None, None
         
         if chat_id is None:
             chat_id = Utils.get_environment_variable("TELEGRAM_CHAT_ID")
             if not chat_id:
                 LOGGER.error("Telegram chat ID is missing and was not provided.")
-                return
-
-        encoded_text = quote(text, safe='')
-        url = (
-            f"{TELEGRAM_API_URL.format(token=bot_token)}"
-            f"?chat_id={chat_id}&disable_web_page_preview={disable_web_page_preview}&parse_mode={parse_mode}&text={encoded_text}"
-        )
-        
-        try:
-            response = requests.get(url)
-            response.raise_for_status()
-            LOGGER.info(f"Telegram message sent successfully to chat_id: {chat_id}")
-
-        except requests.RequestException as e:
-            LOGGER.error(f"Failed to send Telegram message to chat_id: {chat_id}. Error: {e}")
-            
-        except Exception as e:
-            LOGGER.error(f"Unexpected error while sending Telegram message: {e}")
+                return None, None
+        return TelegramSender.for_bot(bot_token), chat_id
 
     @staticmethod
     def ok_response():
@@ -103,15 +118,16 @@ class Utils:
     @staticmethod
     def update_lambda_env_vars(
         lambda_arn: str, 
-        new_env_vars: dict
+        new_env_vars: dict,
+        lambda_client: Optional[Any] = None
     ) -> None:
         """Update AWS Lambda environment variables with new values."""
         try:
-            LOGGER.info(f"Updating AWS Lambda environment variables for {lambda_arn} - new_env_vars: {new_env_vars}")
-            lambda_client = boto3.client('lambda')
+            LOGGER.info("Updating AWS Lambda environment variables for %s: %s", lambda_arn, sorted(new_env_vars))
+            lambda_client = lambda_client or AwsClients.client('lambda')
             response = lambda_client.get_function_configuration(FunctionName=lambda_arn)
             current_env_vars = response['Environment']['Variables']
-            LOGGER.info(f"Current environment variables: {current_env_vars}")
+            LOGGER.debug("Current environment variables: %s", sorted(current_env_vars))
 
             updated_env_vars = current_env_vars.copy()
             updated_env_vars.update(new_env_vars)
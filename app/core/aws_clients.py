@@ -0,0 +1,111 @@
+import threading, boto3
+from botocore.config import Config
+from typing import Any, Dict, Optional, Tuple
+from app.common.logger import get_logger
+from app.core.exceptions import DeadlineExceededError
+
+LOGGER = get_logger(__name__)
+
+DYNAMODB_REGION = "eu-west-3"
+
+# One connection pool per client, sized for the concurrent sends/prefetches of a single invocation.
+# Short timeouts keep a stuck AWS call from eating the Lambda deadline; adaptive retries back off on throttling.
+BOTO_CONFIG = Config(
+    connect_timeout=2,
+    read_timeout=5,
+    max_pool_connections=10,
+    tcp_keepalive=True,
+    retries={"max_attempts": 3, "mode": "adaptive"},
+)
+# Whole-call budgets (seconds) of the clients used under an invocation deadline. A call gets the largest one that
+# fits in what is left, so only a handful of clients are ever built.
+DEADLINE_TIMEOUT_STEPS = (0.25, 0.5, 1, 2, 4)
+
+def deadline_config(timeout: float) -> Config:
+    """
+    Config whose connect plus read timeouts fit in `timeout` seconds, without retries: under a deadline a failed
+    call is left to the next run rather than retried past the time the invocation has left.
+    """
+    connect_timeout = min(BOTO_CONFIG.connect_timeout, timeout / 4)
+    return BOTO_CONFIG.merge(Config(
+        connect_timeout=connect_timeout,
+        read_timeout=timeout - connect_timeout,
+        retries={"total_max_attempts": 1, "mode": "standard"},
+    ))
+
+def deadline_timeout_step(timeout: float) -> float:
+    """The largest of DEADLINE_TIMEOUT_STEPS within `timeout`. Raises DeadlineExceededError when even the smallest is not."""
+    step = max((step for step in DEADLINE_TIMEOUT_STEPS if step <= timeout), default=None)
+    if step is None:
+        raise DeadlineExceededError(f"Not enough time left for an AWS call ({timeout:.2f}s remaining).")
+    return step
+
+class AwsClients:
+    """
+    Container-wide factory of boto3 clients and resources. Each one is built lazily on first use from a shared
+    session and then reused by every Scheduler, DatabaseHandler and Utils call of the warm container.
+    Passing a `timeout` returns one built with `deadline_config` for the nearest step, for calls made under a deadline.
+    Tests register local stand-ins with `register`, used whatever the timeout, and reset everything with `clear`.
+    """
+    _instances: Dict[Tuple[str, str, Optional[str], Optional[float]], Any] = {}
+    _stand_ins: Dict[Tuple[str, str, Optional[str]], Any] = {}
+    _session: Optional[boto3.session.Session] = None
+    _lock = threading.Lock()
+
+    @classmethod
+    def client(
+        cls,
+        service_name: str,
+        region_name: Optional[str] = None
+    ) -> Any:
+        return cls._get("client", service_name, region_name, None)
+
+    @classmethod
+    def resource(
+        cls,
+        service_name: str,
+        region_name: Optional[str] = None,
+        timeout: Optional[float] = None
+    ) -> Any:
+        return cls._get("resource", service_name, region_name, timeout)
+
+    @classmethod
+    def register(
+        cls,
+        service_name: str,
+        instance: Any,
+        kind: str = "client",
+        region_name: Optional[str] = None
+    ) -> None:
+        """Use `instance` instead of a real boto3 client or resource (tests, local runs)."""
+        with cls._lock:
+            cls._stand_ins[(kind, service_name, region_name)] = instance
+
+    @classmethod
+    def clear(cls) -> None:
+        with cls._lock:
+            cls._instances.clear()
+            cls._stand_ins.clear()
+            cls._session = None
+
+    @classmethod
+    def _get(
+        cls,
+        kind: str,
+        service_name: str,
+        region_name: Optional[str],
+        timeout: Optional[float]
+    ) -> Any:
+        step = deadline_timeout_step(timeout) if timeout is not None else None
+        key = (kind, service_name, region_name, step)
+        # boto3 sessions are not thread-safe, so creation happens under the lock
+        with cls._lock:
+            instance = cls._stand_ins.get(key[:3]) or cls._instances.get(key)
+            if instance is None:
+                if cls._session is None:
+                    cls._session = boto3.session.Session()
+                factory = cls._session.client if kind == "client" else cls._session.resource
+                config = BOTO_CONFIG if step is None else deadline_config(step)
+                instance = cls._instances[key] = factory(service_name, region_name=region_name, config=config)
+                LOGGER.info("Created boto3 %s for %s (%s).", kind, service_name, region_name or cls._session.region_name)
+            return instance
@@ -1,18 +1,32 @@
-import boto3
+import math, time
 from botocore.exceptions import ClientError
-from boto3.dynamodb.conditions import Attr
-from typing import Any, Dict, List
-from app.common.logger import LOGGER
+from boto3.dynamodb.conditions import Attr, ConditionBase, Key
+from typing import Any, Dict, Iterator, List, Optional, Sequence
+from app.common.deadline import Deadline
+from app.common.logger import get_logger
+from app.common.rate_limiter import decorrelated_jitter
+from app.core.aws_clients import AwsClients, BOTO_CONFIG, DYNAMODB_REGION
 from app.core.exceptions import DatabaseConnectionError, DatabaseQueryError
+from app.core.storage_backend import StorageBackend
 
-class DatabaseHandler:
+LOGGER = get_logger(__name__)
+
+BATCH_GET_MAX_KEYS = 100  # DynamoDB BatchGetItem limit per request
+BATCH_GET_MAX_ATTEMPTS = 5
+BATCH_GET_RETRY_BASE_DELAY = 0.05  # Seconds, first wait before resending unprocessed keys
+BATCH_GET_RETRY_MAX_DELAY = 1
+
+class DatabaseHandler(StorageBackend):
     def __init__(
         self, 
-        table_name: str
+        table_name: str,
+        dynamodb: Optional[Any] = None
     ):
         self.table_name = table_name
-        self.region_name = "eu-west-3"
-        self.dynamodb = boto3.resource('dynamodb', region_name=self.region_name) 
+        self.region_name = DYNAMODB_REGION
+        # An injected resource is used as is; the shared one is swapped for a deadline-sized one under a deadline
+        self._uses_shared_resource = dynamodb is None
+        self.dynamodb = dynamodb or AwsClients.resource('dynamodb', region_name=self.region_name)
         try:
             self.table = self.dynamodb.Table(self.table_name)
     
@@ -20,6 +34,32 @@ class DatabaseHandler:
             LOGGER.error(f"Failed to connect to DynamoDB table: {self.table_name}")
             raise DatabaseConnectionError("Could not connect to the database") from e
     
+    def _resource_within(
+        self,
+        deadline: Optional[Deadline],
+        operation: str
+    ) -> Any:
+        """
+        DynamoDB resource for one call under `deadline`: its connect and read timeouts fit in what is left, and it
+        does not retry, so a slow call cannot run past the deadline. Raises DeadlineExceededError if nothing is left.
+        Without a deadline, or under an unbounded one, the shared retrying resource is used.
+        """
+        if deadline is None:
+            return self.dynamodb
+        deadline.check(operation)
+        if math.isinf(deadline.remaining()) or not self._uses_shared_resource:
+            return self.dynamodb
+        timeout = deadline.timeout(cap=BOTO_CONFIG.read_timeout)
+        return AwsClients.resource('dynamodb', region_name=self.region_name, timeout=timeout)
+
+    def _table_within(
+        self,
+        deadline: Optional[Deadline],
+        operation: str
+    ) -> Any:
+        resource = self._resource_within(deadline, operation)
+        return self.table if resource is self.dynamodb else resource.Table(self.table_name)
+
     def get_items(
         self, 
         attribute_name: str, 
@@ -38,7 +78,7 @@ class DatabaseHandler:
                     ExclusiveStartKey=response['LastEvaluatedKey']
                 )
                 items.extend(response.get('Items', []))
-            LOGGER.info(f"Retrieved {len(items)} items from {self.table_name} where {attribute_name}={attribute_value}")
+            LOGGER.debug("Retrieved %d items from %s where %s=%s", len(items), self.table_name, attribute_name, attribute_value)
             return items
 
         except ClientError as e:
@@ -46,20 +86,226 @@ class DatabaseHandler:
             LOGGER.error(error_message)
             raise DatabaseQueryError(message=error_message, query=f"{attribute_name}={attribute_value}") from e
 
+    def scan_items(self) -> Iterator[Dict[str, Any]]:
+        """Iterate over every item of the table, one scan page at a time."""
+        scan_kwargs = {}
+        try:
+            while True:
+                response = self.table.scan(**scan_kwargs)
+                yield from response.get('Items', [])
+                if 'LastEvaluatedKey' not in response:
+                    break
+                scan_kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+        except ClientError as e:
+            error_message = f"Error scanning DynamoDB table {self.table_name}"
+            LOGGER.error(error_message)
+            raise DatabaseQueryError(message=error_message) from e
+
+    def query_items(
+        self, 
+        key_name: str, 
+        key_value: Any, 
+        index_name: Optional[str] = None, 
+        limit: Optional[int] = None,
+        deadline: Optional[Deadline] = None
+    ) -> List[Dict[str, Any]]:
+        """Retrieve the items of one partition (of the table or of a secondary index), in sort key order."""
+        table = self._table_within(deadline, f"query of {index_name or self.table_name}")
+        query_kwargs = {'KeyConditionExpression': Key(key_name).eq(key_value)}
+        if index_name:
+            query_kwargs['IndexName'] = index_name
+        items = []
+        try:
+            while True:
+                if limit:
+                    query_kwargs['Limit'] = limit - len(items)
+                response = table.query(**query_kwargs)
+                items.extend(response.get('Items', []))
+                if 'LastEvaluatedKey' not in response or (limit and len(items) >= limit):
+                    break
+                query_kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+            LOGGER.debug("Retrieved %d items from %s where %s=%s", len(items), index_name or self.table_name, key_name, key_value)
+            return items
+
+        except ClientError as e:
+            error_message = f"Error querying DynamoDB table {self.table_name} where {key_name}={key_value}"
+            LOGGER.error(error_message)
+            raise DatabaseQueryError(message=error_message, query=f"{key_name}={key_value}") from e
+
+    def update_item(
+        self, 
+        key: Dict[str, Any], 
+        update_expression: str, 
+        expression_values: Optional[Dict[str, Any]] = None,
+        deadline: Optional[Deadline] = None
+    ) -> None:
+        """Update attributes of an existing item in place."""
+        update_kwargs = {'Key': key, 'UpdateExpression': update_expression}
+        if expression_values:
+            update_kwargs['ExpressionAttributeValues'] = expression_values
+        table = self._table_within(deadline, f"update in {self.table_name}")
+        try:
+            table.update_item(**update_kwargs)
+            LOGGER.debug("Item updated in %s with key %s: %s", self.table_name, key, update_expression)
+
+        except ClientError as e:
+            error_message = f"Error updating item in DynamoDB table {self.table_name} with key: {key}"
+            LOGGER.error(error_message)
+            raise DatabaseQueryError(message=error_message, query=update_expression) from e
+
+    def update_item_with_condition(
+        self, 
+        key: Dict[str, Any], 
+        update_expression: str, 
+        condition_expression: str,
+        expression_values: Optional[Dict[str, Any]] = None,
+        deadline: Optional[Deadline] = None
+    ) -> bool:
+        """Update attributes of an existing item only if the condition holds on it. Return False if the condition failed."""
+        update_kwargs = {'Key': key, 'UpdateExpression': update_expression, 'ConditionExpression': condition_expression}
+        if expression_values:
+            update_kwargs['ExpressionAttributeValues'] = expression_values
+        table = self._table_within(deadline, f"conditional update in {self.table_name}")
+        try:
+            table.update_item(**update_kwargs)
+            LOGGER.debug("Item conditionally updated in %s with key %s: %s", self.table_name, key, update_expression)
+            return True
+
+        except ClientError as e:
+            if e.response.get('Error', {}).get('Code') == 'ConditionalCheckFailedException':
+                LOGGER.debug("Condition not met in %s, update of %s skipped", self.table_name, key)
+                return False
+
+            error_message = f"Error conditionally updating item in DynamoDB table {self.table_name} with key: {key}"
+            LOGGER.error(error_message)
+            raise DatabaseQueryError(message=error_message, query=condition_expression) from e
+
     def put_item(
         self, 
-        item_data: Dict[str, Any]
+        item_data: Dict[str, Any],
+        deadline: Optional[Deadline] = None
     ) -> None:
         """Insert a new item into the DynamoDB table."""
+        table = self._table_within(deadline, f"put into {self.table_name}")
         try:
-            self.table.put_item(Item=item_data)
-            LOGGER.info(f"Item added to {self.table_name}: {item_data}")
+            table.put_item(Item=item_data)
+            LOGGER.debug("Item added to %s: %s", self.table_name, item_data)
 
         except ClientError as e:
             error_message = f"Error putting item into DynamoDB table {self.table_name} with data: {item_data}"
             LOGGER.error(error_message)
             raise DatabaseQueryError(message=error_message) from e
         
+    def get_item(
+        self, 
+        key: Dict[str, Any]
+    ) -> Optional[Dict[str, Any]]:
+        """Retrieve a single item by its full primary key."""
+        try:
+            response = self.table.get_item(Key=key, ConsistentRead=True)
+            return response.get('Item')
+
+        except ClientError as e:
+            error_message = f"Error getting item from DynamoDB table {self.table_name} with key: {key}"
+            LOGGER.error(error_message)
+            raise DatabaseQueryError(message=error_message, query=str(key)) from e
+
+    def batch_get_items(
+        self, 
+        keys: Sequence[Dict[str, Any]],
+        deadline: Optional[Deadline] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Retrieve several items by full primary key with BatchGetItem. Missing items are left out of the result.
+        Unprocessed keys (throttling) are resent after a jittered exponential backoff.
+        Under a deadline, each request is sized to the time left and raises DeadlineExceededError once none is.
+        """
+        items = []
+        try:
+            for start in range(0, len(keys), BATCH_GET_MAX_KEYS):
+                request_items = {self.table_name: {'Keys': list(keys[start:start + BATCH_GET_MAX_KEYS]), 'ConsistentRead': True}}
+                delay = None
+                for attempt in range(BATCH_GET_MAX_ATTEMPTS):
+                    if attempt:
+                        delay = decorrelated_jitter(delay, BATCH_GET_RETRY_BASE_DELAY, BATCH_GET_RETRY_MAX_DELAY)
+                        if deadline is not None:
+                            deadline.check(f"retry of unprocessed keys from {self.table_name}", reserve=delay)
+                        time.sleep(delay)
+                    dynamodb = self._resource_within(deadline, f"batch get from {self.table_name}")
+                    response = dynamodb.batch_get_item(RequestItems=request_items)
+                    items.extend(response.get('Responses', {}).get(self.table_name, []))
+                    request_items = response.get('UnprocessedKeys') or {}
+                    if not request_items:
+                        break
+                else:
+                    raise DatabaseQueryError(f"BatchGetItem left unprocessed keys in {self.table_name}", query=str(request_items))
+            LOGGER.debug("Retrieved %d of %d items from %s by key", len(items), len(keys), self.table_name)
+            return items
+
+        except ClientError as e:
+            error_message = f"Error batch getting {len(keys)} items from DynamoDB table {self.table_name}"
+            LOGGER.error(error_message)
+            raise DatabaseQueryError(message=error_message) from e
+
+    def batch_put_items(
+        self, 
+        items: Sequence[Dict[str, Any]]
+    ) -> None:
+        """Insert several items with BatchWriteItem; the batch writer resends unprocessed items."""
+        try:
+            with self.table.batch_writer() as batch:
+                for item_data in items:
+                    batch.put_item(Item=item_data)
+            LOGGER.debug("Added %d items to %s", len(items), self.table_name)
+
+        except ClientError as e:
+            error_message = f"Error batch putting {len(items)} items into DynamoDB table {self.table_name}"
+            LOGGER.error(error_message)
+            raise DatabaseQueryError(message=error_message) from e
+
+    def batch_delete_items(
+        self, 
+        keys: Sequence[Dict[str, Any]]
+    ) -> None:
+        """Delete several items by full primary key with BatchWriteItem."""
+        try:
+            with self.table.batch_writer() as batch:
+                for key in keys:
+                    batch.delete_item(Key=key)
+            LOGGER.debug("Deleted %d items from %s", len(keys), self.table_name)
+
+        except ClientError as e:
+            error_message = f"Error batch deleting {len(keys)} items from DynamoDB table {self.table_name}"
+            LOGGER.error(error_message)
+            raise DatabaseQueryError(message=error_message) from e
+
+    def put_item_with_condition(
+        self, 
+        item_data: Dict[str, Any], 
+        condition: ConditionBase,
+        deadline: Optional[Deadline] = None
+    ) -> bool:
+        """
+        Insert an item only if the condition holds on the stored item. Return False if the condition failed.
+        Raises DeadlineExceededError instead of starting the write when the invocation deadline has passed, and
+        sizes the call's timeouts to what is left of it.
+        """
+        table = self._table_within(deadline, f"conditional put into {self.table_name}")
+        try:
+            table.put_item(Item=item_data, ConditionExpression=condition)
+            LOGGER.debug("Item conditionally added to %s: %s", self.table_name, item_data)
+            return True
+
+        except ClientError as e:
+            if e.response.get('Error', {}).get('Code') == 'ConditionalCheckFailedException':
+                LOGGER.debug("Condition not met in %s, item skipped: %s", self.table_name, item_data)
+                return False
+
+            error_message = f"Error conditionally putting item into DynamoDB table {self.table_name} with data: {item_data}"
+            LOGGER.error(error_message)
+            raise DatabaseQueryError(message=error_message) from e
+
     def delete_item(
         self, 
         key_name: str, 
@@ -68,7 +314,7 @@ class DatabaseHandler:
         """Delete an item based on its primary key."""
         try:
             self.table.delete_item(Key={key_name: key_value})
-            LOGGER.info(f"Deleted item from {self.table_name} where {key_name}={key_value}")
+            LOGGER.debug("Deleted item from %s where %s=%s", self.table_name, key_name, key_value)
 
         except ClientError as e:
             error_message = f"Error deleting item from DynamoDB table {self.table_name} where {key_name}={key_value}"
@@ -28,3 +28,18 @@ class DatabaseQueryError(DatabaseError):
         if self.query:
             return f"{base_message} | Query: {self.query}"
         return base_message
+
+class StateStoreError(CoreError):
+    """Raised when the runtime state store cannot be read or written."""
+    def __init__(self, message: str = "State store operation failed", *args):
+        super().__init__(message, *args)
+
+class DeadlineExceededError(CoreError):
+    """Raised when there is not enough time left in the invocation to start an operation."""
+    def __init__(self, message: str = "Invocation deadline exceeded", *args):
+        super().__init__(message, *args)
+
+class OutboxError(CoreError):
+    """Raised when the notification outbox cannot be read or written."""
+    def __init__(self, message: str = "Outbox operation failed", *args):
+        super().__init__(message, *args)
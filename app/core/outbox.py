@@ -0,0 +1,317 @@
+import sqlite3, threading, time, uuid
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from datetime import datetime
+from decimal import Decimal
+from typing import Any, Dict, List, Optional
+import pytz
+from app.common.deadline import Deadline
+from app.common.logger import get_logger
+from app.common.utils import Utils
+from app.core.database_handler import DatabaseHandler
+from app.core.exceptions import OutboxError
+
+LOGGER = get_logger(__name__)
+
+DEFAULT_OUTBOX_TABLE_NAME = "NotificationOutbox"
+DEFAULT_OUTBOX_DB_PATH = "/tmp/too_good_notify_outbox.db"
+PENDING_INDEX_NAME = "PendingMessages"
+PENDING_SHARD = "PENDING"
+MAX_DELIVERY_ATTEMPTS = 10
+DELIVERED_RETENTION = 7 * 24 * 3600  # Seconds delivered and failed messages are kept before the table TTL removes them
+DELIVERY_LEASE = 60  # Seconds a message is reserved for the run sending it, longer than a monitoring invocation
+
+STATUS_PENDING = "PENDING"
+STATUS_DELIVERED = "DELIVERED"
+STATUS_FAILED = "FAILED"
+
+@dataclass(frozen=True)
+class OutboxMessage:
+    message_id: str
+    text: str
+    chat_id: Optional[str]
+    created_at: str
+    attempts: int = 0
+    store_id: Optional[str] = None
+    observed_at: Optional[int] = None  # Epoch seconds of the poll that saw the change, kept to measure the delivery against
+    appeared_after: Optional[int] = None
+
+class Outbox(ABC):
+    """
+    Durable queue of Telegram notifications. A message is enqueued before it is sent and marked delivered after a 2xx,
+    so a failed send is retried on the next tick without polling TGTG again (at-least-once delivery).
+    A sender leases each message with a conditional write before sending it, so overlapping ticks never send the same one.
+    Every call takes the invocation deadline, so a slow backend cannot run a tick past its Lambda timeout.
+    """
+    def __init__(
+        self,
+        max_attempts: int = MAX_DELIVERY_ATTEMPTS,
+        lease_seconds: int = DELIVERY_LEASE
+    ):
+        self.max_attempts = max_attempts
+        self.lease_seconds = lease_seconds
+
+    def enqueue(
+        self,
+        text: str,
+        chat_id: Optional[str] = None,
+        store_id: Optional[str] = None,
+        observed_at: Optional[int] = None,
+        appeared_after: Optional[int] = None,
+        deadline: Optional[Deadline] = None
+    ) -> OutboxMessage:
+        message = OutboxMessage(
+            message_id=uuid.uuid4().hex,
+            text=text,
+            chat_id=chat_id,
+            created_at=datetime.now(pytz.utc).isoformat(),
+            store_id=store_id,
+            observed_at=observed_at,
+            appeared_after=appeared_after
+        )
+        # Leased from the start: the run that enqueues a message is the one sending it
+        self._insert(message, int(time.time()) + self.lease_seconds, deadline)
+        return message
+
+    def claim(
+        self,
+        messages: List[OutboxMessage],
+        deadline: Optional[Deadline] = None
+    ) -> List[OutboxMessage]:
+        """Lease pending messages for this run and return those it won; messages leased by another run are left to it."""
+        now = int(time.time())
+        claimed = [message for message in messages if self._claim(message.message_id, now, now + self.lease_seconds, deadline)]
+        if len(claimed) < len(messages):
+            LOGGER.info("%d outbox messages are being delivered by another run, skipped.", len(messages) - len(claimed))
+        return claimed
+
+    def record_failure(
+        self,
+        message: OutboxMessage,
+        deadline: Optional[Deadline] = None
+    ) -> None:
+        """Count a failed delivery attempt and release the lease. The message stops being retried after max_attempts."""
+        attempts = message.attempts + 1
+        if attempts >= self.max_attempts:
+            LOGGER.error("Giving up on Telegram notification %s after %d attempts: %s", message.message_id, attempts, message.text)
+            self._update_status(message.message_id, STATUS_FAILED, attempts, deadline)
+        else:
+            self._update_status(message.message_id, STATUS_PENDING, attempts, deadline)
+
+    def mark_delivered(
+        self,
+        message: OutboxMessage,
+        deadline: Optional[Deadline] = None
+    ) -> None:
+        self._update_status(message.message_id, STATUS_DELIVERED, message.attempts + 1, deadline)
+
+    @abstractmethod
+    def pending(self, limit: int = 50, deadline: Optional[Deadline] = None) -> List[OutboxMessage]:
+        """Oldest undelivered messages first."""
+        ...
+
+    @abstractmethod
+    def _insert(self, message: OutboxMessage, lease_until: int, deadline: Optional[Deadline]) -> None:
+        ...
+
+    @abstractmethod
+    def _claim(self, message_id: str, now: int, lease_until: int, deadline: Optional[Deadline]) -> bool:
+        """Lease a still pending message whose previous lease has expired. Return False if it is not claimable."""
+        ...
+
+    @abstractmethod
+    def _update_status(self, message_id: str, status: str, attempts: int, deadline: Optional[Deadline]) -> None:
+        ...
+
+class DynamoDBOutbox(Outbox):
+    """
+    Outbox stored in a DynamoDB table keyed on `messageId`. Undelivered messages carry a `pendingShard` attribute
+    indexed by the sparse PendingMessages GSI, so the pending backlog is one Query instead of a scan.
+    """
+    KEY_NAME = "messageId"
+
+    def __init__(
+        self,
+        table_name: str = DEFAULT_OUTBOX_TABLE_NAME,
+        database_handler: Optional[DatabaseHandler] = None,
+        max_attempts: int = MAX_DELIVERY_ATTEMPTS,
+        lease_seconds: int = DELIVERY_LEASE
+    ):
+        super().__init__(max_attempts, lease_seconds)
+        self.database_handler = database_handler or DatabaseHandler(table_name=table_name)
+
+    def pending(self, limit: int = 50, deadline: Optional[Deadline] = None) -> List[OutboxMessage]:
+        items = self.database_handler.query_items("pendingShard", PENDING_SHARD, index_name=PENDING_INDEX_NAME, limit=limit, deadline=deadline)
+        return [
+            OutboxMessage(
+                message_id=item[self.KEY_NAME],
+                text=item["text"],
+                chat_id=item.get("chatId"),
+                created_at=item["createdAt"],
+                attempts=int(item.get("attempts", 0)),
+                store_id=item.get("storeId"),
+                observed_at=_observed_at(item),
+                appeared_after=int(item["appearedAfter"]) if "appearedAfter" in item else None
+            )
+            for item in items
+        ]
+
+    def _insert(self, message: OutboxMessage, lease_until: int, deadline: Optional[Deadline]) -> None:
+        item = {
+            self.KEY_NAME: message.message_id,
+            "text": message.text,
+            "createdAt": message.created_at,
+            "attempts": message.attempts,
+            "deliveryStatus": STATUS_PENDING,
+            "pendingShard": PENDING_SHARD,
+            "leaseUntil": lease_until,
+        }
+        if message.chat_id:
+            item["chatId"] = str(message.chat_id)
+        if message.store_id:
+            item["storeId"] = message.store_id
+        if message.observed_at is not None:
+            item["observedAt"] = message.observed_at
+        if message.appeared_after is not None:
+            item["appearedAfter"] = message.appeared_after
+        self.database_handler.put_item(item, deadline=deadline)
+
+    def _claim(self, message_id: str, now: int, lease_until: int, deadline: Optional[Deadline]) -> bool:
+        return self.database_handler.update_item_with_condition(
+            {self.KEY_NAME: message_id},
+            "SET leaseUntil = :lease_until",
+            "attribute_exists(pendingShard) AND (attribute_not_exists(leaseUntil) OR leaseUntil < :now)",
+            {":lease_until": lease_until, ":now": now},
+            deadline=deadline
+        )
+
+    def _update_status(self, message_id: str, status: str, attempts: int, deadline: Optional[Deadline]) -> None:
+        key = {self.KEY_NAME: message_id}
+        if status == STATUS_PENDING:
+            self.database_handler.update_item(
+                key, "SET attempts = :attempts, leaseUntil = :released", {":attempts": attempts, ":released": 0}, deadline=deadline
+            )
+        else:
+            self.database_handler.update_item(
+                key,
+                "SET deliveryStatus = :status, attempts = :attempts, updatedAt = :now, expiresAt = :expires_at REMOVE pendingShard",
+                {
+                    ":status": status,
+                    ":attempts": attempts,
+                    ":now": datetime.now(pytz.utc).isoformat(),
+                    ":expires_at": Decimal(int(time.time()) + DELIVERED_RETENTION),
+                },
+                deadline=deadline
+            )
+
+class SQLiteOutbox(Outbox):
+    """Outbox stored in a local SQLite database, for local runs and tests."""
+    def __init__(
+        self,
+        path: str = DEFAULT_OUTBOX_DB_PATH,
+        max_attempts: int = MAX_DELIVERY_ATTEMPTS,
+        lease_seconds: int = DELIVERY_LEASE
+    ):
+        super().__init__(max_attempts, lease_seconds)
+        self.path = path
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS outbox ("
+            "message_id TEXT PRIMARY KEY, text TEXT NOT NULL, chat_id TEXT, created_at TEXT NOT NULL, "
+            "attempts INTEGER NOT NULL DEFAULT 0, status TEXT NOT NULL, updated_at TEXT, "
+            "store_id TEXT, observed_at INTEGER, appeared_after INTEGER, lease_until INTEGER NOT NULL DEFAULT 0)"
+        )
+        # Databases created before the time-to-notify and lease columns existed get them added (or renamed) in place
+        columns = {row[1] for row in self._connection.execute("PRAGMA table_info(outbox)")}
+        if "first_seen_at" in columns and "observed_at" not in columns:
+            self._connection.execute("ALTER TABLE outbox RENAME COLUMN first_seen_at TO observed_at")
+            columns.add("observed_at")
+        for column, column_type in (
+            ("store_id", "TEXT"), ("observed_at", "INTEGER"), ("appeared_after", "INTEGER"), ("lease_until", "INTEGER NOT NULL DEFAULT 0")
+        ):
+            if column not in columns:
+                self._connection.execute(f"ALTER TABLE outbox ADD COLUMN {column} {column_type}")
+        self._connection.execute("CREATE INDEX IF NOT EXISTS outbox_pending ON outbox (status, created_at)")
+
+    def pending(self, limit: int = 50, deadline: Optional[Deadline] = None) -> List[OutboxMessage]:
+        if deadline is not None:
+            deadline.check("outbox pending query")
+        with self._lock:
+            rows = self._connection.execute(
+                "SELECT message_id, text, chat_id, created_at, attempts, store_id, observed_at, appeared_after "
+                "FROM outbox WHERE status = ? ORDER BY created_at LIMIT ?",
+                (STATUS_PENDING, limit)
+            ).fetchall()
+        return [OutboxMessage(*row) for row in rows]
+
+    def _insert(self, message: OutboxMessage, lease_until: int, deadline: Optional[Deadline]) -> None:
+        self._execute(
+            "INSERT INTO outbox (message_id, text, chat_id, created_at, attempts, status, store_id, observed_at, appeared_after, lease_until) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                message.message_id, message.text, message.chat_id, message.created_at, message.attempts, STATUS_PENDING,
+                message.store_id, message.observed_at, message.appeared_after, lease_until
+            ),
+            deadline
+        )
+
+    def _claim(self, message_id: str, now: int, lease_until: int, deadline: Optional[Deadline]) -> bool:
+        return self._execute(
+            "UPDATE outbox SET lease_until = ? WHERE message_id = ? AND status = ? AND lease_until < ?",
+            (lease_until, message_id, STATUS_PENDING, now),
+            deadline
+        ) == 1
+
+    def _update_status(self, message_id: str, status: str, attempts: int, deadline: Optional[Deadline]) -> None:
+        self._execute(
+            "UPDATE outbox SET status = ?, attempts = ?, updated_at = ?, lease_until = 0 WHERE message_id = ?",
+            (status, attempts, datetime.now(pytz.utc).isoformat(), message_id),
+            deadline
+        )
+
+    def _execute(
+        self,
+        statement: str,
+        parameters: tuple,
+        deadline: Optional[Deadline] = None
+    ) -> int:
+        """Run one statement and return the number of rows it changed. Raises DeadlineExceededError instead of starting it late."""
+        if deadline is not None:
+            deadline.check("outbox write")
+        try:
+            with self._lock:
+                return self._connection.execute(statement, parameters).rowcount
+
+        except sqlite3.Error as e:
+            raise OutboxError(f"SQLite outbox operation failed on {self.path}: {e}") from e
+
+def _observed_at(item: Dict[str, Any]) -> Optional[int]:
+    """The observation time of a DynamoDB outbox item, including items written under its former `firstSeenAt` name."""
+    observed_at = item.get("observedAt", item.get("firstSeenAt"))
+    return int(observed_at) if observed_at is not None else None
+
+_OUTBOX: Optional[Outbox] = None
+_OUTBOX_LOCK = threading.Lock()
+
+def get_outbox() -> Outbox:
+    """Return the container-wide outbox selected by OUTBOX_BACKEND ("dynamodb" or "sqlite")."""
+    global _OUTBOX
+    with _OUTBOX_LOCK:
+        if _OUTBOX is None:
+            backend = Utils.get_environment_variable("OUTBOX_BACKEND", default="dynamodb").lower()
+            if backend == "sqlite":
+                _OUTBOX = SQLiteOutbox(Utils.get_environment_variable("OUTBOX_PATH", default=DEFAULT_OUTBOX_DB_PATH))
+            elif backend == "dynamodb":
+                _OUTBOX = DynamoDBOutbox(Utils.get_environment_variable("OUTBOX_TABLE_NAME", default=DEFAULT_OUTBOX_TABLE_NAME))
+            else:
+                raise OutboxError(f"Unknown OUTBOX_BACKEND: {backend}")
+            LOGGER.info("Using %s for Telegram notifications.", type(_OUTBOX).__name__)
+        return _OUTBOX
+
+def set_outbox(outbox: Optional[Outbox]) -> None:
+    """Override the container-wide outbox (tests, local runs). Pass None to reset."""
+    global _OUTBOX
+    with _OUTBOX_LOCK:
+        _OUTBOX = outbox
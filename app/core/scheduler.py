@@ -1,44 +1,48 @@
-import boto3, pytz, random
-from typing import Optional, Tuple, List
+import pytz, random
+from typing import Any, Dict, Optional, Tuple, List
 from datetime import datetime, timedelta
 from app.common.utils import Utils
-from app.common.logger import LOGGER
+from app.common.logger import get_logger
+from app.common.metrics import METRICS
 from app.common.constants import SCHEDULE_RULE_NAME_PREFIX, WEEKDAY_MAP
+from app.core.aws_clients import AwsClients
+from app.core.state_store import StateStore, get_state_store
+
+LOGGER = get_logger(__name__)
+
+COOLDOWN_STATE_KEY = "cooldown"
+COOLDOWN_CACHE_TTL = 5  # Seconds
 
 class Scheduler:
     MORNING_WINDOW = ((10, 12), (10, 20))  # Morning: 10:00-12:00 with 10-20 mins delay
     AFTERNOON_WINDOW = ((12, 19), (2, 5))  # Afternoon: 12:00-19:00 with 2-5 mins delay
 
-    def __init__(self, ):
+    def __init__(
+        self,
+        state_store: Optional[StateStore] = None,
+        events_client: Optional[Any] = None
+    ):
         """Initialize the Scheduler."""
         aws_account_id = Utils.get_environment_variable("AWS_ACCOUNT_ID")
         aws_region = Utils.get_environment_variable("DEFAULT_AWS_REGION")
         self.monitoring_lambda_arn = f"arn:aws:lambda:{aws_region}:{aws_account_id}:function:too-good-notify-monitoring"
-        self.events_client: boto3.client = boto3.client('events')
-        self.lambda_client: boto3.client = boto3.client('lambda') 
+        self.events_client = events_client or AwsClients.client('events')
+        self.state_store = state_store or get_state_store()
 
     def _is_in_cooldown(self) -> Tuple[bool, Optional[float]]:
         """Check if the function is in a cooldown state and return the remaining time in seconds if active."""
         try:
-            response = self.lambda_client.get_function_configuration(FunctionName=self.monitoring_lambda_arn)
-            env_vars = response.get('Environment', {}).get('Variables', {})
-            cooldown_end_time_str = env_vars.get('COOLDOWN_END_TIME')
-            
-            if not cooldown_end_time_str:
-                LOGGER.info("No cooldown end time set. Cooldown is not active.")
+            record = self.state_store.get(COOLDOWN_STATE_KEY, max_age=COOLDOWN_CACHE_TTL)
+            cooldown_end_timestamp = record.value.get('cooldown_end_timestamp') if record else None
+
+            if not cooldown_end_timestamp:
                 return False, None
-            
-            cooldown_end_time = datetime.fromisoformat(cooldown_end_time_str).replace(tzinfo=pytz.utc)
-            now_utc = datetime.now(pytz.utc)
-            LOGGER.info(f"cooldown_end_time: {cooldown_end_time}")
-            LOGGER.info(f"now_utc: {now_utc}")
 
-            if now_utc < cooldown_end_time:
-                remaining_time = (cooldown_end_time - now_utc).total_seconds()
+            remaining_time = cooldown_end_timestamp - datetime.now(pytz.utc).timestamp()
+            if remaining_time > 0:
                 LOGGER.info(f"Cooldown is active. Remaining time: {remaining_time:.0f} seconds.")
                 return True, remaining_time
 
-            LOGGER.info("Cooldown period has expired. Cooldown is not active.")
             return False, None
 
         except Exception as e:
@@ -116,15 +120,28 @@ class Scheduler:
         LOGGER.info("No future invocation exists.")
         return False
 
+    @classmethod
+    def time_windows(cls) -> Dict[str, Tuple[Tuple[int, int], Tuple[int, int]]]:
+        return {
+            'morning': cls.MORNING_WINDOW,
+            'afternoon': cls.AFTERNOON_WINDOW,
+        }
+
+    @classmethod
+    def window_name_at(cls, moment: datetime) -> str:
+        """Name of the polling window a moment falls in (UTC hours, like the schedule), or 'off_peak' outside them."""
+        hour = moment.astimezone(pytz.utc).hour
+        for window_name, ((start_hour, end_hour), _) in cls.time_windows().items():
+            if start_hour <= hour < end_hour:
+                return window_name
+        return 'off_peak'
+
     def _get_time_window(
         self, 
         current_hour: int
     ) -> Optional[Tuple[Tuple[int, int], Tuple[int, int]]]:
         """Determine the active time window based on the current hour."""
-        for window_name, ((start_hour, end_hour), delay_range) in {
-            'morning': self.MORNING_WINDOW,
-            'afternoon': self.AFTERNOON_WINDOW,
-        }.items():
+        for window_name, ((start_hour, end_hour), delay_range) in self.time_windows().items():
             if start_hour <= current_hour < end_hour:
                 LOGGER.info(f"Current time falls within the {window_name} window.")
                 return (start_hour, end_hour), delay_range
@@ -167,22 +184,28 @@ class Scheduler:
         self,
         cooldown_minutes: int = 30
     ) -> None:
-        """Activate cooldown by updating Lambda environment variables."""
+        """Activate cooldown by storing its end time in the runtime state store."""
         try:
             LOGGER.info("Triggering cooldown due to anti-bot detection.")
-            new_env_vars = {"COOLDOWN_END_TIME": (datetime.now(pytz.utc) + timedelta(minutes=cooldown_minutes)).isoformat()}
-            Utils.update_lambda_env_vars(self.monitoring_lambda_arn, new_env_vars)
+            cooldown_end_time = datetime.now(pytz.utc) + timedelta(minutes=cooldown_minutes)
+            self.state_store.put(
+                COOLDOWN_STATE_KEY,
+                {
+                    'cooldown_end_time': cooldown_end_time.isoformat(),
+                    'cooldown_end_timestamp': cooldown_end_time.timestamp()
+                },
+                ttl_seconds=cooldown_minutes * 60
+            )
             LOGGER.info("Cooldown successfully activated.")
 
         except Exception as e:
             LOGGER.error(f"Failed to activate cooldown: {e}")
     
     def remove_cooldown(self) -> None:
-        """Remove the cooldown by clearing the COOLDOWN_END_TIME in the Lambda environment variables."""
+        """Remove the cooldown by deleting it from the runtime state store."""
         try:
             LOGGER.info("Removing cooldown and waking up the bot.")            
-            new_env_vars = {"COOLDOWN_END_TIME": ""}
-            Utils.update_lambda_env_vars(self.monitoring_lambda_arn, new_env_vars)
+            self.state_store.delete(COOLDOWN_STATE_KEY)
             LOGGER.info("Cooldown successfully removed. The bot is now active.")
             
         except Exception as e:
@@ -195,13 +218,17 @@ class Scheduler:
 
     def schedule_next_invocation(self) -> None:
         """Schedule the next invocation based on current conditions."""
-        is_in_cooldown, _ = self._is_in_cooldown()
+        with METRICS.timer("CooldownCheck"):
+            is_in_cooldown, _ = self._is_in_cooldown()
 
         if is_in_cooldown:
             LOGGER.info("Skipping schedule due to active cooldown.")
             return
 
-        if self._has_future_invocation():
+        with METRICS.timer("FutureInvocationCheck"):
+            has_future_invocation = self._has_future_invocation()
+
+        if has_future_invocation:
             LOGGER.info("A future invocation is already scheduled. No new rule created.")
             return
 
@@ -210,6 +237,7 @@ class Scheduler:
         if next_invocation_time:
             cron_expression = self._convert_datetime_to_cron_expression(next_invocation_time)
             rule_name = f"{SCHEDULE_RULE_NAME_PREFIX}{next_invocation_time.strftime('%Y%m%d%H%M')}"
-            self._create_rule(rule_name, cron_expression)
+            with METRICS.timer("RuleCreate"):
+                self._create_rule(rule_name, cron_expression)
         else:
             LOGGER.info("No next invocation scheduled due to off-peak hours or Sunday.")
\ No newline at end of file
@@ -0,0 +1,293 @@
+import json, os, threading, time, uuid
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from decimal import Decimal
+from typing import Any, Dict, Optional, Tuple
+from boto3.dynamodb.conditions import Attr
+from app.common.logger import get_logger
+from app.common.utils import Utils
+from app.core.database_handler import DatabaseHandler
+from app.core.exceptions import StateStoreError
+
+LOGGER = get_logger(__name__)
+
+DEFAULT_STATE_TABLE_NAME = "RuntimeState"
+DEFAULT_STATE_FILE_PATH = "/tmp/too_good_notify_state.json"
+DEFAULT_CACHE_TTL = 5  # Seconds
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - non POSIX platforms
+    fcntl = None
+
+@dataclass(frozen=True)
+class StateRecord:
+    value: Dict[str, Any]
+    version: str
+    expires_at: Optional[int] = None
+
+    def is_expired(self, now: Optional[float] = None) -> bool:
+        return self.expires_at is not None and self.expires_at <= (now or time.time())
+
+class StateStore(ABC):
+    """
+    Small key/value store for runtime state shared by all Lambdas (credentials, cooldown, dedup markers).
+    Records carry an opaque version used for compare-and-swap, and reads go through a short-TTL in-process cache.
+    """
+    def __init__(
+        self,
+        cache_ttl: float = DEFAULT_CACHE_TTL
+    ):
+        self.cache_ttl = cache_ttl
+        self._cache: Dict[str, Tuple[float, Optional[StateRecord]]] = {}
+        self._cache_lock = threading.Lock()
+
+    def get(
+        self,
+        key: str,
+        max_age: Optional[float] = None
+    ) -> Optional[StateRecord]:
+        """Return the record for a key, served from the in-process cache when it is younger than max_age seconds."""
+        max_age = self.cache_ttl if max_age is None else max_age
+        now = time.monotonic()
+        with self._cache_lock:
+            cached = self._cache.get(key)
+        if cached and now - cached[0] < max_age and not (cached[1] and cached[1].is_expired()):
+            return cached[1]
+
+        record = self._read(key)
+        if record and record.is_expired():
+            record = None
+        self._remember(key, record)
+        return record
+
+    def put(
+        self,
+        key: str,
+        value: Dict[str, Any],
+        ttl_seconds: Optional[int] = None
+    ) -> StateRecord:
+        """Unconditionally write a record."""
+        record = self._new_record(value, ttl_seconds)
+        self._write(key, record, condition=None)
+        self._remember(key, record)
+        return record
+
+    def put_if_absent(
+        self,
+        key: str,
+        value: Dict[str, Any],
+        ttl_seconds: Optional[int] = None
+    ) -> bool:
+        """Write a record only if the key does not exist (or has expired). Return False otherwise."""
+        record = self._new_record(value, ttl_seconds)
+        written = self._write(key, record, condition=("absent", None))
+        if written:
+            self._remember(key, record)
+        else:
+            self.invalidate(key)
+        return written
+
+    def compare_and_swap(
+        self,
+        key: str,
+        value: Dict[str, Any],
+        expected_version: str,
+        ttl_seconds: Optional[int] = None
+    ) -> bool:
+        """Write a record only if the stored version still equals expected_version. Return False on conflict."""
+        record = self._new_record(value, ttl_seconds)
+        written = self._write(key, record, condition=("version", expected_version))
+        if written:
+            self._remember(key, record)
+        else:
+            self.invalidate(key)
+        return written
+
+    def delete(self, key: str) -> None:
+        self._delete(key)
+        self._remember(key, None)
+
+    def invalidate(self, key: Optional[str] = None) -> None:
+        """Drop cached entries so the next read hits the backend."""
+        with self._cache_lock:
+            if key is None:
+                self._cache.clear()
+            else:
+                self._cache.pop(key, None)
+
+    def _remember(self, key: str, record: Optional[StateRecord]) -> None:
+        with self._cache_lock:
+            self._cache[key] = (time.monotonic(), record)
+
+    @staticmethod
+    def _new_record(value: Dict[str, Any], ttl_seconds: Optional[int]) -> StateRecord:
+        expires_at = int(time.time()) + ttl_seconds if ttl_seconds else None
+        return StateRecord(value=value, version=uuid.uuid4().hex, expires_at=expires_at)
+
+    @abstractmethod
+    def _read(self, key: str) -> Optional[StateRecord]:
+        ...
+
+    @abstractmethod
+    def _write(self, key: str, record: StateRecord, condition: Optional[Tuple[str, Optional[str]]]) -> bool:
+        ...
+
+    @abstractmethod
+    def _delete(self, key: str) -> None:
+        ...
+
+class DynamoDBStateStore(StateStore):
+    """State records stored as items of a DynamoDB table keyed on `stateKey`, with `expiresAt` as the table TTL attribute."""
+    KEY_NAME = "stateKey"
+
+    def __init__(
+        self,
+        table_name: str = DEFAULT_STATE_TABLE_NAME,
+        database_handler: Optional[DatabaseHandler] = None,
+        cache_ttl: float = DEFAULT_CACHE_TTL
+    ):
+        super().__init__(cache_ttl)
+        self.database_handler = database_handler or DatabaseHandler(table_name=table_name)
+
+    def _read(self, key: str) -> Optional[StateRecord]:
+        item = self.database_handler.get_item({self.KEY_NAME: key})
+        if not item:
+            return None
+        expires_at = item.get("expiresAt")
+        return StateRecord(
+            value=json.loads(item.get("value", "{}")),
+            version=item.get("version", ""),
+            expires_at=int(expires_at) if expires_at is not None else None
+        )
+
+    def _write(self, key: str, record: StateRecord, condition: Optional[Tuple[str, Optional[str]]]) -> bool:
+        item = {
+            self.KEY_NAME: key,
+            "value": json.dumps(record.value),
+            "version": record.version,
+        }
+        if record.expires_at is not None:
+            item["expiresAt"] = Decimal(record.expires_at)
+
+        if condition is None:
+            self.database_handler.put_item(item)
+            return True
+
+        kind, expected_version = condition
+        if kind == "absent":
+            # DynamoDB deletes expired items lazily, so an expired record counts as absent
+            dynamo_condition = Attr(self.KEY_NAME).not_exists() | Attr("expiresAt").lte(Decimal(int(time.time())))
+        else:
+            dynamo_condition = Attr("version").eq(expected_version)
+        return self.database_handler.put_item_with_condition(item, dynamo_condition)
+
+    def _delete(self, key: str) -> None:
+        self.database_handler.delete_item(self.KEY_NAME, key)
+
+class LocalFileStateStore(StateStore):
+    """State records stored in a JSON file, for local runs and tests. Writes are atomic and locked across processes."""
+    def __init__(
+        self,
+        path: str = DEFAULT_STATE_FILE_PATH,
+        cache_ttl: float = DEFAULT_CACHE_TTL
+    ):
+        super().__init__(cache_ttl)
+        self.path = path
+        self._lock = threading.Lock()
+
+    def _read(self, key: str) -> Optional[StateRecord]:
+        with self._lock:
+            entry = self._load().get(key)
+        return self._to_record(entry)
+
+    def _write(self, key: str, record: StateRecord, condition: Optional[Tuple[str, Optional[str]]]) -> bool:
+        with self._lock, self._file_lock():
+            data = self._load()
+            current = self._to_record(data.get(key))
+            if current and current.is_expired():
+                current = None
+
+            if condition is not None:
+                kind, expected_version = condition
+                if kind == "absent" and current is not None:
+                    return False
+                if kind == "version" and (current is None or current.version != expected_version):
+                    return False
+
+            data[key] = {"value": record.value, "version": record.version, "expiresAt": record.expires_at}
+            self._dump(data)
+            return True
+
+    def _delete(self, key: str) -> None:
+        with self._lock, self._file_lock():
+            data = self._load()
+            if data.pop(key, None) is not None:
+                self._dump(data)
+
+    def _load(self) -> Dict[str, Any]:
+        try:
+            with open(self.path, "r", encoding="utf-8") as file:
+                return json.load(file)
+
+        except FileNotFoundError:
+            return {}
+
+        except json.JSONDecodeError as e:
+            raise StateStoreError(f"Corrupted state file {self.path}: {e}") from e
+
+    def _dump(self, data: Dict[str, Any]) -> None:
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as file:
+            json.dump(data, file)
+        os.replace(tmp_path, self.path)
+
+    def _file_lock(self):
+        return _FileLock(f"{self.path}.lock")
+
+    @staticmethod
+    def _to_record(entry: Optional[Dict[str, Any]]) -> Optional[StateRecord]:
+        if not entry:
+            return None
+        return StateRecord(value=entry["value"], version=entry["version"], expires_at=entry.get("expiresAt"))
+
+class _FileLock:
+    def __init__(self, path: str):
+        self.path = path
+        self._file = None
+
+    def __enter__(self):
+        if fcntl is not None:
+            self._file = open(self.path, "a")
+            fcntl.flock(self._file, fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, *exc_info):
+        if self._file is not None:
+            fcntl.flock(self._file, fcntl.LOCK_UN)
+            self._file.close()
+            self._file = None
+
+_STATE_STORE: Optional[StateStore] = None
+_STATE_STORE_LOCK = threading.Lock()
+
+def get_state_store() -> StateStore:
+    """Return the container-wide state store selected by STATE_STORE_BACKEND ("dynamodb" or "file")."""
+    global _STATE_STORE
+    with _STATE_STORE_LOCK:
+        if _STATE_STORE is None:
+            backend = Utils.get_environment_variable("STATE_STORE_BACKEND", default="dynamodb").lower()
+            if backend == "file":
+                _STATE_STORE = LocalFileStateStore(Utils.get_environment_variable("STATE_STORE_PATH", default=DEFAULT_STATE_FILE_PATH))
+            elif backend == "dynamodb":
+                _STATE_STORE = DynamoDBStateStore(Utils.get_environment_variable("STATE_TABLE_NAME", default=DEFAULT_STATE_TABLE_NAME))
+            else:
+                raise StateStoreError(f"Unknown STATE_STORE_BACKEND: {backend}")
+            LOGGER.info("Using %s for runtime state.", type(_STATE_STORE).__name__)
+        return _STATE_STORE
+
+def set_state_store(state_store: Optional[StateStore]) -> None:
+    """Override the container-wide state store (tests, local runs). Pass None to reset."""
+    global _STATE_STORE
+    with _STATE_STORE_LOCK:
+        _STATE_STORE = state_store
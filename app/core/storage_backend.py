@@ -0,0 +1,406 @@
+import copy, json, sqlite3, threading
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from decimal import Decimal
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+from boto3.dynamodb.conditions import Attr, ConditionBase
+from app.common.deadline import Deadline
+from app.common.logger import get_logger
+from app.common.utils import Utils
+from app.core.exceptions import DatabaseQueryError
+
+LOGGER = get_logger(__name__)
+
+DEFAULT_SQLITE_PATH = "/tmp/too_good_notify.db"
+
+class StorageBackend(ABC):
+    """
+    Item storage used by the notification pipeline, with DynamoDB semantics (items are dicts, numbers are Decimal,
+    conditions are boto3 condition expressions). DatabaseHandler implements it on DynamoDB; the SQLite and in-memory
+    backends run the same pipeline locally, for load tests and self-hosted deployments.
+    """
+    table_name: str
+
+    @abstractmethod
+    def get_item(self, key: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        ...
+
+    @abstractmethod
+    def batch_get_items(
+        self,
+        keys: Sequence[Dict[str, Any]],
+        deadline: Optional[Deadline] = None
+    ) -> List[Dict[str, Any]]:
+        """Retrieve several items by full primary key. Missing items are left out of the result."""
+        ...
+
+    @abstractmethod
+    def put_item(self, item_data: Dict[str, Any]) -> None:
+        ...
+
+    @abstractmethod
+    def batch_put_items(self, items: Sequence[Dict[str, Any]]) -> None:
+        ...
+
+    @abstractmethod
+    def put_item_with_condition(
+        self,
+        item_data: Dict[str, Any],
+        condition: ConditionBase,
+        deadline: Optional[Deadline] = None
+    ) -> bool:
+        """Insert an item only if the condition holds on the stored item. Return False if the condition failed."""
+        ...
+
+    def put_item_if_absent(
+        self,
+        item_data: Dict[str, Any],
+        key_name: str,
+        deadline: Optional[Deadline] = None
+    ) -> bool:
+        """Insert an item only if no item with the same primary key exists. Return False if it already exists."""
+        return self.put_item_with_condition(item_data, Attr(key_name).not_exists(), deadline=deadline)
+
+    @abstractmethod
+    def delete_item(self, key_name: str, key_value: Any) -> None:
+        ...
+
+    @abstractmethod
+    def batch_delete_items(self, keys: Sequence[Dict[str, Any]]) -> None:
+        """Delete several items by full primary key."""
+        ...
+
+    @abstractmethod
+    def get_items(self, attribute_name: str, attribute_value: Any) -> List[Dict[str, Any]]:
+        """Retrieve items by filtering based on an attribute value."""
+        ...
+
+    @abstractmethod
+    def scan_items(self) -> Iterator[Dict[str, Any]]:
+        """Iterate over every item of the table. Meant for maintenance jobs, never for the notification path."""
+        ...
+
+class LocalStorageBackend(StorageBackend):
+    """Shared logic of the local backends: key extraction and evaluation of boto3 conditions against stored items."""
+    def __init__(
+        self,
+        table_name: str,
+        key_names: Sequence[str]
+    ):
+        self.table_name = table_name
+        self.key_names = tuple(key_names)
+
+    def _key_of(self, item: Dict[str, Any]) -> Tuple[Any, ...]:
+        try:
+            return tuple(_normalize(item[key_name]) for key_name in self.key_names)
+
+        except KeyError as e:
+            raise DatabaseQueryError(f"Item for {self.table_name} is missing key attribute {e}", query=str(item)) from e
+
+    def put_item_with_condition(
+        self,
+        item_data: Dict[str, Any],
+        condition: ConditionBase,
+        deadline: Optional[Deadline] = None
+    ) -> bool:
+        if deadline is not None:
+            deadline.check(f"conditional put into {self.table_name}")
+        with self._write_lock():
+            current = self.get_item({key_name: item_data[key_name] for key_name in self.key_names}) or {}
+            if not evaluate_condition(condition, current):
+                LOGGER.debug("Condition not met in %s, item skipped: %s", self.table_name, item_data)
+                return False
+            self.put_item(item_data)
+            return True
+
+    @abstractmethod
+    def _write_lock(self):
+        """Lock making a conditional put atomic with respect to other writers of the same backend."""
+        ...
+
+class InMemoryStorageBackend(LocalStorageBackend):
+    """Items kept in process memory. Tables are shared by name within the process, like a real database."""
+    _tables: Dict[str, Dict[Tuple[Any, ...], Dict[str, Any]]] = {}
+    _lock = threading.RLock()
+
+    def __init__(
+        self,
+        table_name: str,
+        key_names: Sequence[str]
+    ):
+        super().__init__(table_name, key_names)
+        with self._lock:
+            self._items = self._tables.setdefault(table_name, {})
+
+    @classmethod
+    def clear(cls) -> None:
+        with cls._lock:
+            cls._tables.clear()
+
+    def get_item(self, key: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            item = self._items.get(self._key_of(key))
+            return copy.deepcopy(item) if item is not None else None
+
+    def batch_get_items(
+        self,
+        keys: Sequence[Dict[str, Any]],
+        deadline: Optional[Deadline] = None
+    ) -> List[Dict[str, Any]]:
+        if deadline is not None:
+            deadline.check(f"batch get from {self.table_name}")
+        with self._lock:
+            return [copy.deepcopy(item) for item in (self._items.get(self._key_of(key)) for key in keys) if item is not None]
+
+    def put_item(self, item_data: Dict[str, Any]) -> None:
+        with self._lock:
+            self._items[self._key_of(item_data)] = copy.deepcopy(item_data)
+
+    def batch_put_items(self, items: Sequence[Dict[str, Any]]) -> None:
+        with self._lock:
+            for item_data in items:
+                self._items[self._key_of(item_data)] = copy.deepcopy(item_data)
+
+    def delete_item(self, key_name: str, key_value: Any) -> None:
+        with self._lock:
+            for key in [key for key, item in self._items.items() if _normalize(item.get(key_name)) == _normalize(key_value)]:
+                del self._items[key]
+
+    def batch_delete_items(self, keys: Sequence[Dict[str, Any]]) -> None:
+        with self._lock:
+            for key in keys:
+                self._items.pop(self._key_of(key), None)
+
+    def get_items(self, attribute_name: str, attribute_value: Any) -> List[Dict[str, Any]]:
+        with self._lock:
+            return [
+                copy.deepcopy(item) for item in self._items.values()
+                if _normalize(item.get(attribute_name)) == _normalize(attribute_value)
+            ]
+
+    def scan_items(self) -> Iterator[Dict[str, Any]]:
+        with self._lock:
+            items = [copy.deepcopy(item) for item in self._items.values()]
+        return iter(items)
+
+    def _write_lock(self):
+        return self._lock
+
+class SQLiteStorageBackend(LocalStorageBackend):
+    """
+    Items stored as JSON in a SQLite table (WAL mode) whose primary key is the item key, e.g. storeId + date
+    for UserNotifications, so key lookups and per-store queries are index seeks. All tables of a database file share
+    one connection per process, guarded by one lock. A conditional put runs in an IMMEDIATE transaction, so it is
+    atomic against other processes writing to the same file too.
+    """
+    _connections: Dict[str, Tuple[sqlite3.Connection, threading.RLock]] = {}
+    _connections_lock = threading.Lock()
+
+    def __init__(
+        self,
+        table_name: str,
+        key_names: Sequence[str],
+        path: str = DEFAULT_SQLITE_PATH
+    ):
+        super().__init__(table_name, key_names)
+        if not 1 <= len(self.key_names) <= 2:
+            raise ValueError("SQLite storage supports a partition key and an optional sort key.")
+        self.path = path
+        self._connection, self._lock = self._connect(path)
+        self._table = '"' + table_name.replace('"', '""') + '"'
+        self._execute(
+            f"CREATE TABLE IF NOT EXISTS {self._table} ("
+            "partition_key TEXT NOT NULL, sort_key TEXT NOT NULL DEFAULT '', data TEXT NOT NULL, "
+            "PRIMARY KEY (partition_key, sort_key)) WITHOUT ROWID"
+        )
+
+    @classmethod
+    def _connect(cls, path: str) -> Tuple[sqlite3.Connection, threading.RLock]:
+        """The connection to the database file at `path` and the lock serializing its use, created on first use."""
+        with cls._connections_lock:
+            if path not in cls._connections:
+                connection = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+                connection.execute("PRAGMA journal_mode=WAL")
+                connection.execute("PRAGMA synchronous=NORMAL")
+                cls._connections[path] = (connection, threading.RLock())
+            return cls._connections[path]
+
+    @classmethod
+    def close_all(cls) -> None:
+        with cls._connections_lock:
+            for connection, _ in cls._connections.values():
+                connection.close()
+            cls._connections.clear()
+
+    def get_item(self, key: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        row = self._execute(
+            f"SELECT data FROM {self._table} WHERE partition_key = ? AND sort_key = ?", self._row_key(key)
+        ).fetchone()
+        return _loads(row[0]) if row else None
+
+    def batch_get_items(
+        self,
+        keys: Sequence[Dict[str, Any]],
+        deadline: Optional[Deadline] = None
+    ) -> List[Dict[str, Any]]:
+        if deadline is not None:
+            deadline.check(f"batch get from {self.table_name}")
+        items = []
+        # Stay well below SQLite's limit on the number of bound parameters
+        for start in range(0, len(keys), 400):
+            chunk = [self._row_key(key) for key in keys[start:start + 400]]
+            placeholders = ", ".join("(?, ?)" for _ in chunk)
+            rows = self._execute(
+                f"SELECT data FROM {self._table} WHERE (partition_key, sort_key) IN (VALUES {placeholders})",
+                tuple(value for row_key in chunk for value in row_key)
+            ).fetchall()
+            items.extend(_loads(row[0]) for row in rows)
+        return items
+
+    def put_item(self, item_data: Dict[str, Any]) -> None:
+        self._execute(
+            f"INSERT OR REPLACE INTO {self._table} (partition_key, sort_key, data) VALUES (?, ?, ?)",
+            (*self._row_key(item_data), _dumps(item_data))
+        )
+
+    def batch_put_items(self, items: Sequence[Dict[str, Any]]) -> None:
+        rows = [(*self._row_key(item_data), _dumps(item_data)) for item_data in items]
+        with self._lock:
+            try:
+                self._connection.execute("BEGIN")
+                self._connection.executemany(
+                    f"INSERT OR REPLACE INTO {self._table} (partition_key, sort_key, data) VALUES (?, ?, ?)", rows
+                )
+                self._connection.execute("COMMIT")
+
+            except sqlite3.Error as e:
+                self._connection.execute("ROLLBACK")
+                raise DatabaseQueryError(f"Error batch writing {len(rows)} items into SQLite table {self.table_name}") from e
+
+    def delete_item(self, key_name: str, key_value: Any) -> None:
+        if key_name == self.key_names[0]:
+            self._execute(f"DELETE FROM {self._table} WHERE partition_key = ?", (_encode_key(key_value),))
+        else:
+            for item in self.get_items(key_name, key_value):
+                self._execute(f"DELETE FROM {self._table} WHERE partition_key = ? AND sort_key = ?", self._row_key(item))
+
+    def batch_delete_items(self, keys: Sequence[Dict[str, Any]]) -> None:
+        rows = [self._row_key(key) for key in keys]
+        with self._lock:
+            try:
+                self._connection.execute("BEGIN")
+                self._connection.executemany(f"DELETE FROM {self._table} WHERE partition_key = ? AND sort_key = ?", rows)
+                self._connection.execute("COMMIT")
+
+            except sqlite3.Error as e:
+                self._connection.execute("ROLLBACK")
+                raise DatabaseQueryError(f"Error batch deleting {len(rows)} items from SQLite table {self.table_name}") from e
+
+    def get_items(self, attribute_name: str, attribute_value: Any) -> List[Dict[str, Any]]:
+        if attribute_name == self.key_names[0]:
+            rows = self._execute(
+                f"SELECT data FROM {self._table} WHERE partition_key = ? ORDER BY sort_key", (_encode_key(attribute_value),)
+            ).fetchall()
+            return [_loads(row[0]) for row in rows]
+
+        rows = self._execute(f"SELECT data FROM {self._table}").fetchall()
+        items = (_loads(row[0]) for row in rows)
+        return [item for item in items if _normalize(item.get(attribute_name)) == _normalize(attribute_value)]
+
+    def scan_items(self) -> Iterator[Dict[str, Any]]:
+        rows = self._execute(f"SELECT data FROM {self._table} ORDER BY partition_key, sort_key").fetchall()
+        return (_loads(row[0]) for row in rows)
+
+    def _row_key(self, item: Dict[str, Any]) -> Tuple[str, str]:
+        key = self._key_of(item)
+        return _encode_key(key[0]), _encode_key(key[1]) if len(key) > 1 else ""
+
+    def _execute(self, statement: str, parameters: tuple = ()) -> sqlite3.Cursor:
+        try:
+            with self._lock:
+                return self._connection.execute(statement, parameters)
+
+        except sqlite3.Error as e:
+            raise DatabaseQueryError(f"Error querying SQLite table {self.table_name}", query=statement) from e
+
+    @contextmanager
+    def _write_lock(self):
+        """The connection lock plus an IMMEDIATE transaction, which holds the database write lock across processes."""
+        with self._lock:
+            self._execute("BEGIN IMMEDIATE")
+            try:
+                yield
+
+            except BaseException:
+                self._connection.execute("ROLLBACK")
+                raise
+            self._execute("COMMIT")
+
+_CONDITION_OPERATORS: Dict[str, Callable[..., bool]] = {
+    "=": lambda a, b: a == b,
+    "<>": lambda a, b: a != b,
+    "<": lambda a, b: a is not None and a < b,
+    "<=": lambda a, b: a is not None and a <= b,
+    ">": lambda a, b: a is not None and a > b,
+    ">=": lambda a, b: a is not None and a >= b,
+    "BETWEEN": lambda a, low, high: a is not None and low <= a <= high,
+    "IN": lambda a, values: a in [_normalize(value) for value in values],
+    "begins_with": lambda a, prefix: isinstance(a, str) and a.startswith(prefix),
+    "contains": lambda a, value: a is not None and value in a,
+}
+
+def evaluate_condition(condition: ConditionBase, item: Dict[str, Any]) -> bool:
+    """Evaluate a boto3 condition expression against an item, as DynamoDB would for a conditional write."""
+    expression = condition.get_expression()
+    operator, values = expression["operator"], expression["values"]
+    if operator == "AND":
+        return all(evaluate_condition(value, item) for value in values)
+    if operator == "OR":
+        return any(evaluate_condition(value, item) for value in values)
+    if operator == "NOT":
+        return not evaluate_condition(values[0], item)
+    if operator == "attribute_exists":
+        return values[0].name in item
+    if operator == "attribute_not_exists":
+        return values[0].name not in item
+
+    if operator not in _CONDITION_OPERATORS:
+        raise DatabaseQueryError(f"Condition operator {operator} is not supported by local storage backends")
+    resolved = [_normalize(item.get(value.name)) if isinstance(value, Attr) else _normalize(value) for value in values]
+    return _CONDITION_OPERATORS[operator](*resolved)
+
+def _normalize(value: Any) -> Any:
+    """Compare numbers the way DynamoDB does, regardless of int/float/Decimal."""
+    if isinstance(value, bool) or not isinstance(value, (int, float, Decimal)):
+        return value
+    return Decimal(str(value))
+
+def _encode_key(value: Any) -> str:
+    return str(_normalize(value))
+
+def _dumps(item: Dict[str, Any]) -> str:
+    return json.dumps(item, default=_encode_decimal, separators=(",", ":"))
+
+def _loads(data: str) -> Dict[str, Any]:
+    # DynamoDB returns every number as Decimal, keep the same contract
+    return json.loads(data, parse_float=Decimal, parse_int=Decimal)
+
+def _encode_decimal(value: Any) -> Any:
+    if isinstance(value, Decimal):
+        return int(value) if value == value.to_integral_value() else float(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+def create_storage_backend(
+    table_name: str,
+    key_names: Sequence[str]
+) -> StorageBackend:
+    """Return the storage backend selected by STORAGE_BACKEND ("dynamodb", "sqlite" or "memory") for a table."""
+    backend = Utils.get_environment_variable("STORAGE_BACKEND", default="dynamodb").lower()
+    if backend == "dynamodb":
+        from app.core.database_handler import DatabaseHandler
+        return DatabaseHandler(table_name=table_name)
+    if backend == "sqlite":
+        return SQLiteStorageBackend(table_name, key_names, Utils.get_environment_variable("STORAGE_SQLITE_PATH", default=DEFAULT_SQLITE_PATH))
+    if backend == "memory":
+        return InMemoryStorageBackend(table_name, key_names)
+    raise ValueError(f"Unknown STORAGE_BACKEND: {backend}")
@@ -1,13 +1,21 @@
-import json
-from typing import Dict, Optional
+import hashlib, json
+from typing import Dict, List, Optional
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup, BotCommand
 from telegram.ext import ApplicationBuilder, ContextTypes, CommandHandler, CallbackQueryHandler, MessageHandler, filters
 from telegram.constants import ParseMode
+from telegram.error import NetworkError, RetryAfter
+from app.common import json_codec
 from app.common.utils import Utils
-from app.common.logger import LOGGER
+from app.common.logger import get_logger
+from app.common.metrics import METRICS
+from app.core.exceptions import DatabaseError, DeadlineExceededError, StateStoreError
 from app.core.scheduler import Scheduler
+from app.core.state_store import StateStore, get_state_store
+from app.core.update_deduplicator import UpdateDeduplicator
 from app.common.constants import WELCOME_GIF_URL
 
+LOGGER = get_logger(__name__)
+
 CALLBACK_DATA_START = "start"
 CALLBACK_DATA_HELP = "help"
 CALLBACK_DATA_SETTINGS = "settings"
@@ -17,11 +25,14 @@ CALLBACK_DATA_WAKE_UP_BOT = "wakeup"
 CALLBACK_DATA_ABOUT = "about"
 CALLBACK_DATA_LANGUAGE = "languagesettings"
 LANGUAGE_OPTIONS = {"en": "🇬🇧 English", "fr": "🇫🇷 Français"}
+BOT_COMMANDS_STATE_KEY = "telegram_bot_commands"
+TRANSIENT_UPDATE_ERRORS = (NetworkError, RetryAfter, StateStoreError, DatabaseError, DeadlineExceededError, ConnectionError, TimeoutError)
 
 class TelegramBotHandler:
     def __init__(
         self, 
-        scheduler: Scheduler
+        scheduler: Scheduler,
+        state_store: Optional[StateStore] = None
     ):
         LOGGER.info("Initializing TelegramBotHandler")
         telegram_token = Utils.get_environment_variable("TELEGRAM_BOT_TOKEN")
@@ -33,6 +44,12 @@ class TelegramBotHandler:
         aws_region = Utils.get_environment_variable("DEFAULT_AWS_REGION")
         self.telegram_lambda_arn = f"arn:aws:lambda:{aws_region}:{aws_account_id}:function:too-good-notify-telegram-webhook"
         self.scheduler = scheduler
+        self.state_store = state_store or get_state_store()
+        # The shared store costs a conditional write per webhook, only worth it when updates can reach several containers
+        shared_deduplication = Utils.get_environment_variable("TELEGRAM_SHARED_DEDUP", default="false").lower() == "true"
+        self.update_deduplicator = UpdateDeduplicator(self.state_store if shared_deduplication else None)
+        self._initialized = False
+        self._published_commands_hash: Optional[str] = None
         self._register_handlers()
         LOGGER.info(f"TelegramBotHandler initialized with: user_language={self.user_language}")
 
@@ -258,9 +275,9 @@ class TelegramBotHandler:
         """Retrieve localized text based on the user's selected language."""
         return Utils.localize(message_key, self.user_language, self.localizable_strings)
 
-    async def _set_bot_commands(self):
-        """Register bot commands for Telegram UI."""
-        commands = [
+    def _get_bot_commands(self) -> List[BotCommand]:
+        """Bot commands shown in the Telegram UI, localized in the user's language."""
+        return [
             BotCommand("start", self._get_localized_text("command_start")),
             BotCommand("settings", self._get_localized_text("command_settings")),
             BotCommand("status", self._get_localized_text("command_bot_status")),
@@ -269,20 +286,86 @@ class TelegramBotHandler:
             BotCommand("help", self._get_localized_text("command_help")),
             BotCommand("about", self._get_localized_text("command_about")),
         ]
-        await self.application.bot.set_my_commands(commands)
+
+    @staticmethod
+    def _hash_bot_commands(commands: List[BotCommand]) -> str:
+        content = json.dumps([[command.command, command.description] for command in commands], ensure_ascii=False)
+        return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+    async def _set_bot_commands(self):
+        """Register bot commands for Telegram UI, only when their localized content changed since the last publication."""
+        commands = self._get_bot_commands()
+        commands_hash = self._hash_bot_commands(commands)
+        if commands_hash == self._published_commands_hash:
+            return
+
+        record = self.state_store.get(BOT_COMMANDS_STATE_KEY)
+        if record is None or record.value.get("hash") != commands_hash:
+            await self.application.bot.set_my_commands(commands)
+            self.state_store.put(BOT_COMMANDS_STATE_KEY, {"hash": commands_hash})
+            LOGGER.info("Telegram bot commands published.")
+        self._published_commands_hash = commands_hash
+
+    async def _ensure_initialized(self) -> None:
+        """
+        Initialize the application (getMe) once per container and keep it for warm invocations.
+        Publishing the bot commands is best-effort: a failure is logged and retried on the next update.
+        """
+        if not self._initialized:
+            await self.application.initialize()
+            self._initialized = True
+        try:
+            await self._set_bot_commands()
+
+        except Exception as e:
+            LOGGER.warning("Unable to publish Telegram bot commands, will retry on the next update: %s", e)
     
     async def start(self, event: Dict) -> None:
-        """Process incoming Telegram webhook event."""
+        """
+        Process incoming Telegram webhook event with the already initialized application. Re-deliveries are skipped.
+        A claimed update that fails on a transient error (network, storage, deadline) is released and the error re-raised,
+        so Telegram redelivers it; any other error is logged and the update kept claimed, so it is not redelivered forever.
+        """
+        try:
+            METRICS.add_bytes("TelegramUpdateBytes", len(event["body"]))
+            update_data = json_codec.loads(event["body"])
+            update_id = update_data.get("update_id")
+            with METRICS.timer("UpdateClaim"):
+                is_claimed = update_id is None or self.update_deduplicator.claim(update_id)
+
+        except Exception as e:
+            LOGGER.error("Error in TelegramNotifier, unreadable update: %s", e)
+            return
+
+        if not is_claimed:
+            LOGGER.info("Telegram update %s already processed, skipping duplicate delivery.", update_id)
+            METRICS.increment("DuplicateUpdates")
+            return
+
         try:
             LOGGER.info("Starting TelegramNotifier application.")
-            await self.application.initialize()
-            await self._set_bot_commands()
-            update = Update.de_json(json.loads(event["body"]), self.application.bot)
-            await self.application.process_update(update)
+            with METRICS.timer("BotInitialize"):
+                await self._ensure_initialized()
+            update = Update.de_json(update_data, self.application.bot)
+            with METRICS.timer("UpdateProcess"):
+                await self.application.process_update(update)
 
         except Exception as e:
-            LOGGER.error(f"Error in TelegramNotifier: {e}")
+            if not self._is_transient(e):
+                LOGGER.error("Error in TelegramNotifier while processing update %s, dropping it: %s", update_id, e)
+                METRICS.increment("DroppedUpdates")
+                return
+
+            LOGGER.error("Transient error in TelegramNotifier while processing update %s: %s", update_id, e)
+            if update_id is not None:
+                self.update_deduplicator.release(update_id)
+            raise
 
-        finally:
-            await self.application.shutdown()
-            LOGGER.info("TelegramNotifier application shutdown.")
\ No newline at end of file
+    @staticmethod
+    def _is_transient(error: Exception) -> bool:
+        """Whether a redelivery of the update may succeed, as opposed to a deterministic failure."""
+        if isinstance(error, TRANSIENT_UPDATE_ERRORS):
+            return True
+        # botocore is only loaded once a DynamoDB backend is in use, keep it off the cold start path
+        from botocore.exceptions import BotoCoreError
+        return isinstance(error, BotoCoreError)
@@ -0,0 +1,65 @@
+import threading
+from collections import OrderedDict
+from typing import Optional
+from app.common.logger import get_logger
+from app.core.state_store import StateStore
+
+LOGGER = get_logger(__name__)
+
+DEFAULT_CAPACITY = 1024
+DEFAULT_TTL = 24 * 3600  # Seconds, Telegram stops re-delivering an update after 24 hours
+UPDATE_STATE_KEY_PREFIX = "telegram_update:"
+
+class UpdateDeduplicator:
+    """
+    Remembers recently processed Telegram update_ids so re-delivered webhooks are acknowledged without running handlers.
+    An in-process LRU answers warm duplicates for free; the optional shared state store catches duplicates
+    that land on another container, claiming each update_id with a conditional write. A claim whose processing
+    failed is released, so Telegram's redelivery of that update is processed again.
+    """
+    def __init__(
+        self,
+        state_store: Optional[StateStore] = None,
+        capacity: int = DEFAULT_CAPACITY,
+        ttl_seconds: int = DEFAULT_TTL
+    ):
+        self.state_store = state_store
+        self.capacity = capacity
+        self.ttl_seconds = ttl_seconds
+        self._seen: "OrderedDict[int, None]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def claim(self, update_id: int) -> bool:
+        """Return True if this update has not been seen yet and should be processed, False if it is a duplicate."""
+        with self._lock:
+            if update_id in self._seen:
+                self._seen.move_to_end(update_id)
+                return False
+            self._remember(update_id)
+
+        if self.state_store is None:
+            return True
+        try:
+            return self.state_store.put_if_absent(f"{UPDATE_STATE_KEY_PREFIX}{update_id}", {"update_id": update_id}, ttl_seconds=self.ttl_seconds)
+
+        except Exception as e:
+            LOGGER.warning("Unable to claim Telegram update %s in the state store, processing it anyway: %s", update_id, e)
+            return True
+
+    def release(self, update_id: int) -> None:
+        """Forget a claimed update whose processing failed, so its redelivery is not mistaken for a duplicate."""
+        with self._lock:
+            self._seen.pop(update_id, None)
+
+        if self.state_store is None:
+            return
+        try:
+            self.state_store.delete(f"{UPDATE_STATE_KEY_PREFIX}{update_id}")
+
+        except Exception as e:
+            LOGGER.warning("Unable to release Telegram update %s in the state store, its redelivery will be skipped: %s", update_id, e)
+
+    def _remember(self, update_id: int) -> None:
+        self._seen[update_id] = None
+        if len(self._seen) > self.capacity:
+            self._seen.popitem(last=False)
@@ -1,28 +1,71 @@
-import asyncio, re
-from typing import Any, Dict, Union
-from app.common.logger import LOGGER
-from app.core.scheduler import Scheduler
-from app.services.tgtg_service_monitor import TgtgServiceMonitor
-from app.services.telegram_service import TelegramService
-from app.common.utils import Utils
-from dotenv import load_dotenv
+import os, re
+from typing import TYPE_CHECKING, Any, Dict, Optional, Union
+from app.common.logger import PayloadSample, get_logger
+from app.common.metrics import METRICS
 
+if TYPE_CHECKING:
+    import asyncio
+    from app.services.telegram_service import TelegramService
+
+LOGGER = get_logger(__name__)
+
+# Each entry point imports only its own dependency graph inside the handler: the monitoring Lambda never loads
+# python-telegram-bot and the webhook Lambda never loads pydantic or the TGTG client, which keeps cold starts short.
 MONITORING_EVENT_PATTERN = r"TooGoodToGo_monitoring_invocation_rule_"
-load_dotenv()
+MONITORING_HANDLER_NAME = "app.handlers.tgtg_monitoring_handler"
+
+# Kept for the life of the container: the Telegram application stays initialized across warm invocations,
+# and its HTTP connections are bound to this event loop
+_EVENT_LOOP: Optional["asyncio.AbstractEventLoop"] = None
+_TELEGRAM_SERVICE: Optional["TelegramService"] = None
+
+def _load_local_environment() -> None:
+    """
+    Load a .env file. Locally it is searched for like python-dotenv does; in Lambda only the task root is checked,
+    so python-dotenv is imported only by deployments that ship a .env file next to the code.
+    """
+    if not os.getenv("AWS_LAMBDA_FUNCTION_NAME"):
+        from dotenv import load_dotenv
+        load_dotenv()
+        return
+    task_root = os.getenv("LAMBDA_TASK_ROOT", os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    dotenv_path = os.path.join(task_root, ".env")
+    if os.path.isfile(dotenv_path):
+        from dotenv import load_dotenv
+        load_dotenv(dotenv_path)
+
+def _prewarm_tgtg_connection() -> None:
+    """Open the TGTG connection during the init phase of the monitoring Lambda, so warm invocations find it open."""
+    if os.getenv("TGTG_PREWARM_CONNECTION", "false").lower() != "true":
+        return
+    if os.getenv("_HANDLER", MONITORING_HANDLER_NAME) != MONITORING_HANDLER_NAME:
+        return
+    from app.services.tgtg_service_monitor import TgtgServiceMonitor
+    TgtgServiceMonitor().prewarm_connection()
+
+_load_local_environment()
+_prewarm_tgtg_connection()
 
 def tgtg_monitoring_handler(
-    event: Dict[str, Any], 
+    event: Dict[str, Any],
     context: Any
 ):
     """Handle monitoring of the TGTG API based on event scheduling rules."""
-    LOGGER.info(f"Launching monitoring of TGTG API with event: {event} - context: {context}")
+    LOGGER.info("Launching monitoring of TGTG API.")
+    LOGGER.debug("Monitoring event: %s - context: %s", event, context)
 
     if _is_monitoring_event(event):
-        scheduler = Scheduler()
+        from app.common.deadline import Deadline
+        from app.core.scheduler import Scheduler
+        from app.services.tgtg_service_monitor import TgtgServiceMonitor
+
+        with METRICS.invocation("Monitoring"):
+            deadline = Deadline.from_lambda_context(context)
+            scheduler = Scheduler()
 
-        if not scheduler.is_bot_paused():
-            tgtg_service_monitor = TgtgServiceMonitor()
-            tgtg_service_monitor.start_monitoring(scheduler)
+            if not scheduler.is_bot_paused():
+                tgtg_service_monitor = TgtgServiceMonitor()
+                tgtg_service_monitor.start_monitoring(scheduler, deadline=deadline)
     else:
         LOGGER.info("Monitoring TGTG not launched - wrong scheduling event")
 
@@ -34,33 +77,57 @@ def _is_monitoring_event(
     return any(re.search(MONITORING_EVENT_PATTERN, resource) for resource in resources)
 
 def lambda_scheduler(
-    event: Dict[str, Any], 
+    event: Dict[str, Any],
     context: Any
 ) -> None:
     """Invoke the scheduler to set up the next monitoring event."""
+    from app.core.scheduler import Scheduler
+
     LOGGER.info("lambda_scheduler - Scheduling next invocation")
-    scheduler = Scheduler()
-    scheduler.schedule_next_invocation()
+    with METRICS.invocation("Scheduler"):
+        scheduler = Scheduler()
+        scheduler.schedule_next_invocation()
 
 def telegram_webhook_handler(
-    event: Dict[str, Any], 
+    event: Dict[str, Any],
     context: Any
 ) -> Dict[str, Union[int, Dict[str, str]]]:
     """Handle the Telegram webhook in a synchronous Lambda-compatible way."""
-    return asyncio.get_event_loop().run_until_complete(run_telegram_webhook(event, context))
+    return _get_event_loop().run_until_complete(run_telegram_webhook(event, context))
+
+def _get_event_loop() -> "asyncio.AbstractEventLoop":
+    import asyncio
+
+    global _EVENT_LOOP
+    if _EVENT_LOOP is None or _EVENT_LOOP.is_closed():
+        _EVENT_LOOP = asyncio.new_event_loop()
+        asyncio.set_event_loop(_EVENT_LOOP)
+    return _EVENT_LOOP
+
+def _get_telegram_service() -> "TelegramService":
+    global _TELEGRAM_SERVICE
+    if _TELEGRAM_SERVICE is None:
+        from app.core.scheduler import Scheduler
+        from app.services.telegram_service import TelegramService
+
+        _TELEGRAM_SERVICE = TelegramService(Scheduler())
+    return _TELEGRAM_SERVICE
 
 async def run_telegram_webhook(
-    event: Dict[str, Any], 
+    event: Dict[str, Any],
     context: Any
 ) -> Dict[str, Union[int, Dict[str, str]]]:
     """Process the Telegram webhook event asynchronously."""
-    LOGGER.info(f"Telegram Webhook triggered - event: {event}")
+    from app.common.utils import Utils
+
+    LOGGER.info("Telegram Webhook triggered.")
+    LOGGER.debug("Webhook event: %s", PayloadSample(event))
     try:
-        scheduler = Scheduler()
-        telegram_service = TelegramService(scheduler)
-        await telegram_service.process_webhook(event)
+        with METRICS.invocation("TelegramWebhook"):
+            telegram_service = _get_telegram_service()
+            await telegram_service.process_webhook(event)
         return Utils.ok_response()
 
     except Exception as e:
-        LOGGER.error(f"Error in Telegram webhook: {str(e)}")
-        return Utils.error_response("Oops, something went wrong with Telegram Notifier!")
\ No newline at end of file
+        LOGGER.error("Error in Telegram webhook: %s", e)
+        return Utils.error_response("Oops, something went wrong with Telegram Notifier!")
@@ -1,6 +1,8 @@
 from app.core.telegram_bot_handler import TelegramBotHandler
 from app.core.scheduler import Scheduler
-from app.common.logger import LOGGER
+from app.common.logger import PayloadSample, get_logger
+
+LOGGER = get_logger(__name__)
 
 class TelegramService:
     def __init__(
@@ -10,5 +12,5 @@ class TelegramService:
         self.bot_handler = TelegramBotHandler(scheduler)
 
     async def process_webhook(self, event):
-        LOGGER.info(f"Processing Telegram webhook with event: {event}")
+        LOGGER.debug("Processing Telegram webhook with event: %s", PayloadSample(event))
         await self.bot_handler.start(event=event)
\ No newline at end of file
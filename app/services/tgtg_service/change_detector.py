@@ -0,0 +1,293 @@
+import threading, pytz
+from boto3.dynamodb.conditions import Attr
+from dataclasses import dataclass, replace
+from datetime import datetime, timedelta
+from enum import Enum
+from typing import Any, Dict, List, Optional, Tuple
+from app.common.deadline import Deadline
+from app.common.logger import get_logger
+from app.common.metrics import METRICS
+from app.core.exceptions import DatabaseQueryError, DeadlineExceededError
+from app.core.storage_backend import StorageBackend
+from app.services.tgtg_service.favorite_record import FavoriteRecord
+
+LOGGER = get_logger(__name__)
+
+class StockEventType(str, Enum):
+    RESTOCK = "restock"
+    SOLD_OUT = "sold_out"
+    NEW_PICKUP_SLOT = "new_pickup_slot"
+    PRICE_CHANGE = "price_change"
+
+@dataclass(frozen=True)
+class StoreSnapshot:
+    """State of a store's favorite item at one poll. Fields missing from rows written by older versions are None."""
+    store_id: str
+    items_available: int
+    price_minor_units: Optional[int] = None
+    price_decimals: Optional[int] = None
+    price_code: Optional[str] = None
+    pickup_start: Optional[str] = None
+    pickup_end: Optional[str] = None
+    version: Optional[int] = None
+    expires_at: Optional[int] = None
+
+    @classmethod
+    def from_favorite(cls, favorite: FavoriteRecord) -> "StoreSnapshot":
+        return cls(
+            store_id=favorite.store_id,
+            items_available=favorite.items_available,
+            price_minor_units=favorite.price.minor_units,
+            price_decimals=favorite.price.decimals,
+            price_code=favorite.price.code,
+            pickup_start=favorite.pickup_start,
+            pickup_end=favorite.pickup_end,
+        )
+
+    @classmethod
+    def from_item(cls, item: Dict[str, Any]) -> "StoreSnapshot":
+        return cls(
+            store_id=str(item["storeId"]),
+            items_available=int(item.get("itemsAvailable", 0)),
+            price_minor_units=_optional_int(item.get("priceMinorUnits")),
+            price_decimals=_optional_int(item.get("priceDecimals")),
+            price_code=item.get("priceCode"),
+            pickup_start=item.get("pickupStart"),
+            pickup_end=item.get("pickupEnd"),
+            version=_optional_int(item.get("version")),
+            expires_at=_optional_int(item.get("expiresAt")),
+        )
+
+    def to_item(self, version: int, now: datetime, retention: timedelta) -> Dict[str, Any]:
+        item = {
+            "storeId": self.store_id,
+            "itemsAvailable": self.items_available,
+            "priceMinorUnits": self.price_minor_units,
+            "priceDecimals": self.price_decimals,
+            "priceCode": self.price_code,
+            "pickupStart": self.pickup_start,
+            "pickupEnd": self.pickup_end,
+            "version": version,
+            "updatedAt": now.isoformat(),
+            "expiresAt": int((now + retention).timestamp()),
+        }
+        return {name: value for name, value in item.items() if value is not None}
+
+    @property
+    def state(self) -> Tuple[Any, ...]:
+        """The polled fields, without bookkeeping (version, expiry)."""
+        return (self.items_available, self.price_minor_units, self.price_decimals, self.price_code, self.pickup_start, self.pickup_end)
+
+@dataclass(frozen=True)
+class StockEvent:
+    event_type: StockEventType
+    favorite: FavoriteRecord
+    previous: Optional[StoreSnapshot]
+    current: StoreSnapshot
+    observed_at: Optional[int] = None  # Epoch seconds of the poll that saw the change
+    appeared_after: Optional[int] = None  # Epoch seconds of the previous poll, when this container made it
+
+def diff_snapshots(
+    previous: Optional[StoreSnapshot],
+    current: StoreSnapshot
+) -> List[StockEventType]:
+    """
+    Events between two consecutive polls of a store. A store seen for the first time counts as a restock if it has bags.
+    Pickup slot and price changes are only reported while bags are available, and never against a snapshot lacking them.
+    """
+    was_available = previous is not None and previous.items_available > 0
+    is_available = current.items_available > 0
+    if is_available and not was_available:
+        return [StockEventType.RESTOCK]
+    if was_available and not is_available:
+        return [StockEventType.SOLD_OUT]
+    if not is_available:
+        return []
+
+    events = []
+    if previous.pickup_start is not None and (previous.pickup_start, previous.pickup_end) != (current.pickup_start, current.pickup_end):
+        events.append(StockEventType.NEW_PICKUP_SLOT)
+    if previous.price_minor_units is not None and (
+        (previous.price_minor_units, previous.price_decimals, previous.price_code) != (current.price_minor_units, current.price_decimals, current.price_code)
+    ):
+        events.append(StockEventType.PRICE_CHANGE)
+    return events
+
+def store_favorites(favorites: List[FavoriteRecord]) -> Dict[str, FavoriteRecord]:
+    """
+    One favorite per store, in favorites order, as snapshots are kept per store. A store with several favorite bags
+    counts the bags of all of them, and takes its price and pickup slot from the first one that has bags left.
+    """
+    by_store: Dict[str, List[FavoriteRecord]] = {}
+    for favorite in favorites:
+        by_store.setdefault(favorite.store_id, []).append(favorite)
+    merged = {}
+    for store_id, store_bags in by_store.items():
+        if len(store_bags) == 1:
+            merged[store_id] = store_bags[0]
+            continue
+        representative = next((favorite for favorite in store_bags if favorite.items_available > 0), store_bags[0])
+        merged[store_id] = replace(representative, items_available=sum(max(0, favorite.items_available) for favorite in store_bags))
+    return merged
+
+class ChangeDetector:
+    """
+    Turns each poll of the favorites into stock events, by diffing it against the last stored snapshot of every store.
+    Snapshots are only rewritten when they change, with a compare-and-set on their version so two overlapping polls
+    never report the same transition twice. The container keeps the snapshots it last read or wrote: on warm
+    invocations an unchanged store costs neither a read nor a write, so the work follows the number of changes.
+    It also remembers when the container last completed a poll, which dates each change after that poll for free.
+    """
+    SNAPSHOT_RETENTION = timedelta(days=30)
+    MAX_POLL_GAP = timedelta(hours=24)  # A poll older than that says nothing about when today's bags appeared
+
+    _snapshots: Dict[Tuple[str, str], StoreSnapshot] = {}
+    _last_poll_at: Dict[str, int] = {}
+    _lock = threading.Lock()
+
+    def __init__(
+        self,
+        storage: StorageBackend
+    ):
+        self.storage = storage
+
+    @classmethod
+    def clear(cls) -> None:
+        with cls._lock:
+            cls._snapshots.clear()
+            cls._last_poll_at.clear()
+
+    def detect(
+        self,
+        favorites: List[FavoriteRecord],
+        deadline: Optional[Deadline] = None
+    ) -> List[StockEvent]:
+        """
+        Return the stock events of this poll, in favorites order. Stores left when the deadline is reached keep their
+        stored snapshot, so their changes are reported by the next poll.
+        """
+        now = datetime.now(pytz.utc)
+        previous_poll_at = self._last_poll(now)
+        current_snapshots = {
+            store_id: (StoreSnapshot.from_favorite(favorite), favorite) for store_id, favorite in store_favorites(favorites).items()
+        }
+
+        candidates = [
+            store_id for store_id, (snapshot, _) in current_snapshots.items()
+            if not self._is_unchanged(self._cached(store_id), snapshot, now)
+        ]
+        if not candidates:
+            self._record_poll(now)
+            return []
+        try:
+            previous_snapshots = self._load(candidates, deadline)
+
+        except DatabaseQueryError as e:
+            LOGGER.error("Unable to read the snapshots of %d stores, changes will be detected on the next run: %s", len(candidates), e)
+            return []
+
+        except DeadlineExceededError as e:
+            LOGGER.warning("%s Changes of %d stores will be detected on the next run.", e, len(candidates))
+            return []
+
+        events, is_complete = [], True
+        for store_id in candidates:
+            snapshot, favorite = current_snapshots[store_id]
+            previous = previous_snapshots.get(store_id)
+            if self._is_unchanged(previous, snapshot, now):
+                continue
+            try:
+                saved = self._save(previous, snapshot, now, deadline)
+
+            except DeadlineExceededError as e:
+                LOGGER.warning("%s Changes of the remaining stores will be detected on the next run.", e)
+                is_complete = False
+                break
+            if saved:
+                events.extend(
+                    StockEvent(event_type, favorite, previous, snapshot, observed_at=int(now.timestamp()), appeared_after=previous_poll_at)
+                    for event_type in diff_snapshots(previous, snapshot)
+                )
+        # A poll cut short leaves changes for the next one, which must not date them after this poll
+        if is_complete:
+            self._record_poll(now)
+
+        LOGGER.info("Detected %d stock events in %d changed stores out of %d.", len(events), len(candidates), len(current_snapshots))
+        METRICS.increment("ChangedStores", len(candidates))
+        METRICS.increment("StockEvents", len(events))
+        return events
+
+    def _is_unchanged(
+        self,
+        previous: Optional[StoreSnapshot],
+        current: StoreSnapshot,
+        now: datetime
+    ) -> bool:
+        """True if nothing needs to be written: same polled state, and a stored row not close to expiring."""
+        if previous is None or previous.state != current.state:
+            return False
+        return previous.expires_at is not None and previous.expires_at > (now + self.SNAPSHOT_RETENTION / 2).timestamp()
+
+    def _last_poll(self, now: datetime) -> Optional[int]:
+        """When this container last completed a poll of the table, unless it is too old to bound today's changes."""
+        with self._lock:
+            last_poll_at = self._last_poll_at.get(self.storage.table_name)
+        if last_poll_at is None or now.timestamp() - last_poll_at > self.MAX_POLL_GAP.total_seconds():
+            return None
+        return last_poll_at
+
+    def _record_poll(self, now: datetime) -> None:
+        with self._lock:
+            self._last_poll_at[self.storage.table_name] = int(now.timestamp())
+
+    def _load(
+        self,
+        store_ids: List[str],
+        deadline: Optional[Deadline] = None
+    ) -> Dict[str, StoreSnapshot]:
+        with METRICS.timer("SnapshotLoad"):
+            items = self.storage.batch_get_items([{"storeId": store_id} for store_id in store_ids], deadline=deadline)
+        snapshots = {str(item["storeId"]): StoreSnapshot.from_item(item) for item in items}
+        with self._lock:
+            for store_id, snapshot in snapshots.items():
+                self._snapshots[(self.storage.table_name, store_id)] = snapshot
+        return snapshots
+
+    def _save(
+        self,
+        previous: Optional[StoreSnapshot],
+        current: StoreSnapshot,
+        now: datetime,
+        deadline: Optional[Deadline]
+    ) -> bool:
+        """Write the new snapshot if the stored one is still `previous`. Return False if another poll got there first."""
+        if previous is None:
+            condition = Attr("storeId").not_exists()
+        elif previous.version is None:
+            condition = Attr("version").not_exists()
+        else:
+            condition = Attr("version").eq(previous.version)
+        version = (previous.version or 0) + 1 if previous else 1
+        item = current.to_item(version, now, self.SNAPSHOT_RETENTION)
+        try:
+            with METRICS.timer("SnapshotWrite"):
+                saved = self.storage.put_item_with_condition(item, condition, deadline=deadline)
+
+        except DatabaseQueryError as e:
+            LOGGER.error("Failed to save the snapshot of store ID %s: %s", current.store_id, e)
+            return False
+
+        with self._lock:
+            key = (self.storage.table_name, current.store_id)
+            if saved:
+                self._snapshots[key] = StoreSnapshot.from_item(item)
+            else:
+                self._snapshots.pop(key, None)
+        return saved
+
+    def _cached(self, store_id: str) -> Optional[StoreSnapshot]:
+        with self._lock:
+            return self._snapshots.get((self.storage.table_name, store_id))
+
+def _optional_int(value: Any) -> Optional[int]:
+    return int(value) if value is not None else None
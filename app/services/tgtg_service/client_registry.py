@@ -0,0 +1,98 @@
+import datetime, threading
+from typing import Dict, Optional
+from app.common.logger import get_logger
+from app.services.tgtg_service.tgtg_client import TgtgClient, BASE_URL
+
+LOGGER = get_logger(__name__)
+
+DEFAULT_ACCOUNT_KEY = "default"
+PREWARM_TIMEOUT = 2  # Seconds
+
+class TgtgClientRegistry:
+    """
+    Module-level cache of TgtgClient instances keyed by account.
+    It lives as long as the Lambda container, so warm invocations reuse the same requests.Session and its open TLS connections.
+    """
+    _clients: Dict[str, TgtgClient] = {}
+    _lock = threading.Lock()
+
+    @classmethod
+    def get_client(
+        cls,
+        email: Optional[str] = None,
+        access_token: Optional[str] = None,
+        refresh_token: Optional[str] = None,
+        cookie: Optional[str] = None,
+        last_time_token_refreshed: Optional[datetime.datetime] = None,
+        **client_kwargs
+    ) -> TgtgClient:
+        """Return the cached client for this account, creating it on first use and updating its tokens in place if the given ones are newer."""
+        account_key = cls.account_key(email)
+        with cls._lock:
+            client = cls._clients.get(account_key)
+            if client is None:
+                LOGGER.info("Creating TGTG client for account '%s'", account_key)
+                client = TgtgClient(
+                    email=email,
+                    access_token=access_token,
+                    refresh_token=refresh_token,
+                    cookie=cookie,
+                    last_time_token_refreshed=last_time_token_refreshed,
+                    **client_kwargs
+                )
+                cls._clients[account_key] = client
+            else:
+                LOGGER.debug("Reusing warm TGTG client for account '%s'", account_key)
+                cls._update_tokens(client, access_token, refresh_token, cookie, last_time_token_refreshed)
+            return client
+
+    @classmethod
+    def prewarm(
+        cls,
+        client: TgtgClient,
+        timeout: float = PREWARM_TIMEOUT
+    ) -> None:
+        """Open the TCP+TLS connection to the TGTG API ahead of time so the first real call skips DNS, TCP and TLS setup."""
+        try:
+            client.session.head(BASE_URL, proxies=client.proxies, timeout=timeout)
+            LOGGER.info("TGTG API connection pre-opened.")
+
+        except Exception as e:
+            LOGGER.warning("Failed to pre-open TGTG API connection: %s", e)
+
+    @classmethod
+    def clear(cls) -> None:
+        """Drop every cached client (used by tests and after credential resets)."""
+        with cls._lock:
+            for client in cls._clients.values():
+                client.session.close()
+            cls._clients.clear()
+
+    @staticmethod
+    def account_key(email: Optional[str]) -> str:
+        return email.lower() if email else DEFAULT_ACCOUNT_KEY
+
+    @staticmethod
+    def _update_tokens(
+        client: TgtgClient,
+        access_token: Optional[str],
+        refresh_token: Optional[str],
+        cookie: Optional[str],
+        last_time_token_refreshed: Optional[datetime.datetime]
+    ) -> None:
+        """Replace the client tokens only when the given ones were refreshed after the client's own."""
+        if (access_token, refresh_token, cookie) == (client.access_token, client.refresh_token, client.cookie):
+            return
+
+        if client.last_time_token_refreshed and (
+            not last_time_token_refreshed
+            or _as_utc(last_time_token_refreshed) <= _as_utc(client.last_time_token_refreshed)
+        ):
+            return
+
+        client.token_manager.update(access_token, refresh_token, cookie=cookie)
+        client.last_time_token_refreshed = last_time_token_refreshed
+        LOGGER.info("Updated warm TGTG client with newer tokens.")
+
+def _as_utc(value: datetime.datetime) -> datetime.datetime:
+    return value.replace(tzinfo=datetime.timezone.utc) if value.tzinfo is None else value
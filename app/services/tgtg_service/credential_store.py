@@ -0,0 +1,61 @@
+from datetime import datetime
+from typing import Optional
+from app.common.logger import get_logger
+from app.core.state_store import StateStore
+from app.services.tgtg_service.tgtg_service import Credentials
+
+LOGGER = get_logger(__name__)
+
+CREDENTIALS_STATE_KEY = "tgtg_credentials"
+CREDENTIALS_CACHE_TTL = 60  # Seconds
+
+class CredentialStore:
+    """
+    Persists rotated TGTG tokens in the runtime state store instead of Lambda environment variables.
+    A rotation is one conditional write, and warm containers keep their configuration (and stay warm).
+    """
+    def __init__(
+        self,
+        state_store: StateStore
+    ):
+        self.state_store = state_store
+        self._version: Optional[str] = None
+
+    def load(self) -> Optional[Credentials]:
+        """Return the stored credentials, or None if nothing has been persisted yet."""
+        record = self.state_store.get(CREDENTIALS_STATE_KEY, max_age=CREDENTIALS_CACHE_TTL)
+        if record is None:
+            self._version = None
+            return None
+
+        self._version = record.version
+        last_refreshed_str = record.value.get("last_time_token_refreshed")
+        return Credentials(
+            access_token=record.value.get("access_token"),
+            refresh_token=record.value.get("refresh_token"),
+            cookie=record.value.get("cookie"),
+            last_time_token_refreshed=datetime.fromisoformat(last_refreshed_str) if last_refreshed_str else None
+        )
+
+    def save(self, credentials: Credentials) -> bool:
+        """
+        Persist credentials with compare-and-swap against the version last loaded.
+        Return False if another invocation rotated them first, in which case its tokens are kept.
+        """
+        value = {
+            "access_token": credentials.access_token,
+            "refresh_token": credentials.refresh_token,
+            "cookie": credentials.cookie,
+            "last_time_token_refreshed": credentials.get_last_time_token_refreshed_as_str(),
+        }
+        if self._version is None:
+            saved = self.state_store.put_if_absent(CREDENTIALS_STATE_KEY, value)
+        else:
+            saved = self.state_store.compare_and_swap(CREDENTIALS_STATE_KEY, value, expected_version=self._version)
+
+        if saved:
+            self._version = self.state_store.get(CREDENTIALS_STATE_KEY, max_age=CREDENTIALS_CACHE_TTL).version
+            LOGGER.info("TGTG credentials persisted to the credential store.")
+        else:
+            LOGGER.warning("TGTG credentials were rotated concurrently by another invocation; keeping the stored ones.")
+        return saved
@@ -0,0 +1,88 @@
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any, Dict, Optional
+from app.services.tgtg_service.exceptions import TgtgAPIParsingError
+
+if TYPE_CHECKING:
+    from app.services.tgtg_service.models import ItemDetails, PriceInfo
+
+CURRENCY_SYMBOLS = {"EUR": "€", "USD": "$"}
+
+def format_amount(minor_units: int, decimals: int, code: str) -> str:
+    return f"{minor_units / (10 ** decimals):,.2f}{CURRENCY_SYMBOLS.get(code, code)}"
+
+@dataclass(frozen=True, slots=True)
+class Price:
+    minor_units: int
+    decimals: int
+    code: str
+
+    @classmethod
+    def from_raw(cls, raw_price: Dict[str, Any]) -> "Price":
+        return cls(int(raw_price["minor_units"]), int(raw_price["decimals"]), raw_price["code"])
+
+    @classmethod
+    def from_price_info(cls, price_info: "PriceInfo") -> "Price":
+        return cls(price_info.minor_units, price_info.decimals, price_info.code)
+
+    def __str__(self) -> str:
+        return format_amount(self.minor_units, self.decimals, self.code)
+
+@dataclass(frozen=True, slots=True)
+class FavoriteRecord:
+    """
+    The fields of a favorite that monitoring and notifications use, read straight from the raw TGTG payload.
+    Pictures, coordinates and the other nested dicts are dropped; ItemDetails remains the strict-validation model.
+    """
+    item_id: str
+    store_id: str
+    store_name: str
+    items_available: int
+    price: Price
+    value: Price
+    store_time_zone: str
+    description: Optional[str] = None
+    pickup_start: Optional[str] = None
+    pickup_end: Optional[str] = None
+    address_line: Optional[str] = None
+
+    @classmethod
+    def from_raw(cls, raw_item: Dict[str, Any]) -> "FavoriteRecord":
+        """Build a record from one raw favorite of the TGTG API, without validating the fields it does not keep."""
+        try:
+            item, store = raw_item["item"], raw_item["store"]
+            interval = raw_item.get("pickup_interval") or {}
+            location = raw_item.get("pickup_location") or {}
+            return cls(
+                item_id=str(item["item_id"]),
+                store_id=str(store["store_id"]),
+                store_name=store["store_name"],
+                items_available=int(raw_item["items_available"]),
+                price=Price.from_raw(item["item_price"]),
+                value=Price.from_raw(item["item_value"]),
+                store_time_zone=store["store_time_zone"],
+                description=item.get("description"),
+                pickup_start=interval.get("start"),
+                pickup_end=interval.get("end"),
+                address_line=(location.get("address") or {}).get("address_line"),
+            )
+
+        except (KeyError, TypeError, ValueError) as e:
+            raise TgtgAPIParsingError(f"Error parsing favorite item: {e!r}", data=str(raw_item)) from e
+
+    @classmethod
+    def from_item_details(cls, item_details: "ItemDetails") -> "FavoriteRecord":
+        interval = item_details.pickup_interval
+        location = item_details.pickup_location
+        return cls(
+            item_id=item_details.item.item_id,
+            store_id=str(item_details.store.store_id),
+            store_name=item_details.store.store_name,
+            items_available=item_details.items_available,
+            price=Price.from_price_info(item_details.item.item_price),
+            value=Price.from_price_info(item_details.item.item_value),
+            store_time_zone=item_details.store.store_time_zone,
+            description=item_details.item.description,
+            pickup_start=interval.start if interval else None,
+            pickup_end=interval.end if interval else None,
+            address_line=location.address.get("address_line") if location else None,
+        )
@@ -0,0 +1,53 @@
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Tuple
+from app.services.tgtg_service.models import ItemDetails
+
+DEFAULT_CAPACITY = 2048  # Twice the favorites cap of the TGTG client
+
+class ItemDetailsCache:
+    """
+    Container-wide cache of parsed favorites keyed by item_id, so unchanged items skip pydantic validation.
+    The fingerprint of an item is its raw dict from the previous poll: comparing two dicts is a fraction of the cost
+    of validating one, whereas hashing a canonical JSON dump costs more than the validation it would save.
+    """
+    _entries: "OrderedDict[str, Tuple[Dict[str, Any], ItemDetails]]" = OrderedDict()
+    _lock = threading.Lock()
+    capacity = DEFAULT_CAPACITY
+    hits = 0
+    misses = 0
+
+    @classmethod
+    def parse(cls, raw_item: Dict[str, Any]) -> ItemDetails:
+        """Return the ItemDetails of a raw favorite, validating it only if it differs from the previous poll."""
+        item_id = (raw_item.get("item") or {}).get("item_id")
+        with cls._lock:
+            entry = cls._entries.get(item_id) if item_id is not None else None
+            if entry is not None and entry[0] == raw_item:
+                cls._entries.move_to_end(item_id)
+                cls.hits += 1
+                return entry[1]
+
+        item_details = ItemDetails(**raw_item)
+        with cls._lock:
+            cls.misses += 1
+            if item_id is not None:
+                cls._entries[item_id] = (raw_item, item_details)
+                cls._entries.move_to_end(item_id)
+                if len(cls._entries) > cls.capacity:
+                    cls._entries.popitem(last=False)
+        return item_details
+
+    @classmethod
+    def reset_stats(cls) -> Tuple[int, int]:
+        """Return (hits, misses) since the last reset, and reset them."""
+        with cls._lock:
+            stats = (cls.hits, cls.misses)
+            cls.hits = cls.misses = 0
+            return stats
+
+    @classmethod
+    def clear(cls) -> None:
+        with cls._lock:
+            cls._entries.clear()
+            cls.hits = cls.misses = 0
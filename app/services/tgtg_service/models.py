@@ -1,5 +1,6 @@
 from pydantic import BaseModel
 from typing import Optional
+from app.services.tgtg_service.favorite_record import format_amount
 
 class PriceInfo(BaseModel):
     code: str
@@ -7,16 +8,7 @@ class PriceInfo(BaseModel):
     decimals: int
 
     def __str__(self) -> str:
-        formatted_item_value = self.minor_units / (10 ** self.decimals)
-        return f"{formatted_item_value:,.2f}{self.__code_symbol()}"
-
-    def __code_symbol(self) -> str:
-        if self.code == "EUR":
-            return "€"
-        elif self.code == "USD":
-            return "$"
-        else:
-            return self.code
+        return format_amount(self.minor_units, self.decimals, self.code)
 
 class Picture(BaseModel):
     picture_id: str
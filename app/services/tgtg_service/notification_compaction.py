@@ -0,0 +1,102 @@
+"""
+One-shot compaction of the legacy UserNotifications history (one row per store and per notification day)
+into the StoreNotifications table (one latest snapshot row per store, expired by TTL). A compacted row is read by
+the change detector as the store's previous snapshot, so stores notified today are not reported again as restocks.
+Only a row dated today says the store still has bags: older rows are written with no bags available.
+
+    python -m app.services.tgtg_service.notification_compaction [--keep-source] [--dry-run]
+
+The backend of both tables follows STORAGE_BACKEND, like TgtgService.
+"""
+import argparse, sys, pytz
+from boto3.dynamodb.conditions import Attr
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Dict, Optional
+from app.common.logger import get_logger
+from app.core.storage_backend import StorageBackend, create_storage_backend
+from app.services.tgtg_service.change_detector import ChangeDetector
+from app.services.tgtg_service.tgtg_service import TgtgService
+
+LOGGER = get_logger(__name__)
+
+LEGACY_TABLE_NAME = "UserNotifications"
+LEGACY_KEY_NAMES = ("storeId", "lastNotificationDate")
+DELETE_BATCH_SIZE = 100
+
+@dataclass
+class CompactionResult:
+    rows_read: int = 0
+    stores_written: int = 0
+    stores_expired: int = 0
+    rows_deleted: int = 0
+
+def compact_notification_history(
+    source: StorageBackend,
+    target: StorageBackend,
+    delete_source: bool = True,
+    dry_run: bool = False,
+    now: Optional[datetime] = None
+) -> CompactionResult:
+    """
+    Collapse the history rows of `source` into the latest row per store and write it to `target`.
+    A row already in `target` is only replaced if it is an older history row, never if it is a snapshot written since. Stores whose latest
+    notification is past the retention period are not copied, and those not notified today are copied with no bags available, so
+    their next bags are reported. With `delete_source`, copied history rows are deleted.
+    """
+    now = now or datetime.now(pytz.utc)
+    result = CompactionResult()
+    latest_rows: Dict[str, Dict[str, Any]] = {}
+    history_keys = []
+
+    for row in source.scan_items():
+        result.rows_read += 1
+        store_id, date = str(row["storeId"]), row.get("lastNotificationDate", "")
+        history_keys.append({"storeId": row["storeId"], "lastNotificationDate": row["lastNotificationDate"]})
+        if store_id not in latest_rows or date > latest_rows[store_id].get("lastNotificationDate", ""):
+            latest_rows[store_id] = row
+
+    for store_id, row in latest_rows.items():
+        notified_at = _notified_at(row)
+        expires_at = notified_at + ChangeDetector.SNAPSHOT_RETENTION
+        if expires_at <= now:
+            result.stores_expired += 1
+            continue
+        state = {**row, "storeId": store_id, "expiresAt": int(expires_at.timestamp())}
+        if notified_at.astimezone(pytz.utc).date() != now.astimezone(pytz.utc).date():
+            state["itemsAvailable"] = 0
+        condition = Attr("storeId").not_exists() | Attr("lastNotificationDate").lt(row["lastNotificationDate"])
+        if dry_run or target.put_item_with_condition(state, condition):
+            result.stores_written += 1
+
+    if delete_source and not dry_run:
+        for start in range(0, len(history_keys), DELETE_BATCH_SIZE):
+            chunk = history_keys[start:start + DELETE_BATCH_SIZE]
+            source.batch_delete_items(chunk)
+            result.rows_deleted += len(chunk)
+
+    LOGGER.info("Notification history compaction%s: %s", " (dry run)" if dry_run else "", result)
+    return result
+
+def _notified_at(row: Dict[str, Any]) -> datetime:
+    """Time of the latest notification of a history row; rows written before notifiedAt existed fall back to their date."""
+    if row.get("notifiedAt"):
+        notified_at = datetime.fromisoformat(row["notifiedAt"])
+    else:
+        notified_at = datetime.fromisoformat(row["lastNotificationDate"])
+    return notified_at if notified_at.tzinfo else pytz.utc.localize(notified_at)
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--keep-source", action="store_true", help="Do not delete the compacted history rows")
+    parser.add_argument("--dry-run", action="store_true", help="Only report what would be written and deleted")
+    args = parser.parse_args()
+
+    source = create_storage_backend(LEGACY_TABLE_NAME, LEGACY_KEY_NAMES)
+    target = create_storage_backend(TgtgService.NOTIFICATIONS_TABLE_NAME, TgtgService.NOTIFICATIONS_KEY_NAMES)
+    result = compact_notification_history(source, target, delete_source=not args.keep_source, dry_run=args.dry_run)
+    print(result)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
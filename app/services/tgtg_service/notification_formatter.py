@@ -1,8 +1,13 @@
 import pytz
 from dateutil.parser import isoparse
 from datetime import datetime, timedelta
-from app.services.tgtg_service.models import ItemDetails, PickupInterval
-from app.common.logger import LOGGER
+from typing import List, Optional
+from app.services.tgtg_service.change_detector import StockEvent, StockEventType
+from app.services.tgtg_service.favorite_record import FavoriteRecord, Price
+from app.services.tgtg_service.models import PickupInterval
+from app.common.logger import get_logger
+
+LOGGER = get_logger(__name__)
 
 class NotificationFormatter:
     """Helper class to format notification messages and time intervals."""
@@ -13,15 +18,27 @@ class NotificationFormatter:
         store_time_zone: str
     ) -> str:
         """Format pickup interval dates for display using the store's timezone."""
-        if not interval or not interval.start or not interval.end:
+        if not interval:
+            LOGGER.error("PickupInterval is missing or incomplete.")
+            return "Pickup time unavailable"
+        return NotificationFormatter.format_pickup_window(interval.start, interval.end, store_time_zone)
+
+    @staticmethod
+    def format_pickup_window(
+        start: Optional[str], 
+        end: Optional[str], 
+        store_time_zone: str
+    ) -> str:
+        """Format the start and end of a pickup window for display using the store's timezone."""
+        if not start or not end:
             LOGGER.error("PickupInterval is missing or incomplete.")
             return "Pickup time unavailable"
 
         try:
             timezone = pytz.timezone(store_time_zone) if store_time_zone else pytz.UTC
 
-            start_utc = isoparse(interval.start).astimezone(pytz.UTC)
-            end_utc = isoparse(interval.end).astimezone(pytz.UTC)
+            start_utc = isoparse(start).astimezone(pytz.UTC)
+            end_utc = isoparse(end).astimezone(pytz.UTC)
             start_local = start_utc.astimezone(timezone)
             end_local = end_utc.astimezone(timezone)
 
@@ -37,36 +54,52 @@ class NotificationFormatter:
             return f"{date_label} de {start_local.strftime('%H:%M')} à {end_local.strftime('%H:%M')}"
 
         except pytz.UnknownTimeZoneError:
-            LOGGER.error(f"Invalid timezone: {store_time_zone}")
+            LOGGER.error("Invalid timezone: %s", store_time_zone)
             return "Pickup time unavailable"
 
         except ValueError as e:
-            LOGGER.error(f"Error parsing datetime: {e}")
+            LOGGER.error("Error parsing datetime: %s", e)
             return "Pickup time unavailable"
 
         except Exception as e:
-            LOGGER.error(f"Unexpected error in format_pickup_interval: {e}")
+            LOGGER.error("Unexpected error in format_pickup_interval: %s", e)
             return "Pickup time unavailable"
 
     @staticmethod
-    def format_message(item_details: ItemDetails) -> str:
+    def format_message(favorite: FavoriteRecord) -> str:
         """Format a Telegram message for an available item."""
-        item_url = f"https://share.toogoodtogo.com/item/{item_details.item.item_id}"
-        nbr_of_item_string = ("nouveaux paniers disponibles chez" if item_details.items_available > 1 else "nouveau panier disponible chez")
-        message = f"🍽 {item_details.items_available} {nbr_of_item_string} [{item_details.store.store_name}]({item_url})\n\n"
-
-        if item_details.item.description:
-            message += f"{item_details.item.description}\n\n"
+        item_url = f"https://share.toogoodtogo.com/item/{favorite.item_id}"
+        nbr_of_item_string = ("nouveaux paniers disponibles chez" if favorite.items_available > 1 else "nouveau panier disponible chez")
+        message = f"🍽 {favorite.items_available} {nbr_of_item_string} [{favorite.store_name}]({item_url})\n\n"
 
-        message += f"💰 *{item_details.item.item_price}* au lieu de {item_details.item.item_value}\n"
+        if favorite.description:
+            message += f"{favorite.description}\n\n"
 
-        pickup_time = NotificationFormatter.format_pickup_interval(item_details.pickup_interval, item_details.store.store_time_zone)
+        message += f"💰 *{favorite.price}* au lieu de {favorite.value}\n"
 
-        location = (
-            item_details.pickup_location.address.get('address_line', 'Unknown location')
-            if item_details.pickup_location else "Unknown location"
-        )
+        pickup_time = NotificationFormatter.format_pickup_window(favorite.pickup_start, favorite.pickup_end, favorite.store_time_zone)
+        location = favorite.address_line or "Unknown location"
 
         message += f"⏰ {pickup_time}\n"
         message += f"📍 {location}"
-        return message
\ No newline at end of file
+        return message
+
+    @staticmethod
+    def format_stock_events(events: List[StockEvent]) -> str:
+        """Format one Telegram message for the stock events of a store detected by the same poll."""
+        favorite = events[0].favorite
+        event_types = [event.event_type for event in events]
+        if StockEventType.SOLD_OUT in event_types:
+            item_url = f"https://share.toogoodtogo.com/item/{favorite.item_id}"
+            return f"😢 Plus de panier disponible chez [{favorite.store_name}]({item_url})"
+
+        headers = []
+        if StockEventType.NEW_PICKUP_SLOT in event_types:
+            headers.append("🆕 Nouveau créneau de retrait")
+        if StockEventType.PRICE_CHANGE in event_types:
+            previous = events[0].previous
+            previous_price = Price(previous.price_minor_units, previous.price_decimals, previous.price_code)
+            headers.append(f"🏷 Nouveau prix : {favorite.price} (avant {previous_price})")
+
+        message = NotificationFormatter.format_message(favorite)
+        return "\n".join(headers) + "\n\n" + message if headers else message
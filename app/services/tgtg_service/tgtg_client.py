@@ -1,7 +1,15 @@
-import datetime, sys, time, requests
+import sys, time, requests
+from concurrent.futures import ThreadPoolExecutor
 from http import HTTPStatus
 from urllib.parse import urljoin
 from .exceptions import TgtgAPIError, TgtgLoginError, TgtgPollingError
+from .token_manager import REFRESH_WAIT_TIMEOUT, TokenManager
+from app.common.json_codec import decode_response
+from app.common.logger import get_logger
+from app.common.metrics import METRICS
+from app.common.rate_limiter import AdaptiveRateLimiter, RateLimiterRegistry, decorrelated_jitter, parse_retry_after
+
+LOGGER = get_logger(__name__)
 
 BASE_URL = "https://apptoogoodtogo.com/api/"
 API_ITEM_ENDPOINT = "item/v8/"
@@ -19,6 +27,17 @@ API_BUCKET_ENDPOINT = "discover/v1/bucket"
 DEFAULT_ACCESS_TOKEN_LIFETIME = 3600 * 4  # 4 hours
 MAX_POLLING_TRIES = 24  # 24 * POLLING_WAIT_TIME = 2 minutes
 POLLING_WAIT_TIME = 5  # Seconds
+FAVORITES_PAGE_SIZE = 50
+MAX_FAVORITES_PAGES = 20  # Safety cap: 20 * FAVORITES_PAGE_SIZE = 1000 favorites
+PREFETCH_MIN_REMAINING = 2  # Seconds
+RATE_LIMIT_INITIAL_RATE = 1.0  # Requests per second
+RATE_LIMIT_MIN_RATE = 0.1
+RATE_LIMIT_MAX_RATE = 2.0
+RATE_LIMIT_BURST = 5
+MAX_RETRIES = 3
+RETRY_BASE_DELAY = 0.5  # Seconds
+RETRY_MAX_DELAY = 8  # Seconds
+DEFAULT_RETRY_BUDGET = 10  # Seconds spent waiting on the rate limiter and backoff per request
 
 class TgtgClient:
     def __init__(
@@ -40,11 +59,13 @@ class TgtgClient:
 
         self.email = email
 
-        self.access_token = access_token
-        self.refresh_token = refresh_token
-        self.cookie = cookie
-
-        self.last_time_token_refreshed = last_time_token_refreshed
+        self.token_manager = TokenManager(
+            access_token=access_token,
+            refresh_token=refresh_token,
+            cookie=cookie,
+            last_time_token_refreshed=last_time_token_refreshed,
+            access_token_lifetime=access_token_lifetime,
+        )
         self.access_token_lifetime = access_token_lifetime
 
         self.device_type = device_type
@@ -53,20 +74,98 @@ class TgtgClient:
         self.language = language
         self.proxies = proxies
         self.timeout = timeout
+        self.retry_budget = DEFAULT_RETRY_BUDGET
+        self.deadline = None  # Set per invocation, see app.common.deadline.Deadline
+        self.rate_limiter = RateLimiterRegistry.get(self._rate_limiter_key, self._create_rate_limiter)
         self.session = requests.Session()
         self.session.headers = self._headers
 
+    @property
+    def _rate_limiter_key(self):
+        proxy = (self.proxies or {}).get("https") or (self.proxies or {}).get("http") or "direct"
+        return f"tgtg:{(self.email or 'default').lower()}:{proxy}"
+
+    @staticmethod
+    def _create_rate_limiter():
+        return AdaptiveRateLimiter(
+            rate=RATE_LIMIT_INITIAL_RATE,
+            capacity=RATE_LIMIT_BURST,
+            min_rate=RATE_LIMIT_MIN_RATE,
+            max_rate=RATE_LIMIT_MAX_RATE,
+        )
+
+    def _record_response(self, status_code):
+        """Feed a response status back into the rate limiter. Return True if the response is a retryable 429."""
+        if status_code == HTTPStatus.TOO_MANY_REQUESTS:
+            return True
+        if status_code == HTTPStatus.FORBIDDEN:
+            self.rate_limiter.on_throttle()
+        elif status_code < HTTPStatus.BAD_REQUEST:
+            self.rate_limiter.on_success()
+        return False
+
+    def _backoff_after_throttle(self, response, previous_delay):
+        """Slow the rate limiter down after a 429 and return how long to wait before retrying (never less than Retry-After)."""
+        retry_after = parse_retry_after(response.headers.get("Retry-After"))
+        self.rate_limiter.on_throttle(retry_after)
+        return max(retry_after or 0.0, decorrelated_jitter(previous_delay, RETRY_BASE_DELAY, RETRY_MAX_DELAY))
+
+    def _request_timeout(self):
+        """Timeout for the next request: the configured timeout, shortened to what is left of the invocation deadline."""
+        if self.deadline is None:
+            return self.timeout
+        return self.deadline.timeout(cap=self.timeout)
+
+    def _retry_budget_end(self):
+        """Monotonic time after which a request stops waiting on the rate limiter and backoff."""
+        budget = self.retry_budget
+        if self.deadline is not None:
+            budget = max(0.0, min(budget, self.deadline.remaining()))
+        return time.monotonic() + budget
+
+    def _check_polling_deadline(self):
+        if self.deadline is not None:
+            self.deadline.check("TGTG login polling", reserve=POLLING_WAIT_TIME)
+
+    @property
+    def access_token(self):
+        return self.token_manager.access_token
+
+    @access_token.setter
+    def access_token(self, value):
+        self.token_manager.access_token = value
+
+    @property
+    def refresh_token(self):
+        return self.token_manager.refresh_token
+
+    @refresh_token.setter
+    def refresh_token(self, value):
+        self.token_manager.refresh_token = value
+
+    @property
+    def cookie(self):
+        return self.token_manager.cookie
+
+    @cookie.setter
+    def cookie(self, value):
+        self.token_manager.cookie = value
+
+    @property
+    def last_time_token_refreshed(self):
+        return self.token_manager.last_time_token_refreshed
+
+    @last_time_token_refreshed.setter
+    def last_time_token_refreshed(self, value):
+        self.token_manager.last_time_token_refreshed = value
+
+    @property
+    def token_valid_until(self):
+        return self.token_manager.valid_until
+
     def _get_url(self, path):
         return urljoin(self.base_url, path)
 
-    def get_credentials(self):
-        self.login()
-        return {
-            "access_token": self.access_token,
-            "refresh_token": self.refresh_token,
-            "cookie": self.cookie,
-        }
-
     @property
     def _headers(self):
         headers = {
@@ -86,49 +185,149 @@ class TgtgClient:
     def _already_logged(self):
         return bool(self.access_token and self.refresh_token)
 
+    def _check_login_credentials(self):
+        if not (self.email or self.access_token and self.refresh_token and self.cookie):
+            raise TypeError("You must provide at least email or access_token, refresh_token and cookie")
+
+    def _is_access_token_expired(self):
+        return not self.token_manager.is_valid()
+
+    def _set_tokens(self, login_response, cookie=None):
+        self.token_manager.update(login_response["access_token"], login_response["refresh_token"], cookie=cookie)
+
+    @staticmethod
+    def _items_payload(
+        latitude,
+        longitude,
+        radius,
+        page_size,
+        page,
+        discover,
+        favorites_only,
+        item_categories,
+        diet_categories,
+        pickup_earliest,
+        pickup_latest,
+        search_phrase,
+        with_stock_only,
+        hidden_only,
+        we_care_only,
+    ):
+        # fields are sorted like in the app
+        return {
+            "origin": {"latitude": latitude, "longitude": longitude},
+            "radius": radius,
+            "page_size": page_size,
+            "page": page,
+            "discover": discover,
+            "favorites_only": favorites_only,
+            "item_categories": item_categories if item_categories else [],
+            "diet_categories": diet_categories if diet_categories else [],
+            "pickup_earliest": pickup_earliest,
+            "pickup_latest": pickup_latest,
+            "search_phrase": search_phrase if search_phrase else None,
+            "with_stock_only": with_stock_only,
+            "hidden_only": hidden_only,
+            "we_care_only": we_care_only,
+        }
+
+    @staticmethod
+    def _favorites_payload(latitude, longitude, radius, page_size, page):
+        # fields are sorted like in the app
+        return {
+            "origin": {"latitude": latitude, "longitude": longitude},
+            "radius": radius,
+            "paging": {"page": page, "size": page_size},
+            "bucket": {"filler_type": "Favorites"},
+        }
+
+    def _signup_payload(self, email, name, country_id, newsletter_opt_in, push_notification_opt_in):
+        return {
+            "country_id": country_id,
+            "device_type": self.device_type,
+            "email": email,
+            "name": name,
+            "newsletter_opt_in": newsletter_opt_in,
+            "push_notification_opt_in": push_notification_opt_in,
+        }
+
+    def _post(self, url, json=None):
+        """
+        POST through the account rate limiter. A 429 shrinks the rate and is retried with decorrelated
+        jitter (at least Retry-After) while the retry budget allows; the last response is returned otherwise.
+        """
+        budget_end = self._retry_budget_end()
+        delay = None
+        for attempt in range(MAX_RETRIES + 1):
+            if not self.rate_limiter.acquire(timeout=max(0.0, budget_end - time.monotonic())):
+                raise TgtgAPIError(HTTPStatus.TOO_MANY_REQUESTS, "Client-side rate limit budget exhausted.")
+
+            with METRICS.timer("TgtgRequest"):
+                response = self.session.post(
+                    url,
+                    headers=self._headers,
+                    json=json,
+                    proxies=self.proxies,
+                    timeout=self._request_timeout(),
+                )
+            METRICS.add_bytes("TgtgResponseBytes", len(response.content))
+            if not self._record_response(response.status_code):
+                return response
+
+            delay = self._backoff_after_throttle(response, delay)
+            if attempt == MAX_RETRIES or time.monotonic() + delay > budget_end:
+                return response
+
+            LOGGER.warning("TGTG API returned 429, retrying in %.2fs (attempt %d/%d).", delay, attempt + 1, MAX_RETRIES)
+            time.sleep(delay)
+
+    def get_credentials(self):
+        self.login()
+        return {
+            "access_token": self.access_token,
+            "refresh_token": self.refresh_token,
+            "cookie": self.cookie,
+        }
+
     def _refresh_token(self):
-        if self.last_time_token_refreshed.tzinfo is None:
-            self.last_time_token_refreshed = self.last_time_token_refreshed.replace(tzinfo=datetime.timezone.utc)
+        self.token_manager.ensure_valid(self._request_token_refresh)
 
-        now = datetime.datetime.now(datetime.timezone.utc) 
-        time_diff = now - self.last_time_token_refreshed
+    def refresh_token_ahead(self):
+        """Refresh the access token in the background if it expires soon, so polling calls never wait on it."""
+        if self._already_logged:
+            self.token_manager.refresh_ahead_in_background(self._request_token_refresh)
 
-        if time_diff.total_seconds() <= self.access_token_lifetime:
-            return
+    def wait_for_token_refresh(self):
+        if self.deadline is None:
+            self.token_manager.wait_for_refresh()
+        else:
+            self.token_manager.wait_for_refresh(timeout=self.deadline.timeout(cap=REFRESH_WAIT_TIMEOUT, minimum=0))
 
-        response = self.session.post(
+    def _request_token_refresh(self):
+        response = self._post(
             self._get_url(REFRESH_ENDPOINT),
             json={"refresh_token": self.refresh_token},
-            headers=self._headers,
-            proxies=self.proxies,
-            timeout=self.timeout,
         )
         if response.status_code == HTTPStatus.OK:
-            self.access_token = response.json()["access_token"]
-            self.refresh_token = response.json()["refresh_token"]
-            self.last_time_token_refreshed = datetime.datetime.now()
-            self.cookie = response.headers["Set-Cookie"]
+            self._set_tokens(decode_response(response), cookie=response.headers["Set-Cookie"])
         else:
             raise TgtgAPIError(response.status_code, response.content)
 
+    @METRICS.timer("TgtgLogin")
     def login(self):
-        if not (self.email or self.access_token and self.refresh_token and self.cookie):
-            raise TypeError("You must provide at least email or access_token, refresh_token and cookie")
+        self._check_login_credentials()
         if self._already_logged:
             self._refresh_token()
         else:
-            response = self.session.post(
+            response = self._post(
                 self._get_url(AUTH_BY_EMAIL_ENDPOINT),
-                headers=self._headers,
                 json={
                     "device_type": self.device_type,
                     "email": self.email,
                 },
-                proxies=self.proxies,
-                timeout=self.timeout,
             )
             if response.status_code == HTTPStatus.OK:
-                first_login_response = response.json()
+                first_login_response = decode_response(response)
                 if first_login_response["state"] == "TERMS":
                     raise TgtgPollingError(
                         f"This email {self.email} is not linked to a tgtg account. "
@@ -146,28 +345,22 @@ class TgtgClient:
 
     def start_polling(self, polling_id):
         for _ in range(MAX_POLLING_TRIES):
-            response = self.session.post(
+            response = self._post(
                 self._get_url(AUTH_POLLING_ENDPOINT),
-                headers=self._headers,
                 json={
                     "device_type": self.device_type,
                     "email": self.email,
                     "request_polling_id": polling_id,
                 },
-                proxies=self.proxies,
-                timeout=self.timeout,
             )
             if response.status_code == HTTPStatus.ACCEPTED:
                 sys.stdout.write("Check your mailbox on PC to continue... (Opening email on mobile won't work, if you have installed tgtg app.)\n")
+                self._check_polling_deadline()
                 time.sleep(POLLING_WAIT_TIME)
                 continue
             elif response.status_code == HTTPStatus.OK:
                 sys.stdout.write("Logged in!\n")
-                login_response = response.json()
-                self.access_token = login_response["access_token"]
-                self.refresh_token = login_response["refresh_token"]
-                self.last_time_token_refreshed = datetime.datetime.now()
-                self.cookie = response.headers["Set-Cookie"]
+                self._set_tokens(decode_response(response), cookie=response.headers["Set-Cookie"])
                 return
             else:
                 if response.status_code == HTTPStatus.TOO_MANY_REQUESTS:
@@ -198,46 +391,40 @@ class TgtgClient:
     ):
         self.login()
 
-        # fields are sorted like in the app
-        data = {
-            "origin": {"latitude": latitude, "longitude": longitude},
-            "radius": radius,
-            "page_size": page_size,
-            "page": page,
-            "discover": discover,
-            "favorites_only": favorites_only,
-            "item_categories": item_categories if item_categories else [],
-            "diet_categories": diet_categories if diet_categories else [],
-            "pickup_earliest": pickup_earliest,
-            "pickup_latest": pickup_latest,
-            "search_phrase": search_phrase if search_phrase else None,
-            "with_stock_only": with_stock_only,
-            "hidden_only": hidden_only,
-            "we_care_only": we_care_only,
-        }
-        response = self.session.post(
+        data = self._items_payload(
+            latitude,
+            longitude,
+            radius,
+            page_size,
+            page,
+            discover,
+            favorites_only,
+            item_categories,
+            diet_categories,
+            pickup_earliest,
+            pickup_latest,
+            search_phrase,
+            with_stock_only,
+            hidden_only,
+            we_care_only,
+        )
+        response = self._post(
             self._get_url(API_ITEM_ENDPOINT),
-            headers=self._headers,
             json=data,
-            proxies=self.proxies,
-            timeout=self.timeout,
         )
         if response.status_code == HTTPStatus.OK:
-            return response.json()["items"]
+            return decode_response(response, "items")
         else:
             raise TgtgAPIError(response.status_code, response.content)
 
     def get_item(self, item_id):
         self.login()
-        response = self.session.post(
+        response = self._post(
             urljoin(self._get_url(API_ITEM_ENDPOINT), str(item_id)),
-            headers=self._headers,
             json={"origin": None},
-            proxies=self.proxies,
-            timeout=self.timeout,
         )
         if response.status_code == HTTPStatus.OK:
-            return response.json()
+            return decode_response(response)
         else:
             raise TgtgAPIError(response.status_code, response.content)
 
@@ -251,33 +438,67 @@ class TgtgClient:
     ):
         self.login()
 
-        # fields are sorted like in the app
-        data = {
-            "origin": {"latitude": latitude, "longitude": longitude},
-            "radius": radius,
-            "paging": {"page": page, "size": page_size},
-            "bucket": {"filler_type": "Favorites"},
-        }
-        response = self.session.post(
+        data = self._favorites_payload(latitude, longitude, radius, page_size, page)
+        response = self._post(
             self._get_url(API_BUCKET_ENDPOINT),
-            headers=self._headers,
             json=data,
-            proxies=self.proxies,
-            timeout=self.timeout,
         )
         if response.status_code == HTTPStatus.OK:
-            return response.json().get("mobile_bucket", {}).get("items", [])
+            return decode_response(response, "mobile_bucket.items", default=[])
         else:
             raise TgtgAPIError(response.status_code, response.content)
 
+    def iter_favorites(
+        self,
+        latitude=0.0,
+        longitude=0.0,
+        radius=21,
+        page_size=FAVORITES_PAGE_SIZE,
+        max_pages=MAX_FAVORITES_PAGES,
+    ):
+        """
+        Yield favorites page by page, prefetching page N+1 while page N is consumed. Stops at the first short page,
+        or after max_pages full pages, logging the truncation and counting it in the FavoritesTruncated metric.
+        Close to the deadline the next page is only requested when asked for, and a consumer that stops early never
+        waits for a page being prefetched.
+        """
+        self.login()
+
+        def fetch(page):
+            return executor.submit(self.get_favorites, latitude, longitude, radius, page_size, page)
+
+        executor = ThreadPoolExecutor(max_workers=1)
+        next_page = None
+        try:
+            page = 0
+            next_page = fetch(page)
+            while next_page is not None:
+                items = next_page.result()
+                page += 1
+                has_more = len(items) >= page_size and page < max_pages
+                if len(items) >= page_size and page >= max_pages:
+                    LOGGER.warning("Stopped after %d pages of favorites, favorites beyond the first %d are not monitored.", max_pages, max_pages * page_size)
+                    METRICS.increment("FavoritesTruncated")
+                next_page = fetch(page) if has_more and self._can_prefetch() else None
+                yield items
+                if has_more and next_page is None:
+                    next_page = fetch(page)
+
+        finally:
+            # A prefetch already running finishes in the background, bounded by its own request timeout
+            if next_page is not None:
+                next_page.cancel()
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def _can_prefetch(self):
+        """False once less than PREFETCH_MIN_REMAINING seconds are left, when a prefetch would likely be thrown away."""
+        return self.deadline is None or not self.deadline.expired(PREFETCH_MIN_REMAINING)
+
     def set_favorite(self, item_id, is_favorite):
         self.login()
-        response = self.session.post(
+        response = self._post(
             self._get_url(FAVORITE_ITEM_ENDPOINT.format(item_id)),
-            headers=self._headers,
             json={"is_favorite": is_favorite},
-            proxies=self.proxies,
-            timeout=self.timeout,
         )
         if response.status_code != HTTPStatus.OK:
             raise TgtgAPIError(response.status_code, response.content)
@@ -285,31 +506,26 @@ class TgtgClient:
     def create_order(self, item_id, item_count):
         self.login()
 
-        response = self.session.post(
+        response = self._post(
             urljoin(self._get_url(CREATE_ORDER_ENDPOINT), str(item_id)),
-            headers=self._headers,
             json={"item_count": item_count},
-            proxies=self.proxies,
-            timeout=self.timeout,
         )
         if response.status_code != HTTPStatus.OK:
             raise TgtgAPIError(response.status_code, response.content)
-        elif response.json()["state"] != "SUCCESS":
-            raise TgtgAPIError(response.json()["state"], response.content)
+        state = decode_response(response, "state")
+        if state != "SUCCESS":
+            raise TgtgAPIError(state, response.content)
         else:
-            return response.json()["order"]
+            return decode_response(response, "order")
 
     def get_order_status(self, order_id):
         self.login()
 
-        response = self.session.post(
+        response = self._post(
             self._get_url(ORDER_STATUS_ENDPOINT.format(order_id)),
-            headers=self._headers,
-            proxies=self.proxies,
-            timeout=self.timeout,
         )
         if response.status_code == HTTPStatus.OK:
-            return response.json()
+            return decode_response(response)
         else:
             raise TgtgAPIError(response.status_code, response.content)
 
@@ -317,17 +533,15 @@ class TgtgClient:
         """Use this when your order is not yet paid"""
         self.login()
 
-        response = self.session.post(
+        response = self._post(
             self._get_url(ABORT_ORDER_ENDPOINT.format(order_id)),
-            headers=self._headers,
             json={"cancel_reason_id": 1},
-            proxies=self.proxies,
-            timeout=self.timeout,
         )
         if response.status_code != HTTPStatus.OK:
             raise TgtgAPIError(response.status_code, response.content)
-        elif response.json()["state"] != "SUCCESS":
-            raise TgtgAPIError(response.json()["state"], response.content)
+        state = decode_response(response, "state")
+        if state != "SUCCESS":
+            raise TgtgAPIError(state, response.content)
         else:
             return
 
@@ -340,24 +554,12 @@ class TgtgClient:
         newsletter_opt_in=False,
         push_notification_opt_in=True,
     ):
-        response = self.session.post(
+        response = self._post(
             self._get_url(SIGNUP_BY_EMAIL_ENDPOINT),
-            headers=self._headers,
-            json={
-                "country_id": country_id,
-                "device_type": self.device_type,
-                "email": email,
-                "name": name,
-                "newsletter_opt_in": newsletter_opt_in,
-                "push_notification_opt_in": push_notification_opt_in,
-            },
-            proxies=self.proxies,
-            timeout=self.timeout,
+            json=self._signup_payload(email, name, country_id, newsletter_opt_in, push_notification_opt_in),
         )
         if response.status_code == HTTPStatus.OK:
-            self.access_token = response.json()["login_response"]["access_token"]
-            self.refresh_token = response.json()["login_response"]["refresh_token"]
-            self.last_time_token_refreshed = datetime.datetime.now()
+            self._set_tokens(decode_response(response, "login_response"))
 
             return self
         else:
@@ -365,28 +567,22 @@ class TgtgClient:
 
     def get_active(self):
         self.login()
-        response = self.session.post(
+        response = self._post(
             self._get_url(ACTIVE_ORDER_ENDPOINT),
-            headers=self._headers,
             json={},
-            proxies=self.proxies,
-            timeout=self.timeout,
         )
         if response.status_code == HTTPStatus.OK:
-            return response.json()
+            return decode_response(response)
         else:
             raise TgtgAPIError(response.status_code, response.content)
 
     def get_inactive(self, page=0, page_size=20):
         self.login()
-        response = self.session.post(
+        response = self._post(
             self._get_url(INACTIVE_ORDER_ENDPOINT),
-            headers=self._headers,
             json={"paging": {"page": page, "size": page_size}},
-            proxies=self.proxies,
-            timeout=self.timeout,
         )
         if response.status_code == HTTPStatus.OK:
-            return response.json()
+            return decode_response(response)
         else:
             raise TgtgAPIError(response.status_code, response.content)
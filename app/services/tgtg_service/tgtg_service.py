@@ -1,16 +1,22 @@
-import pytz
 from dataclasses import dataclass
 from pydantic import ValidationError
 from datetime import datetime
-from typing import List, Dict, Optional
-from app.common.logger import LOGGER
-from app.core.database_handler import DatabaseHandler
-from app.core.exceptions import DatabaseQueryError
-from app.services.tgtg_service.tgtg_client import TgtgClient
+from typing import Any, Dict, List, Optional
+from app.common.deadline import Deadline
+from app.common.logger import PayloadSample, get_logger
+from app.common.metrics import METRICS
+from app.common.utils import Utils
+from app.core.exceptions import DeadlineExceededError
+from app.core.storage_backend import StorageBackend, create_storage_backend
+from app.services.tgtg_service.change_detector import ChangeDetector, StockEvent, StockEventType
+from app.services.tgtg_service.client_registry import TgtgClientRegistry
+from app.services.tgtg_service.favorite_record import FavoriteRecord
+from app.services.tgtg_service.item_details_cache import ItemDetailsCache
 from app.services.tgtg_service.notification_formatter import NotificationFormatter
-from app.services.tgtg_service.models import ItemDetails
 from app.services.tgtg_service.exceptions import TgtgLoginError, TgtgAPIConnectionError, TgtgAPIParsingError, ForbiddenError
 
+LOGGER = get_logger(__name__)
+
 @dataclass
 class Credentials:
     access_token: Optional[str]
@@ -23,11 +29,35 @@ class Credentials:
             return self.last_time_token_refreshed.isoformat()
         return ""
 
+@dataclass(frozen=True)
+class Notification:
+    """
+    A Telegram message for one store, with what its time to notify is measured from: the poll that observed the
+    change, and the previous poll, which had not seen it yet (the change happened somewhere in between).
+    """
+    text: str
+    store_id: Optional[str] = None
+    observed_at: Optional[int] = None
+    appeared_after: Optional[int] = None
+
 class TgtgService:
     USER_AGENT = "Mozilla/5.0 (iPhone; CPU iPhone OS 17_7_2 like Mac OS X) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/17.4.1 Mobile/15E148 Safari/604.1"
 
-    def __init__(self):
-        self.database_handler = DatabaseHandler(table_name="UserNotifications")
+    # One latest snapshot row per store, expired by DynamoDB TTL when the store stops being polled
+    NOTIFICATIONS_TABLE_NAME = "StoreNotifications"
+    NOTIFICATIONS_KEY_NAMES = ("storeId",)
+    NOTIFIED_EVENT_TYPES = frozenset({StockEventType.RESTOCK, StockEventType.NEW_PICKUP_SLOT, StockEventType.PRICE_CHANGE})
+
+    def __init__(
+        self,
+        storage: Optional[StorageBackend] = None,
+        strict_validation: Optional[bool] = None
+    ):
+        if strict_validation is None:
+            strict_validation = Utils.get_environment_variable("TGTG_STRICT_VALIDATION", default="false").lower() == "true"
+        self.strict_validation = strict_validation
+        self.database_handler = storage or create_storage_backend(self.NOTIFICATIONS_TABLE_NAME, self.NOTIFICATIONS_KEY_NAMES)
+        self.change_detector = ChangeDetector(self.database_handler)
         self.credentials: Credentials = None
 
     def get_favorites_items_list(
@@ -36,14 +66,18 @@ class TgtgService:
             access_token: Optional[str], 
             refresh_token: Optional[str], 
             cookie: Optional[str],
-            last_time_token_refreshed_str: Optional[str]
-        ) -> List[ItemDetails]:
-        """Login to TGTG if needed and fetch and parse favorite items from TGTG API."""
-        LOGGER.info(f"Login to TGTG API with \nemail: {email}\naccess_token: {access_token}\nrefresh_token: {refresh_token}\ncookie: {cookie}")
+            last_time_token_refreshed_str: Optional[str],
+            deadline: Optional[Deadline] = None
+        ) -> List[FavoriteRecord]:
+        """
+        Login to TGTG if needed and fetch and parse favorite items from TGTG API.
+        When the deadline is reached mid-pagination, the pages already fetched are returned.
+        """
+        LOGGER.debug("Login to TGTG API as %s (access token %s).", email, "set" if access_token else "missing")
         last_time_token_refreshed = datetime.fromisoformat(last_time_token_refreshed_str) if last_time_token_refreshed_str else None
 
         try: 
-            tgtg_client = TgtgClient(
+            tgtg_client = TgtgClientRegistry.get_client(
                 email=email, 
                 access_token=access_token, 
                 refresh_token=refresh_token, 
@@ -52,27 +86,52 @@ class TgtgService:
                 last_time_token_refreshed=last_time_token_refreshed,
                 device_type="IPHONE"
             )
-            LOGGER.info(f"TGTG Credentials: access_token={tgtg_client.access_token}, refresh_token={tgtg_client.refresh_token}, cookie={tgtg_client.cookie}, last_time_token_refreshed={tgtg_client.last_time_token_refreshed}")
+            tgtg_client.deadline = deadline
+            LOGGER.debug("TGTG client ready, token last refreshed at %s.", tgtg_client.last_time_token_refreshed)
 
         except Exception as e:
             raise TgtgLoginError("Unable to login with provided credentials.") from e
 
         LOGGER.info("Fetching favorite items from TGTG API.")
         try:
-            json_data = tgtg_client.get_favorites()
+            tgtg_client.refresh_token_ahead()
+            favorites = []
+            ItemDetailsCache.reset_stats()
+            try:
+                for page_number, page in enumerate(tgtg_client.iter_favorites()):
+                    LOGGER.debug("Raw API response (page %d): %s", page_number, PayloadSample(page))
+                    with METRICS.timer("FavoritesParse"):
+                        favorites.extend(self._parse_favorite(item) for item in page)
+
+            except DeadlineExceededError as e:
+                if not favorites:
+                    raise
+                LOGGER.warning("%s Continuing with the %d favorites fetched so far.", e, len(favorites))
+
+            tgtg_client.wait_for_token_refresh()
+
             self.credentials = Credentials(tgtg_client.access_token, tgtg_client.refresh_token, tgtg_client.cookie, tgtg_client.last_time_token_refreshed)
-            LOGGER.info(f"Local credentials setted after recent TGTG request: {self.credentials}")
-            LOGGER.info(f"Raw API response: {json_data}")
-            favorites = [ItemDetails(**item) for item in json_data]
-            LOGGER.info(f"Parsed {len(favorites)} favorite items from TGTG API.")
+            LOGGER.debug("Local credentials set after recent TGTG request, token last refreshed at %s.", self.credentials.last_time_token_refreshed)
+            if self.strict_validation:
+                reused, validated = ItemDetailsCache.reset_stats()
+                LOGGER.info("Parsed %d favorite items from TGTG API (%d validated, %d unchanged since the previous poll).", len(favorites), validated, reused)
+            else:
+                LOGGER.info("Parsed %d favorite items from TGTG API.", len(favorites))
+            METRICS.increment("Favorites", len(favorites))
             return favorites
         
         except ValidationError as e:
             raise TgtgAPIParsingError("Error parsing item details.") from e
 
+        except TgtgAPIParsingError:
+            raise
+
+        except DeadlineExceededError:
+            raise
+
         except Exception as e:
             error_message = str(e)
-            LOGGER.error(f"Unexpected error occurred: {error_message}")
+            LOGGER.error("Unexpected error occurred: %s", error_message)
 
             if "captcha" in error_message.lower():
                 LOGGER.error("Anti-bot CAPTCHA challenge detected.")
@@ -80,56 +139,62 @@ class TgtgService:
             else:
                 raise TgtgAPIConnectionError("An unexpected error occurred while connecting to TGTG API.") from e
 
+    def _parse_favorite(self, raw_item: Dict[str, Any]) -> FavoriteRecord:
+        """Read a raw favorite into a record; with strict validation, through the full ItemDetails model first."""
+        if self.strict_validation:
+            return FavoriteRecord.from_item_details(ItemDetailsCache.parse(raw_item))
+        return FavoriteRecord.from_raw(raw_item)
+
+    def prewarm_client(
+        self,
+        email: Optional[str], 
+        access_token: Optional[str], 
+        refresh_token: Optional[str], 
+        cookie: Optional[str],
+        last_time_token_refreshed_str: Optional[str]
+    ) -> None:
+        """Create the warm TGTG client and pre-open its connection during the Lambda init phase."""
+        last_time_token_refreshed = datetime.fromisoformat(last_time_token_refreshed_str) if last_time_token_refreshed_str else None
+        tgtg_client = TgtgClientRegistry.get_client(
+            email=email, 
+            access_token=access_token, 
+            refresh_token=refresh_token, 
+            cookie=cookie, 
+            user_agent=self.USER_AGENT, 
+            last_time_token_refreshed=last_time_token_refreshed,
+            device_type="IPHONE"
+        )
+        TgtgClientRegistry.prewarm(tgtg_client)
+
     def get_notification_messages(
         self, 
-        item_details_list: List[ItemDetails]
+        favorites: List[FavoriteRecord],
+        deadline: Optional[Deadline] = None
     ) -> List[str]:
-        """Generate notification messages for available favorite items."""
-        messages = []
-        for item_details in item_details_list:
-            try:
-                notifications = self.database_handler.get_items("storeId", str(item_details.store.store_id))
-            
-                if item_details.items_available > 0 and not self._is_notification_sent_today(notifications):
-                    message = NotificationFormatter.format_message(item_details)
-                    messages.append(message)
-                    self._record_notification(item_details)
-
-            except DatabaseQueryError:
-                continue
-        return messages
-
-    def _is_notification_sent_today(
-        self, 
-        notifications: List[Dict[str, str]]
-    ) -> bool:
-        """Check if a notification was sent for a specific store today."""
-        today_date = datetime.now(pytz.UTC).date()
-        for notification in notifications:
-            last_date_str = notification.get('lastNotificationDate')
-            if not last_date_str:
-                continue
-
-            try:
-                notification_date = datetime.fromisoformat(last_date_str).date()
-                if notification_date == today_date:
-                    return True
-
-            except ValueError:
-                LOGGER.error(f"Invalid date format: {last_date_str}")
-                continue
-        return False
-
-    def _record_notification(
-        self, 
-        item_details: ItemDetails
-    ) -> None:
-        """Save notification data in the database."""
-        try:
-            self.database_handler.put_item({
-                'storeId': str(item_details.store.store_id),
-                'lastNotificationDate': datetime.now(pytz.utc).isoformat(),
-                'itemsAvailable': str(item_details.items_available),
-            })
-        except DatabaseQueryError as e:
-            LOGGER.error(f"Failed to record notification for store ID {item_details.store.store_id}: {e}")
\ No newline at end of file
+        """
+        Generate notification messages for the stock changes of favorite stores since the previous poll:
+        restocks, new pickup slots and price changes, at most one message per store.
+        Stores left when the deadline is reached are picked up by the next run.
+        """
+        return [notification.text for notification in self.get_notifications(favorites, deadline)]
+
+    def get_notifications(
+        self,
+        favorites: List[FavoriteRecord],
+        deadline: Optional[Deadline] = None
+    ) -> List[Notification]:
+        """Same as get_notification_messages, with each message's store and observation time for time-to-notify metrics."""
+        events_by_store: Dict[str, List[StockEvent]] = {}
+        for event in self.change_detector.detect(favorites, deadline):
+            LOGGER.debug("Store ID %s: %s (%s -> %s bags)", event.current.store_id, event.event_type.value, event.previous and event.previous.items_available, event.current.items_available)
+            if event.event_type in self.NOTIFIED_EVENT_TYPES:
+                events_by_store.setdefault(event.current.store_id, []).append(event)
+        return [
+            Notification(
+                text=NotificationFormatter.format_stock_events(events),
+                store_id=store_id,
+                observed_at=min((event.observed_at for event in events if event.observed_at is not None), default=None),
+                appeared_after=min((event.appeared_after for event in events if event.appeared_after is not None), default=None)
+            )
+            for store_id, events in events_by_store.items()
+        ]
@@ -0,0 +1,51 @@
+import statistics, time, pytz
+from datetime import datetime
+from typing import Iterable, List, Optional
+from app.common.logger import get_logger
+from app.common.metrics import METRICS
+from app.core.outbox import OutboxMessage
+from app.core.scheduler import Scheduler
+
+LOGGER = get_logger(__name__)
+
+UNKNOWN_STORE_ID = "unknown"
+
+def estimated_change_time(
+    observed_at: int,
+    appeared_after: Optional[int] = None
+) -> float:
+    """
+    When a change most likely happened: halfway between the poll that saw it and the previous one, as it is equally
+    likely anywhere in between. Without a previous poll, the poll that saw it is the only estimate.
+    """
+    if appeared_after is None or appeared_after >= observed_at:
+        return float(observed_at)
+    return (observed_at + appeared_after) / 2
+
+def record_time_to_notify(
+    messages: Iterable[OutboxMessage],
+    delivered_at: Optional[float] = None
+) -> List[float]:
+    """
+    Publish how long delivered notifications took from their estimated change time to Telegram accepting them, so the
+    time spent before a poll noticed the change counts as much as delivery. Recorded per scheduler window (of the
+    estimated change time), with the store id as a log property rather than a dimension. Return the latencies in seconds.
+    """
+    delivered_at = delivered_at or time.time()
+    latencies = []
+    for message in messages:
+        if message.observed_at is None:
+            continue
+        changed_at = estimated_change_time(message.observed_at, message.appeared_after)
+        seconds = max(0.0, delivered_at - changed_at)
+        window = Scheduler.window_name_at(datetime.fromtimestamp(changed_at, pytz.utc))
+        store_id = message.store_id or UNKNOWN_STORE_ID
+        METRICS.observe("TimeToNotify", seconds, "Seconds", properties={"StoreId": store_id}, Window=window)
+        if message.appeared_after is not None:
+            upper_bound = max(seconds, delivered_at - message.appeared_after)
+            METRICS.observe("TimeToNotifyUpperBound", upper_bound, "Seconds", properties={"StoreId": store_id}, Window=window)
+        latencies.append(seconds)
+
+    if latencies:
+        LOGGER.info("Time to notify of %d notifications: median %.0fs, max %.0fs.", len(latencies), statistics.median(latencies), max(latencies))
+    return latencies
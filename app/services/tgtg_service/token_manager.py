@@ -0,0 +1,131 @@
+import datetime, threading, time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Optional
+from app.common.logger import get_logger
+
+LOGGER = get_logger(__name__)
+
+DEFAULT_REFRESH_AHEAD = 15 * 60  # Refresh 15 minutes before the access token expires
+REFRESH_WAIT_TIMEOUT = 10  # Seconds
+
+class TokenManager:
+    """
+    Holds the TGTG tokens and their expiry, and refreshes them ahead of time.
+    Concurrent refresh attempts are coalesced into a single request.
+    """
+    _executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="tgtg-token-refresh")
+
+    def __init__(
+        self,
+        access_token: Optional[str] = None,
+        refresh_token: Optional[str] = None,
+        cookie: Optional[str] = None,
+        last_time_token_refreshed: Optional[datetime.datetime] = None,
+        access_token_lifetime: float = 0,
+        refresh_ahead: float = DEFAULT_REFRESH_AHEAD
+    ):
+        self.access_token = access_token
+        self.refresh_token = refresh_token
+        self.cookie = cookie
+        self.access_token_lifetime = access_token_lifetime
+        self.refresh_ahead = min(refresh_ahead, access_token_lifetime / 2)
+        self._lock = threading.Lock()
+        self._refresh_future: Optional[Future] = None
+        self.last_time_token_refreshed = last_time_token_refreshed
+
+    @property
+    def last_time_token_refreshed(self) -> Optional[datetime.datetime]:
+        return self._last_time_token_refreshed
+
+    @last_time_token_refreshed.setter
+    def last_time_token_refreshed(self, value: Optional[datetime.datetime]) -> None:
+        # Normalise once here so validity checks on the hot path are a single float comparison
+        if value is not None and value.tzinfo is None:
+            value = value.replace(tzinfo=datetime.timezone.utc)
+        self._last_time_token_refreshed = value
+        self._valid_until_ts = value.timestamp() + self.access_token_lifetime if value else 0.0
+
+    @property
+    def valid_until(self) -> Optional[datetime.datetime]:
+        """Time at which the access token expires, or None if the refresh time is unknown."""
+        if not self._valid_until_ts:
+            return None
+        return datetime.datetime.fromtimestamp(self._valid_until_ts, tz=datetime.timezone.utc)
+
+    def is_valid(self, margin: float = 0) -> bool:
+        """Cheap check that the access token is still valid for at least `margin` seconds."""
+        return bool(self.access_token) and time.time() + margin < self._valid_until_ts
+
+    def needs_refresh(self) -> bool:
+        """True when the token is expired or inside the refresh-ahead window."""
+        return not self.is_valid(margin=self.refresh_ahead)
+
+    def update(
+        self,
+        access_token: str,
+        refresh_token: str,
+        cookie: Optional[str] = None,
+        last_time_token_refreshed: Optional[datetime.datetime] = None
+    ) -> None:
+        """Store freshly issued tokens."""
+        self.access_token = access_token
+        self.refresh_token = refresh_token
+        if cookie is not None:
+            self.cookie = cookie
+        self.last_time_token_refreshed = last_time_token_refreshed or datetime.datetime.now(datetime.timezone.utc)
+
+    def ensure_valid(self, refresh: Callable[[], None]) -> None:
+        """Block until the access token is valid, refreshing it (single-flight) only if it has expired."""
+        if self.is_valid():
+            return
+        self._start_refresh(refresh, run_inline=True).result()
+
+    def refresh_ahead_in_background(self, refresh: Callable[[], None]) -> Optional[Future]:
+        """
+        Start a background refresh if the token is inside the refresh-ahead window.
+        An expired token is refreshed inline since no call can be made with it.
+        """
+        if not self.needs_refresh():
+            return None
+
+        if not self.is_valid():
+            self.ensure_valid(refresh)
+            return None
+
+        LOGGER.info("Access token expires at %s, refreshing ahead in the background.", self.valid_until)
+        return self._start_refresh(refresh, run_inline=False)
+
+    def wait_for_refresh(self, timeout: float = REFRESH_WAIT_TIMEOUT) -> None:
+        """Wait for an in-flight background refresh, so the latest tokens can be persisted."""
+        future = self._refresh_future
+        if future is None:
+            return
+        try:
+            future.result(timeout=timeout)
+
+        except Exception as e:
+            LOGGER.warning("Background token refresh did not complete: %s", e)
+
+    def _start_refresh(
+        self,
+        refresh: Callable[[], None],
+        run_inline: bool
+    ) -> Future:
+        with self._lock:
+            if self._refresh_future is not None and not self._refresh_future.done():
+                return self._refresh_future
+
+            if not run_inline:
+                self._refresh_future = self._executor.submit(refresh)
+                return self._refresh_future
+
+            self._refresh_future = Future()
+            future = self._refresh_future
+
+        try:
+            refresh()
+            future.set_result(None)
+
+        except Exception as e:
+            future.set_exception(e)
+        return future
@@ -1,10 +1,21 @@
-from typing import Optional
+import time
+from typing import Dict, List, Optional
+from app.common.constants import NOTIFICATION_DELIVERY_RESERVE
+from app.common.deadline import Deadline
+from app.core.exceptions import DeadlineExceededError
+from app.core.outbox import OutboxMessage, get_outbox
 from app.core.scheduler import Scheduler
-from app.services.tgtg_service.tgtg_service import TgtgService, Credentials
+from app.services.tgtg_service.tgtg_service import TgtgService, Credentials, Notification
+from app.services.tgtg_service.credential_store import CredentialStore
+from app.services.tgtg_service.time_to_notify import record_time_to_notify
+from app.core.state_store import get_state_store
 from app.services.tgtg_service.exceptions import TgtgAPIConnectionError, TgtgAPIParsingError, ForbiddenError
-from app.common.logger import LOGGER
+from app.common.logger import PayloadSample, get_logger
+from app.common.metrics import METRICS
 from app.common.utils import Utils
 
+LOGGER = get_logger(__name__)
+
 class TgtgServiceMonitor:
     def __init__(self):
         self.user_email: Optional[str] = Utils.get_environment_variable("USER_EMAIL")
@@ -12,90 +23,225 @@ class TgtgServiceMonitor:
         self.refresh_token: Optional[str] = Utils.get_environment_variable("REFRESH_TOKEN")
         self.tgtg_cookie: Optional[str] = Utils.get_environment_variable("TGTG_COOKIE")
         self.last_time_token_refreshed: Optional[str] = Utils.get_environment_variable("LAST_TIME_TOKEN_REFRESHED")
-        aws_account_id = Utils.get_environment_variable("AWS_ACCOUNT_ID")
-        aws_region = Utils.get_environment_variable("DEFAULT_AWS_REGION")
-        self.monitoring_lambda_arn = f"arn:aws:lambda:{aws_region}:{aws_account_id}:function:too-good-notify-monitoring"
         self.tgtg_service = TgtgService()
+        self.credential_store = CredentialStore(get_state_store())
+        self.outbox = get_outbox()
+
+    def load_stored_credentials(self) -> None:
+        """Use the rotated tokens from the credential store, if any, instead of the deployment-time environment variables."""
+        try:
+            stored_credentials = self.credential_store.load()
+
+        except Exception as e:
+            LOGGER.error("Unable to read TGTG credentials from the credential store, using environment variables: %s", e)
+            return
+
+        if stored_credentials and stored_credentials.access_token and stored_credentials.refresh_token:
+            self.access_token = stored_credentials.access_token
+            self.refresh_token = stored_credentials.refresh_token
+            self.tgtg_cookie = stored_credentials.cookie
+            self.last_time_token_refreshed = stored_credentials.get_last_time_token_refreshed_as_str() or None
     
-    def start_monitoring(self, scheduler: Scheduler) -> None:
+    def start_monitoring(
+        self, 
+        scheduler: Scheduler,
+        deadline: Optional[Deadline] = None
+    ) -> None:
         """
         Start the monitoring process by checking for valid credentials. 
-        If the credentials are valid, it proceeds to monitor the favorites.
+        If the credentials are valid, it proceeds to monitor the favorites within the invocation deadline.
+        Notifications left undelivered by previous runs are retried first.
         """
+        deadline = deadline or Deadline.unbounded()
+        self.deliver_pending_notifications(deadline)
+        self.load_stored_credentials()
         if not (self.user_email or self.access_token and self.refresh_token and self.tgtg_cookie):
             LOGGER.error("Missing or invalid credentials. Please ensure that all your environment variables are set correctly.")
-            LOGGER.error(f"Current credentials are: user_email: {self.user_email}, access_token: {self.access_token}, refresh_token: {self.refresh_token}, tgtg_cookie: {self.tgtg_cookie}")
+            LOGGER.error("Missing credentials: %s", ", ".join(self._missing_credentials()))
             return None
 
-        self._monitor_favorites(scheduler)
+        self._monitor_favorites(scheduler, deadline)
+
+    def _missing_credentials(self) -> List[str]:
+        """Names of the unset credential fields, never their values."""
+        credentials = {
+            "user_email": self.user_email,
+            "access_token": self.access_token,
+            "refresh_token": self.refresh_token,
+            "tgtg_cookie": self.tgtg_cookie,
+        }
+        return [name for name, value in credentials.items() if not value]
+
+    def prewarm_connection(self) -> None:
+        """Build the TGTG client and open its connection ahead of the first monitoring tick."""
+        try:
+            self.load_stored_credentials()
+            self.tgtg_service.prewarm_client(
+                self.user_email, 
+                self.access_token, 
+                self.refresh_token, 
+                self.tgtg_cookie,
+                self.last_time_token_refreshed
+            )
+
+        except Exception as e:
+            LOGGER.warning("Unable to prewarm TGTG connection: %s", e)
 
     def has_tgtg_token_credentials_been_updated(self) -> bool:
         """Check if the new credentials retrieved differ from the current ones."""
         try:
             new_credentials = self.tgtg_service.credentials
             token_credentials_updated = (
-                new_credentials.access_token != Utils.get_environment_variable("ACCESS_TOKEN") or
-                new_credentials.refresh_token != Utils.get_environment_variable("REFRESH_TOKEN")
+                new_credentials.access_token != self.access_token or
+                new_credentials.refresh_token != self.refresh_token
             )
             return token_credentials_updated
 
         except Exception as e:
-            LOGGER.error(f"Error checking if TGTG credentials have been updated: {e}")
+            LOGGER.error("Error checking if TGTG credentials have been updated: %s", e)
             return False
 
-    def _monitor_favorites(self, scheduler: Scheduler) -> None:
-        """Check favorite items and send notifications if new items are available."""
-        LOGGER.info("Checking favorite items and sending notifications if needed.")
+    def _monitor_favorites(
+        self, 
+        scheduler: Scheduler,
+        deadline: Deadline
+    ) -> None:
+        """
+        Check favorite items and send notifications if new items are available.
+        TGTG and DynamoDB calls stop early enough to keep NOTIFICATION_DELIVERY_RESERVE seconds for Telegram,
+        so notifications already computed are always sent.
+        """
+        LOGGER.info("Checking favorite items and sending notifications if needed (%.1fs left).", deadline.remaining())
+        work_deadline = deadline.with_reserve(NOTIFICATION_DELIVERY_RESERVE)
         try:
-            favorites = self.tgtg_service.get_favorites_items_list(
-                self.user_email, 
-                self.access_token, 
-                self.refresh_token, 
-                self.tgtg_cookie,
-                self.last_time_token_refreshed
-            )
+            with METRICS.timer("TgtgFavorites"):
+                favorites = self.tgtg_service.get_favorites_items_list(
+                    self.user_email, 
+                    self.access_token, 
+                    self.refresh_token, 
+                    self.tgtg_cookie,
+                    self.last_time_token_refreshed,
+                    deadline=work_deadline
+                )
 
-            LOGGER.info("Will check if env var credentials needs to be udpated...")
+            LOGGER.info("Will check if stored credentials need to be updated...")
 
             if self.has_tgtg_token_credentials_been_updated():
-                self.update_credentials_env_vars(new_credentials=self.tgtg_service.credentials)
+                with METRICS.timer("CredentialsPersist"):
+                    self.persist_credentials(new_credentials=self.tgtg_service.credentials)
             
-            messages = self.tgtg_service.get_notification_messages(favorites)
+            with METRICS.timer("ChangeDetection"):
+                notifications = self.tgtg_service.get_notifications(favorites, deadline=work_deadline)
 
-            for message in messages:
-                LOGGER.info(f"Sending Telegram message: {message}")
-                Utils.send_telegram_message(message)
-
-            if not messages:
+            if notifications:
+                LOGGER.info("Sending %d Telegram messages.", len(notifications))
+                LOGGER.debug("Telegram messages: %s", PayloadSample([notification.text for notification in notifications]))
+                with METRICS.timer("TelegramSend"):
+                    self._send_notifications(notifications, deadline)
+            else:
                 LOGGER.info("No new items available - no notifications sent.")
 
+        except DeadlineExceededError as e:
+            LOGGER.warning("Monitoring stopped before any favorites were fetched: %s", e)
+
         except TgtgAPIParsingError as e:
             error_msg = f"TgtgAPIParsingError encountered: {str(e)}"
             LOGGER.error(error_msg)
-            Utils.send_telegram_message(f"TgtgAPIParsingError: {error_msg}")
+            Utils.send_telegram_message(f"TgtgAPIParsingError: {error_msg}", deadline=deadline)
 
         except ForbiddenError as e:
             LOGGER.error(str(e))
             scheduler.activate_cooldown()
-            Utils.send_telegram_message("API access forbidden. Monitoring paused temporarily.")
+            Utils.send_telegram_message("API access forbidden. Monitoring paused temporarily.", deadline=deadline)
 
         except TgtgAPIConnectionError as e:
-            LOGGER.error(f"Connection error to TGTG API. {str(e)}")
-            Utils.send_telegram_message(f"TGTG API connection error: {str(e)}")
+            LOGGER.error("Connection error to TGTG API. %s", e)
+            Utils.send_telegram_message(f"TGTG API connection error: {str(e)}", deadline=deadline)
         
         except Exception as e:
-            LOGGER.error(f"Unexpected error in _monitor_favorites: {str(e)}")
-            Utils.send_telegram_message(f"TooGoodToNotify: Unexpected system error - {str(e)}")
-    
-    def update_credentials_env_vars(
+            LOGGER.error("Unexpected error in _monitor_favorites: %s", e)
+            Utils.send_telegram_message(f"TooGoodToNotify: Unexpected system error - {str(e)}", deadline=deadline)
+
+    def deliver_pending_notifications(self, deadline: Deadline) -> None:
+        """Retry notifications that previous runs enqueued in the outbox but could not deliver, once leased to this run."""
+        try:
+            pending_messages = self.outbox.claim(self.outbox.pending(deadline=deadline), deadline=deadline)
+
+        except Exception as e:
+            LOGGER.error("Unable to claim pending Telegram notifications from the outbox: %s", e)
+            return
+
+        if pending_messages:
+            LOGGER.info("Retrying %d undelivered Telegram notifications from the outbox.", len(pending_messages))
+            with METRICS.timer("OutboxRetry"):
+                self._deliver(pending_messages, deadline)
+
+    def _send_notifications(
+        self, 
+        notifications: List[Notification],
+        deadline: Deadline
+    ) -> None:
+        """Write notifications to the outbox before sending them, so a failed send is retried on the next run."""
+        outbox_messages, unqueued_messages = [], []
+        for notification in notifications:
+            try:
+                outbox_messages.append(self.outbox.enqueue(
+                    notification.text,
+                    store_id=notification.store_id,
+                    observed_at=notification.observed_at,
+                    appeared_after=notification.appeared_after,
+                    deadline=deadline
+                ))
+
+            except Exception as e:
+                LOGGER.error("Unable to enqueue Telegram notification in the outbox, sending it without retry: %s", e)
+                unqueued_messages.append(notification.text)
+
+        if unqueued_messages:
+            Utils.send_telegram_messages(unqueued_messages, deadline=deadline)
+        self._deliver(outbox_messages, deadline)
+
+    def _deliver(
+        self, 
+        outbox_messages: List[OutboxMessage],
+        deadline: Deadline
+    ) -> None:
+        """
+        Send outbox messages concurrently, then mark each one delivered or count the failed attempt.
+        Delivered messages report their time to notify, retries from earlier runs included.
+        """
+        messages_by_chat: Dict[Optional[str], List[OutboxMessage]] = {}
+        for outbox_message in outbox_messages:
+            messages_by_chat.setdefault(outbox_message.chat_id, []).append(outbox_message)
+
+        for chat_id, chat_messages in messages_by_chat.items():
+            delivered = Utils.send_telegram_messages([message.text for message in chat_messages], chat_id=chat_id, deadline=deadline)
+            record_time_to_notify([message for message, is_delivered in zip(chat_messages, delivered) if is_delivered], time.time())
+            for outbox_message, is_delivered in zip(chat_messages, delivered):
+                try:
+                    if is_delivered:
+                        self.outbox.mark_delivered(outbox_message, deadline=deadline)
+                    else:
+                        self.outbox.record_failure(outbox_message, deadline=deadline)
+
+                except Exception as e:
+                    LOGGER.error("Unable to update outbox message %s: %s", outbox_message.message_id, e)
+
+            if not all(delivered):
+                LOGGER.error("%d of %d Telegram messages could not be delivered and will be retried.", delivered.count(False), len(chat_messages))
+
+    def persist_credentials(
         self, 
         new_credentials: Credentials
-    ):
-        LOGGER.info(f"Will update env vars with new TGTG credentials: {new_credentials}")
-        new_env_vars = {
-            "ACCESS_TOKEN": new_credentials.access_token,
-            "REFRESH_TOKEN": new_credentials.refresh_token,
-            "TGTG_COOKIE": new_credentials.cookie,
-            "LAST_TIME_TOKEN_REFRESHED": new_credentials.get_last_time_token_refreshed_as_str()
-        }
-        Utils.update_lambda_env_vars(self.monitoring_lambda_arn, new_env_vars)
\ No newline at end of file
+    ) -> None:
+        """Save rotated TGTG credentials to the credential store."""
+        LOGGER.info("Will persist new TGTG credentials to the credential store.")
+        try:
+            if self.credential_store.save(new_credentials):
+                self.access_token = new_credentials.access_token
+                self.refresh_token = new_credentials.refresh_token
+                self.tgtg_cookie = new_credentials.cookie
+                self.last_time_token_refreshed = new_credentials.get_last_time_token_refreshed_as_str() or None
+
+        except Exception as e:
+            LOGGER.error("Failed to persist TGTG credentials: %s", e)
\ No newline at end of file
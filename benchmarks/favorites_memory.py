@@ -0,0 +1,68 @@
+"""
+Memory and parse time of the favorites list, as pydantic ItemDetails models and as slotted FavoriteRecords.
+
+    python benchmarks/favorites_memory.py [--sizes 50 500 5000] [--runs 5]
+
+Memory is what the parsed list keeps alive once the raw API payload is released, measured with tracemalloc.
+"""
+import argparse, gc, json, os, statistics, sys, time, tracemalloc
+from typing import Any, Callable, Dict, List, Tuple
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+from benchmarks.notification_load import build_raw_items
+from app.services.tgtg_service.favorite_record import FavoriteRecord
+from app.services.tgtg_service.models import ItemDetails
+
+PARSERS: Dict[str, Callable[[Dict[str, Any]], Any]] = {
+    "ItemDetails": lambda raw_item: ItemDetails(**raw_item),
+    "FavoriteRecord": FavoriteRecord.from_raw,
+}
+
+def retained_bytes(parser: Callable[[Dict[str, Any]], Any], raw_items: List[Dict[str, Any]]) -> int:
+    """Bytes still allocated by the parsed list after the raw payload it was built from is freed."""
+    # Decode the payload inside the traced window, like each poll does, so strings kept by the parsed list are counted
+    encoded = json.dumps(raw_items)
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    payload = json.loads(encoded)
+    parsed = [parser(raw_item) for raw_item in payload]
+    del payload
+    gc.collect()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del parsed
+    return after - before
+
+def parse_seconds(parser: Callable[[Dict[str, Any]], Any], raw_items: List[Dict[str, Any]], runs: int) -> float:
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        for raw_item in raw_items:
+            parser(raw_item)
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings)
+
+def measure(size: int, runs: int) -> List[Tuple[str, int, float]]:
+    raw_items = build_raw_items(size)
+    return [(name, retained_bytes(parser, raw_items), parse_seconds(parser, raw_items, runs)) for name, parser in PARSERS.items()]
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[50, 500, 5000])
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'items':>6}  {'model':<15} {'retained':>10} {'per item':>9} {'parse':>10} {'per item':>9}")
+    for size in args.sizes:
+        for name, retained, seconds in measure(size, args.runs):
+            print(
+                f"{size:>6}  {name:<15} {retained / 1024:>8.1f}KB {retained / size:>8.0f}B "
+                f"{seconds * 1000:>8.2f}ms {seconds / size * 1e6:>7.1f}us"
+            )
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
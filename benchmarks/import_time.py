@@ -0,0 +1,75 @@
+"""
+Cold-start import cost of each Lambda entry point, measured with `python -X importtime` in a fresh interpreter.
+
+    python benchmarks/import_time.py [--runs 5] [--top 10] [--check]
+
+With --check the script exits with status 1 when a handler's median import time exceeds its budget.
+"""
+import argparse, os, statistics, subprocess, sys
+from typing import Dict, List, Tuple
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Modules each handler imports on its first invocation, on top of app.handlers itself
+HANDLER_IMPORTS: Dict[str, List[str]] = {
+    "tgtg_monitoring_handler": ["app.common.deadline", "app.core.scheduler", "app.services.tgtg_service_monitor"],
+    "lambda_scheduler": ["app.core.scheduler"],
+    "telegram_webhook_handler": ["app.common.utils", "app.core.scheduler", "app.services.telegram_service"],
+}
+
+# Median milliseconds, measured on a Lambda-sized machine with some headroom
+IMPORT_BUDGETS_MS: Dict[str, float] = {
+    "tgtg_monitoring_handler": 900,
+    "lambda_scheduler": 600,
+    "telegram_webhook_handler": 1200,
+}
+
+def measure(handler: str) -> Tuple[float, List[Tuple[float, str]]]:
+    """Return the total import time (ms) of a handler and the cumulative time (ms) of each top-level import."""
+    statement = "; ".join(f"import {module}" for module in ["app.handlers", *HANDLER_IMPORTS[handler]])
+    env = {**os.environ, "PYTHONPATH": REPO_ROOT, "AWS_LAMBDA_FUNCTION_NAME": "import-time-benchmark", "TGTG_PREWARM_CONNECTION": "false"}
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", statement],
+        cwd=REPO_ROOT, env=env, capture_output=True, text=True, check=True
+    )
+
+    top_level = _top_level_entries(result.stderr)
+    return sum(ms for ms, _ in top_level), sorted(top_level, reverse=True)
+
+def _top_level_entries(report: str) -> List[Tuple[float, str]]:
+    """Parse the -X importtime report, keeping only top-level imports (nested ones are in their parent's cumulative time)."""
+    entries = []
+    for line in report.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, raw_name = line[len("import time:"):].split("|")
+        if raw_name.startswith("  "):
+            continue
+        entries.append((int(cumulative) / 1000, raw_name.strip()))
+    return entries
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=10)
+    parser.add_argument("--check", action="store_true", help="Fail when a handler exceeds its import budget.")
+    args = parser.parse_args()
+
+    over_budget = []
+    for handler in HANDLER_IMPORTS:
+        samples = [measure(handler) for _ in range(args.runs)]
+        median_ms = statistics.median(total for total, _ in samples)
+        budget_ms = IMPORT_BUDGETS_MS[handler]
+        print(f"\n{handler}: {median_ms:.1f} ms median over {args.runs} runs (budget {budget_ms:.0f} ms)")
+        for module_ms, module in samples[-1][1][:args.top]:
+            print(f"  {module_ms:8.1f} ms  {module}")
+        if median_ms > budget_ms:
+            over_budget.append(handler)
+
+    if over_budget:
+        print(f"\nOver import budget: {', '.join(over_budget)}")
+        return 1 if args.check else 0
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
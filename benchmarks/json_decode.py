@@ -0,0 +1,83 @@
+"""
+Decode time of TGTG and Telegram response bodies, comparing the old one-parse-per-field pattern with json_codec.
+
+    python benchmarks/json_decode.py [--items 50 400] [--runs 200]
+
+The payloads are synthetic bodies shaped like the real responses, not recorded ones: a favorites page whose items are
+built like the load test's, a create_order response read for both `state` and `order`, and a Telegram 429 read for
+`parameters.retry_after`.
+"""
+import argparse, json, os, statistics, sys, time
+from typing import Any, Callable, Dict, List, Tuple
+from unittest.mock import MagicMock
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+from benchmarks.notification_load import build_raw_items
+from app.common import json_codec
+from app.common.json_codec import decode_response
+
+TELEGRAM_RATE_LIMITED = {"ok": False, "error_code": 429, "description": "Too Many Requests: retry after 3", "parameters": {"retry_after": 3}}
+
+def build_payloads(items: int) -> Dict[str, Tuple[bytes, List[str]]]:
+    """Encoded bodies and the fields each call site reads from them."""
+    raw_items = build_raw_items(items)
+    return {
+        f"favorites x{items}": (json.dumps({"mobile_bucket": {"items": raw_items}}).encode(), ["mobile_bucket.items"]),
+        "create_order": (json.dumps({"state": "SUCCESS", "order": {"id": "order-1", **raw_items[0]}}).encode(), ["state", "order"]),
+        "telegram 429": (json.dumps(TELEGRAM_RATE_LIMITED).encode(), ["parameters.retry_after"]),
+    }
+
+def make_response(body: bytes) -> MagicMock:
+    response = MagicMock()
+    response.content = body
+    response.json.side_effect = lambda: json.loads(body)
+    return response
+
+def per_field_json(response: MagicMock, fields: List[str]) -> None:
+    """What the clients did before: every field read called response.json() again."""
+    for field in fields:
+        json_codec.extract(response.json(), field)
+
+def codec_once(response: MagicMock, fields: List[str]) -> None:
+    for field in fields:
+        decode_response(response, field)
+
+def median_seconds(decode: Callable[[Any, List[str]], None], body: bytes, fields: List[str], runs: int) -> float:
+    responses = [make_response(body) for _ in range(runs)]
+    timings = []
+    for response in responses:
+        start = time.perf_counter()
+        decode(response, fields)
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings)
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--items", type=int, nargs="+", default=[50, 400])
+    parser.add_argument("--runs", type=int, default=200)
+    args = parser.parse_args()
+
+    payloads = {}
+    for items in args.items:
+        payloads.update(build_payloads(items))
+
+    fast_backend = json_codec.orjson
+    strategies = [("response.json per field", per_field_json, None), ("json_codec (json)", codec_once, None)]
+    if fast_backend is not None:
+        strategies.append(("json_codec (orjson)", codec_once, fast_backend))
+    else:
+        print("orjson is not installed, only the stdlib backend is measured")
+
+    print(f"{'payload':<16} {'size':>8}  {'strategy':<24} {'decode':>10}")
+    for name, (body, fields) in payloads.items():
+        for label, decode, backend in strategies:
+            json_codec.orjson = backend
+            seconds = median_seconds(decode, body, fields, args.runs)
+            print(f"{name:<16} {len(body) / 1024:>6.1f}KB  {label:<24} {seconds * 1e6:>8.1f}us")
+    json_codec.orjson = fast_backend
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,123 @@
+"""
+Local load test of the notification pipeline: TgtgService.get_notification_messages over thousands of stores,
+on the in-memory and SQLite storage backends (no AWS needed).
+
+    python benchmarks/notification_load.py [--stores 5000] [--runs 3] [--backends memory sqlite]
+
+Each run polls every store three times: the first pass finds no snapshot and writes one per store (all restocks),
+the second finds nothing changed on a warm container, and the third finds nothing changed on a cold container
+(snapshots read back from storage). The last two are the common shapes of a monitoring run.
+Strict parsing of the raw favorites (TGTG_STRICT_VALIDATION) is measured first, on a cold and on a warm ItemDetailsCache.
+"""
+import argparse, copy, logging, os, statistics, sys, tempfile, time
+from typing import Any, Dict, List
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+from app.core.storage_backend import InMemoryStorageBackend, SQLiteStorageBackend, StorageBackend
+from app.services.tgtg_service.change_detector import ChangeDetector
+from app.services.tgtg_service.item_details_cache import ItemDetailsCache
+from app.services.tgtg_service.favorite_record import FavoriteRecord
+from app.services.tgtg_service.tgtg_service import TgtgService
+
+ITEM_TEMPLATE: Dict[str, Any] = {
+    "item": {
+        "item_id": "0",
+        "item_price": {"code": "EUR", "minor_units": 599, "decimals": 2},
+        "item_value": {"code": "EUR", "minor_units": 1599, "decimals": 2},
+        "cover_picture": {"picture_id": "cover", "current_url": "http://example.com/cover", "is_automatically_created": False},
+        "logo_picture": {"picture_id": "logo", "current_url": "http://example.com/logo", "is_automatically_created": False},
+        "name": "Magic Bag",
+        "description": "Surprise bag",
+    },
+    "store": {
+        "store_id": "0",
+        "store_name": "Store",
+        "website": None,
+        "store_location": {"address": {"address_line": "1 Main Street", "latitude": 48.8566, "longitude": 2.3522}},
+        "logo_picture": {"picture_id": "logo", "current_url": "http://example.com/logo", "is_automatically_created": False},
+        "cover_picture": {"picture_id": "cover", "current_url": "http://example.com/cover", "is_automatically_created": False},
+        "store_time_zone": "Europe/Paris",
+    },
+    "display_name": "Store - Magic Bag",
+    "items_available": 2,
+    "distance": 1.5,
+    "favorite": True,
+    "item_type": "MAGIC_BAG",
+    "pickup_location": {"address": {"address_line": "1 Main Street"}, "location": {"latitude": 48.8566, "longitude": 2.3522}},
+    "pickup_interval": {"start": "2024-03-20T14:00:00Z", "end": "2024-03-20T18:00:00Z"},
+}
+
+def build_raw_items(store_count: int) -> List[Dict[str, Any]]:
+    raw_items = []
+    for store_id in range(store_count):
+        payload = copy.deepcopy(ITEM_TEMPLATE)
+        payload["item"]["item_id"] = str(store_id)
+        payload["store"]["store_id"] = str(store_id)
+        raw_items.append(payload)
+    return raw_items
+
+def measure_parsing(raw_items: List[Dict[str, Any]], runs: int) -> Dict[str, float]:
+    """Return the median seconds to parse every favorite with an empty cache, and again on the next (identical) poll."""
+    timings: Dict[str, List[float]] = {"parse_cold": [], "parse_warm": []}
+    for _ in range(runs):
+        ItemDetailsCache.clear()
+        for name in timings:
+            # Each poll decodes a fresh response, so the cache compares new dicts, never the same objects
+            poll = copy.deepcopy(raw_items)
+            start = time.perf_counter()
+            for raw_item in poll:
+                ItemDetailsCache.parse(raw_item)
+            timings[name].append(time.perf_counter() - start)
+    ItemDetailsCache.clear()
+    return {name: statistics.median(seconds) for name, seconds in timings.items()}
+
+def build_storage(backend: str, directory: str, run: int) -> StorageBackend:
+    table_name = f"{TgtgService.NOTIFICATIONS_TABLE_NAME}_{run}"
+    if backend == "memory":
+        return InMemoryStorageBackend(table_name, TgtgService.NOTIFICATIONS_KEY_NAMES)
+    return SQLiteStorageBackend(table_name, TgtgService.NOTIFICATIONS_KEY_NAMES, os.path.join(directory, "storage.db"))
+
+def measure(backend: str, items: List[FavoriteRecord], runs: int) -> Dict[str, float]:
+    """Return the median seconds of the first (all restocks), warm and cold (nothing changed) passes."""
+    timings: Dict[str, List[float]] = {"first_pass": [], "warm_pass": [], "cold_pass": []}
+    with tempfile.TemporaryDirectory() as directory:
+        for run in range(runs):
+            ChangeDetector.clear()
+            tgtg_service = TgtgService(storage=build_storage(backend, directory, run))
+            for name in timings:
+                if name == "cold_pass":
+                    ChangeDetector.clear()
+                start = time.perf_counter()
+                messages = tgtg_service.get_notification_messages(items)
+                timings[name].append(time.perf_counter() - start)
+                expected = len(items) if name == "first_pass" else 0
+                assert len(messages) == expected, f"{backend} {name}: expected {expected} messages, got {len(messages)}"
+        SQLiteStorageBackend.close_all()
+    InMemoryStorageBackend.clear()
+    ChangeDetector.clear()
+    return {name: statistics.median(seconds) for name, seconds in timings.items()}
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--stores", type=int, default=5000)
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--backends", nargs="+", choices=["memory", "sqlite"], default=["memory", "sqlite"])
+    args = parser.parse_args()
+
+    # Per-run log lines would dominate the measurement
+    logging.disable(logging.INFO)
+    raw_items = build_raw_items(args.stores)
+    items = [FavoriteRecord.from_raw(raw_item) for raw_item in raw_items]
+    print(f"{args.stores} stores, median of {args.runs} runs")
+    for name, seconds in measure_parsing(raw_items, args.runs).items():
+        print(f"  {'strict':<7} {name:<12} {seconds * 1000:9.1f} ms  {args.stores / seconds:10.0f} stores/s")
+    for backend in args.backends:
+        result = measure(backend, items, args.runs)
+        for name, seconds in result.items():
+            print(f"  {backend:<7} {name:<12} {seconds * 1000:9.1f} ms  {args.stores / seconds:10.0f} stores/s")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
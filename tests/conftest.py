@@ -2,12 +2,70 @@ import pytest
 from unittest.mock import MagicMock
 from app.core.scheduler import Scheduler
 from app.services.tgtg_service_monitor import TgtgServiceMonitor
+from app.services.tgtg_service.client_registry import TgtgClientRegistry
+from app.core.state_store import LocalFileStateStore, set_state_store
+from app.core.outbox import SQLiteOutbox, set_outbox
+from app.core.aws_clients import AwsClients, DYNAMODB_REGION
+from app.common.metrics import METRICS
+from app.common.rate_limiter import RateLimiterRegistry
+from app.common.telegram_sender import TelegramSender
+from app.services.tgtg_service.change_detector import ChangeDetector
+from app.services.tgtg_service.item_details_cache import ItemDetailsCache
+from app.services.tgtg_service.favorite_record import FavoriteRecord
 from app.services.tgtg_service.models import ItemDetails, Store, Item, PickupInterval, PickupLocation, PriceInfo, Picture, Address
 
+@pytest.fixture(autouse=True)
+def reset_tgtg_client_registry():
+    TgtgClientRegistry.clear()
+    TelegramSender.clear()
+    RateLimiterRegistry.clear()
+    ChangeDetector.clear()
+    ItemDetailsCache.clear()
+    yield
+    TgtgClientRegistry.clear()
+    TelegramSender.clear()
+    RateLimiterRegistry.clear()
+    ChangeDetector.clear()
+    ItemDetailsCache.clear()
+
+@pytest.fixture(autouse=True)
+def emitted_metrics(monkeypatch):
+    """EMF lines written to a list instead of stdout."""
+    lines = []
+    monkeypatch.setattr(METRICS, "sink", lines.append)
+    METRICS.reset()
+    yield lines
+    METRICS.reset()
+
+@pytest.fixture(autouse=True)
+def aws_clients():
+    """Local stand-ins for every AWS client, so no test reaches AWS or needs credentials."""
+    AwsClients.clear()
+    AwsClients.register('dynamodb', MagicMock(), kind='resource', region_name=DYNAMODB_REGION)
+    AwsClients.register('events', MagicMock())
+    AwsClients.register('lambda', MagicMock())
+    yield AwsClients
+    AwsClients.clear()
+
+@pytest.fixture(autouse=True)
+def local_state_store(tmp_path):
+    state_store = LocalFileStateStore(str(tmp_path / "state.json"))
+    set_state_store(state_store)
+    yield state_store
+    set_state_store(None)
+
+@pytest.fixture(autouse=True)
+def local_outbox(tmp_path):
+    outbox = SQLiteOutbox(str(tmp_path / "outbox.db"))
+    set_outbox(outbox)
+    yield outbox
+    set_outbox(None)
+
 @pytest.fixture
 def mock_dynamodb_table():
     with MagicMock() as mock_table:
         mock_table.scan = MagicMock(return_value={'Items': []})
+        mock_table.query = MagicMock(return_value={'Items': []})
         mock_table.put_item = MagicMock()
         mock_table.delete_item = MagicMock()
         yield mock_table
@@ -90,4 +148,8 @@ def mock_item_details():
             start="2024-03-20T14:00:00Z",
             end="2024-03-20T18:00:00Z"
         )
-    )
\ No newline at end of file
+    )
+
+@pytest.fixture
+def mock_favorite(mock_item_details):
+    return FavoriteRecord.from_item_details(mock_item_details)
@@ -0,0 +1,51 @@
+import pytest
+from unittest.mock import MagicMock
+from app.core.aws_clients import AwsClients, BOTO_CONFIG, deadline_config, deadline_timeout_step
+from app.core.exceptions import DeadlineExceededError
+
+class TestAwsClients:
+    def test_client_is_created_once_and_reused(self, aws_clients):
+        AwsClients.clear()
+
+        client = AwsClients.client('sqs', region_name='eu-west-3')
+
+        assert AwsClients.client('sqs', region_name='eu-west-3') is client
+        assert client.meta.config.max_pool_connections == BOTO_CONFIG.max_pool_connections
+        assert client.meta.config.retries["mode"] == "adaptive"
+
+    def test_registered_stand_in_is_returned(self, aws_clients):
+        stand_in = MagicMock()
+        AwsClients.register('events', stand_in)
+
+        assert AwsClients.client('events') is stand_in
+
+    def test_clear_drops_cached_instances(self, aws_clients):
+        AwsClients.register('events', MagicMock())
+        AwsClients.clear()
+
+        assert AwsClients._instances == {}
+
+    def test_deadline_clients_fit_their_timeout_without_retries(self, aws_clients):
+        AwsClients.clear()
+
+        resource = AwsClients.resource('dynamodb', region_name='eu-west-3', timeout=1.7)
+
+        assert AwsClients.resource('dynamodb', region_name='eu-west-3', timeout=1.2) is resource
+        assert AwsClients.resource('dynamodb', region_name='eu-west-3') is not resource
+        config = resource.meta.client.meta.config
+        assert config.connect_timeout + config.read_timeout == deadline_timeout_step(1.7) == 1
+        assert config.retries["total_max_attempts"] == 1
+
+    def test_timeout_steps(self):
+        assert [deadline_timeout_step(timeout) for timeout in (0.3, 0.9, 3.5, 30)] == [0.25, 0.5, 2, 4]
+        assert deadline_config(4).connect_timeout == 1
+
+    def test_timeout_below_the_smallest_step_is_refused(self):
+        with pytest.raises(DeadlineExceededError):
+            deadline_timeout_step(0.1)
+
+    def test_registered_stand_in_is_returned_for_any_timeout(self, aws_clients):
+        stand_in = MagicMock()
+        AwsClients.register('dynamodb', stand_in, kind='resource')
+
+        assert AwsClients.resource('dynamodb', timeout=2) is stand_in
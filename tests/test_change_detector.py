@@ -0,0 +1,127 @@
+import json, pytest
+from dataclasses import replace
+from freezegun import freeze_time
+from unittest.mock import MagicMock
+from app.common.metrics import METRICS
+from app.core.storage_backend import InMemoryStorageBackend
+from app.services.tgtg_service.change_detector import ChangeDetector, StockEventType, StoreSnapshot, diff_snapshots
+from app.services.tgtg_service.favorite_record import Price
+
+def snapshot(items_available: int, **fields) -> StoreSnapshot:
+    defaults = dict(price_minor_units=599, price_decimals=2, price_code="EUR", pickup_start="2024-03-20T14:00:00Z", pickup_end="2024-03-20T18:00:00Z")
+    return StoreSnapshot(store_id="123", items_available=items_available, **{**defaults, **fields})
+
+class TestDiffSnapshots:
+    @pytest.mark.parametrize("previous, current, expected", [
+        (None, snapshot(2), [StockEventType.RESTOCK]),
+        (None, snapshot(0), []),
+        (snapshot(0), snapshot(3), [StockEventType.RESTOCK]),
+        (snapshot(3), snapshot(0), [StockEventType.SOLD_OUT]),
+        (snapshot(0), snapshot(0, price_minor_units=499), []),
+        (snapshot(3), snapshot(1), []),
+        (snapshot(3), snapshot(3, pickup_start="2024-03-21T14:00:00Z"), [StockEventType.NEW_PICKUP_SLOT]),
+        (snapshot(3), snapshot(3, price_minor_units=499), [StockEventType.PRICE_CHANGE]),
+        (snapshot(3, price_minor_units=None, pickup_start=None, pickup_end=None), snapshot(3), []),
+    ])
+    def test_events(self, previous, current, expected):
+        assert diff_snapshots(previous, current) == expected
+
+class TestChangeDetector:
+    @pytest.fixture
+    def storage(self):
+        InMemoryStorageBackend.clear()
+        yield InMemoryStorageBackend("StoreNotifications", ("storeId",))
+        InMemoryStorageBackend.clear()
+
+    def test_snapshot_round_trip(self, storage, mock_favorite):
+        ChangeDetector(storage).detect([mock_favorite])
+
+        stored = StoreSnapshot.from_item(storage.get_item({"storeId": "123"}))
+        assert stored.state == StoreSnapshot.from_favorite(mock_favorite).state
+        assert stored.version == 1
+
+    def test_unchanged_store_costs_no_read_or_write_when_warm(self, mock_favorite):
+        storage = MagicMock(table_name="StoreNotifications")
+        storage.batch_get_items.return_value = []
+        storage.put_item_with_condition.return_value = True
+        ChangeDetector(storage).detect([mock_favorite])
+
+        assert ChangeDetector(storage).detect([mock_favorite]) == []
+        storage.batch_get_items.assert_called_once()
+        storage.put_item_with_condition.assert_called_once()
+
+    def test_cold_container_reads_but_does_not_rewrite_unchanged_store(self, storage, mock_favorite):
+        ChangeDetector(storage).detect([mock_favorite])
+        ChangeDetector.clear()
+        storage.put_item_with_condition = MagicMock()
+
+        assert ChangeDetector(storage).detect([mock_favorite]) == []
+        storage.put_item_with_condition.assert_not_called()
+
+    def test_concurrent_poll_reports_transition_once(self, storage, mock_favorite):
+        sold_out = replace(mock_favorite, items_available=0)
+        ChangeDetector(storage).detect([sold_out])
+
+        # Both containers read the sold out snapshot before either writes the restock
+        first, second = ChangeDetector(storage), ChangeDetector(storage)
+        ChangeDetector.clear()
+        previous = first._load(["123"])["123"]
+        events = first.detect([mock_favorite])
+        ChangeDetector.clear()
+        second._load = MagicMock(return_value={"123": previous})
+
+        assert [event.event_type for event in events] == [StockEventType.RESTOCK]
+        assert second.detect([mock_favorite]) == []
+        assert storage.get_item({"storeId": "123"})["version"] == 2
+
+    def test_legacy_row_is_previous_snapshot(self, storage, mock_favorite):
+        storage.put_item({"storeId": "123", "lastNotificationDate": "2024-03-20", "itemsAvailable": "2"})
+
+        assert ChangeDetector(storage).detect([mock_favorite]) == []
+        assert storage.get_item({"storeId": "123"})["version"] == 1
+
+    def test_events_carry_favorite_and_snapshots(self, storage, mock_favorite):
+        detector = ChangeDetector(storage)
+        detector.detect([mock_favorite])
+        changed = replace(mock_favorite, pickup_start="2024-03-21T14:00:00Z", pickup_end="2024-03-21T18:00:00Z", price=Price(499, 2, "EUR"))
+
+        events = detector.detect([changed])
+
+        assert [event.event_type for event in events] == [StockEventType.NEW_PICKUP_SLOT, StockEventType.PRICE_CHANGE]
+        assert events[0].favorite is changed
+        assert events[0].previous.price_minor_units == 599
+        assert events[0].current.price_minor_units == 499
+
+    def test_storage_calls_are_timed(self, storage, mock_favorite):
+        ChangeDetector(storage).detect([mock_favorite])
+
+        document = json.loads(METRICS.flush()[0])
+        assert document["SnapshotLoadCalls"] == 1
+        assert document["SnapshotWriteCalls"] == 1
+        assert document["StockEvents"] == 1
+
+    def test_events_are_dated_by_the_poll_that_observed_them(self, storage, mock_favorite):
+        detector = ChangeDetector(storage)
+        with freeze_time("2024-03-20 11:00:00"):
+            events = detector.detect([mock_favorite])
+        with freeze_time("2024-03-20 11:05:00"):
+            price_events = detector.detect([replace(mock_favorite, price=Price(499, 2, "EUR"))])
+
+        assert events[0].observed_at == 1710932400
+        assert price_events[0].observed_at == 1710932700
+        assert "firstSeenAt" not in storage.get_item({"storeId": "123"})
+
+    def test_changes_are_dated_after_the_previous_poll_of_the_container(self, storage, mock_favorite):
+        detector = ChangeDetector(storage)
+        with freeze_time("2024-03-20 11:00:00"):
+            first_events = detector.detect([replace(mock_favorite, items_available=0)])
+        with freeze_time("2024-03-20 11:03:00"):
+            detector.detect([replace(mock_favorite, items_available=0)])
+        with freeze_time("2024-03-20 11:06:00"):
+            events = detector.detect([mock_favorite])
+
+        assert first_events == []
+        assert events[0].appeared_after == 1710932580
+        ChangeDetector.clear()
+        with freeze_time("2024-03-20 11:09:00"):
+            assert detector.detect([replace(mock_favorite, items_available=0)])[0].appeared_after is None
@@ -0,0 +1,48 @@
+import datetime
+from unittest.mock import patch
+from app.services.tgtg_service.client_registry import TgtgClientRegistry
+
+class TestTgtgClientRegistry:
+    def test_get_client_reuses_instance_for_same_account(self):
+        first_client = TgtgClientRegistry.get_client(email="test@example.com", access_token="a", refresh_token="r", cookie="c")
+        second_client = TgtgClientRegistry.get_client(email="TEST@example.com", access_token="a", refresh_token="r", cookie="c")
+
+        assert first_client is second_client
+        assert first_client.session is second_client.session
+
+    def test_get_client_separates_accounts(self):
+        first_client = TgtgClientRegistry.get_client(email="first@example.com")
+        second_client = TgtgClientRegistry.get_client(email="second@example.com")
+
+        assert first_client is not second_client
+
+    def test_get_client_updates_tokens_when_newer(self):
+        refreshed_at = datetime.datetime(2024, 3, 20, 10, 0, tzinfo=datetime.timezone.utc)
+        client = TgtgClientRegistry.get_client(access_token="old", refresh_token="old", cookie="old", last_time_token_refreshed=refreshed_at)
+
+        TgtgClientRegistry.get_client(
+            access_token="new", 
+            refresh_token="new", 
+            cookie="new", 
+            last_time_token_refreshed=refreshed_at + datetime.timedelta(hours=1)
+        )
+
+        assert client.access_token == "new"
+        assert client.cookie == "new"
+
+    def test_get_client_keeps_fresher_in_memory_tokens(self):
+        refreshed_at = datetime.datetime(2024, 3, 20, 10, 0)
+        client = TgtgClientRegistry.get_client(access_token="old", refresh_token="old", cookie="old", last_time_token_refreshed=refreshed_at)
+        client.access_token = "refreshed_in_memory"
+        client.last_time_token_refreshed = refreshed_at + datetime.timedelta(hours=4)
+
+        TgtgClientRegistry.get_client(access_token="old", refresh_token="old", cookie="old", last_time_token_refreshed=refreshed_at)
+
+        assert client.access_token == "refreshed_in_memory"
+
+    def test_prewarm_ignores_connection_errors(self):
+        client = TgtgClientRegistry.get_client(email="test@example.com")
+        with patch.object(client.session, "head", side_effect=Exception("DNS failure")) as mock_head:
+            TgtgClientRegistry.prewarm(client)
+
+        mock_head.assert_called_once()
@@ -0,0 +1,52 @@
+import json, os, subprocess, sys, pytest
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def _run_cold(statement: str, task_root: str) -> str:
+    """Run a statement in a fresh interpreter, as a Lambda cold start would, and return what it printed."""
+    env = {
+        **os.environ, "AWS_LAMBDA_FUNCTION_NAME": "cold-start-test", "LAMBDA_TASK_ROOT": task_root, "TGTG_PREWARM_CONNECTION": "false"
+    }
+    result = subprocess.run([sys.executable, "-c", statement], cwd=REPO_ROOT, env=env, capture_output=True, text=True, check=True)
+    return result.stdout
+
+def _loaded_modules(*imports: str, task_root: str) -> set:
+    """Import modules in a fresh interpreter and return the modules that got loaded."""
+    statement = "; ".join(f"import {module}" for module in imports)
+    return set(json.loads(_run_cold(f"{statement}; import sys, json; print(json.dumps(sorted(sys.modules)))", task_root)))
+
+class TestColdStart:
+    @pytest.fixture
+    def task_root(self, tmp_path):
+        """A deployment package without a .env file."""
+        return str(tmp_path)
+
+    def test_handlers_module_imports_no_handler_dependencies(self, task_root):
+        modules = _loaded_modules("app.handlers", task_root=task_root)
+
+        for heavy_module in ("telegram", "pydantic", "boto3", "requests", "asyncio", "dotenv"):
+            assert heavy_module not in modules
+
+    def test_shipped_dotenv_file_is_loaded(self, task_root):
+        with open(os.path.join(task_root, ".env"), "w") as dotenv_file:
+            dotenv_file.write("DOTENV_LOADED_CHECK=yes\n")
+
+        assert _run_cold("import os, app.handlers; print(os.environ['DOTENV_LOADED_CHECK'])", task_root).strip() == "yes"
+
+    def test_monitoring_handler_does_not_load_telegram_stack(self, task_root):
+        modules = _loaded_modules("app.handlers", "app.core.scheduler", "app.services.tgtg_service_monitor", task_root=task_root)
+
+        assert "telegram" not in modules
+        assert "pydantic" in modules
+
+    def test_webhook_handler_does_not_load_tgtg_stack(self, task_root):
+        modules = _loaded_modules("app.handlers", "app.core.scheduler", "app.services.telegram_service", task_root=task_root)
+
+        assert "telegram" in modules
+        assert "pydantic" not in modules
+        assert "app.services.tgtg_service.tgtg_client" not in modules
+
+    @pytest.mark.skipif(not os.getenv("CHECK_IMPORT_BUDGET"), reason="Timing-sensitive, set CHECK_IMPORT_BUDGET=1 to run")
+    def test_import_time_within_budget(self):
+        result = subprocess.run([sys.executable, "benchmarks/import_time.py", "--runs", "3", "--check"], cwd=REPO_ROOT)
+        assert result.returncode == 0
@@ -0,0 +1,43 @@
+import logging
+from datetime import datetime, timezone
+from unittest.mock import MagicMock, patch
+from app.services.tgtg_service.credential_store import CredentialStore
+from app.services.tgtg_service.tgtg_service import Credentials
+from app.services.tgtg_service_monitor import TgtgServiceMonitor
+
+class TestCredentialStore:
+    def test_load_empty_store(self, local_state_store):
+        assert CredentialStore(local_state_store).load() is None
+
+    def test_save_and_load_round_trip(self, local_state_store):
+        refreshed_at = datetime(2024, 3, 20, 10, 0, tzinfo=timezone.utc)
+        credentials = Credentials("access", "refresh", "cookie", refreshed_at)
+
+        assert CredentialStore(local_state_store).save(credentials) is True
+
+        local_state_store.invalidate()
+        loaded = CredentialStore(local_state_store).load()
+        assert loaded == credentials
+
+    def test_concurrent_rotation_is_rejected(self, local_state_store):
+        first_store, second_store = CredentialStore(local_state_store), CredentialStore(local_state_store)
+        first_store.save(Credentials("access", "refresh", "cookie", None))
+        first_store.load()
+        second_store.load()
+
+        assert first_store.save(Credentials("access_1", "refresh_1", "cookie", None)) is True
+        assert second_store.save(Credentials("access_2", "refresh_2", "cookie", None)) is False
+        assert CredentialStore(local_state_store).load().access_token == "access_1"
+
+class TestMonitorCredentials:
+    def test_missing_credentials_are_named_without_their_values(self, caplog):
+        with patch.dict("os.environ", {"ACCESS_TOKEN": "secret-access-token", "TGTG_COOKIE": "secret-cookie"}, clear=True):
+            monitor = TgtgServiceMonitor()
+        monitor._monitor_favorites = MagicMock()
+
+        with caplog.at_level(logging.ERROR):
+            monitor.start_monitoring(MagicMock())
+
+        monitor._monitor_favorites.assert_not_called()
+        assert "Missing credentials: user_email, refresh_token" in caplog.text
+        assert "secret" not in caplog.text
@@ -1,14 +1,14 @@
 import pytest
-from unittest.mock import patch
+from unittest.mock import MagicMock, patch
 from botocore.exceptions import ClientError
+from app.common.deadline import Deadline
 from app.core.database_handler import DatabaseHandler
-from app.core.exceptions import DatabaseQueryError
+from app.core.exceptions import DatabaseQueryError, DeadlineExceededError
 
 class TestDatabaseHandler:
     @pytest.fixture
     def db_handler(self, mock_boto3_resource):
-        with patch('boto3.resource', return_value=mock_boto3_resource):
-            return DatabaseHandler(table_name="test_table")
+        return DatabaseHandler(table_name="test_table", dynamodb=mock_boto3_resource)
 
     def test_init_success(self, db_handler):
         assert db_handler.table_name == "test_table"
@@ -44,6 +44,36 @@ class TestDatabaseHandler:
         assert result == test_items1 + test_items2
         assert mock_dynamodb_table.scan.call_count == 2
 
+    def test_query_items_on_index_with_pagination(self, db_handler, mock_dynamodb_table):
+        mock_dynamodb_table.query.side_effect = [
+            {'Items': [{'id': '1'}], 'LastEvaluatedKey': {'id': '1'}},
+            {'Items': [{'id': '2'}]},
+        ]
+
+        result = db_handler.query_items('shard', 'PENDING', index_name='PendingIndex', limit=10)
+
+        assert result == [{'id': '1'}, {'id': '2'}]
+        assert mock_dynamodb_table.query.call_args_list[0].kwargs['IndexName'] == 'PendingIndex'
+        assert mock_dynamodb_table.query.call_args_list[1].kwargs['ExclusiveStartKey'] == {'id': '1'}
+
+    def test_update_item_failure(self, db_handler, mock_dynamodb_table):
+        mock_dynamodb_table.update_item.side_effect = ClientError(
+            error_response={'Error': {'Code': 'TestException', 'Message': 'Update failed'}},
+            operation_name='UpdateItem'
+        )
+        with pytest.raises(DatabaseQueryError):
+            db_handler.update_item({'id': '1'}, 'SET attempts = :attempts', {':attempts': 1})
+
+    def test_update_item_with_condition_returns_false_when_condition_fails(self, db_handler, mock_dynamodb_table):
+        mock_dynamodb_table.update_item.side_effect = [None, ClientError(
+            error_response={'Error': {'Code': 'ConditionalCheckFailedException', 'Message': 'Condition failed'}},
+            operation_name='UpdateItem'
+        )]
+
+        assert db_handler.update_item_with_condition({'id': '1'}, 'SET leaseUntil = :lease', 'leaseUntil < :now', {':lease': 2, ':now': 1}) is True
+        assert db_handler.update_item_with_condition({'id': '1'}, 'SET leaseUntil = :lease', 'leaseUntil < :now', {':lease': 2, ':now': 1}) is False
+        assert mock_dynamodb_table.update_item.call_args.kwargs['ConditionExpression'] == 'leaseUntil < :now'
+
     def test_put_item_success(self, db_handler, mock_dynamodb_table):
         test_item = {'id': '1', 'name': 'test'}
         db_handler.put_item(test_item)
@@ -57,6 +87,28 @@ class TestDatabaseHandler:
         with pytest.raises(DatabaseQueryError):
             db_handler.put_item({'id': '1', 'name': 'test'}) 
     
+    def test_put_item_if_absent_success(self, db_handler, mock_dynamodb_table):
+        test_item = {'id': '1', 'name': 'test'}
+        assert db_handler.put_item_if_absent(test_item, key_name='id') is True
+        _, kwargs = mock_dynamodb_table.put_item.call_args
+        assert kwargs['Item'] == test_item
+        assert 'ConditionExpression' in kwargs
+
+    def test_put_item_if_absent_already_exists(self, db_handler, mock_dynamodb_table):
+        mock_dynamodb_table.put_item.side_effect = ClientError(
+            error_response={'Error': {'Code': 'ConditionalCheckFailedException', 'Message': 'Exists'}},
+            operation_name='PutItem'
+        )
+        assert db_handler.put_item_if_absent({'id': '1'}, key_name='id') is False
+
+    def test_put_item_if_absent_failure(self, db_handler, mock_dynamodb_table):
+        mock_dynamodb_table.put_item.side_effect = ClientError(
+            error_response={'Error': {'Code': 'TestException', 'Message': 'Test error'}},
+            operation_name='PutItem'
+        )
+        with pytest.raises(DatabaseQueryError):
+            db_handler.put_item_if_absent({'id': '1'}, key_name='id')
+    
     def test_delete_item_success(self, db_handler, mock_dynamodb_table):
         test_key = {'id': '1'}
         db_handler.delete_item('id', '1')
@@ -68,4 +120,50 @@ class TestDatabaseHandler:
             operation_name='DeleteItem'
         )
         with pytest.raises(DatabaseQueryError):
-            db_handler.delete_item('id', '1')
\ No newline at end of file
+            db_handler.delete_item('id', '1')
+
+    def test_calls_under_a_deadline_use_a_client_sized_to_it(self):
+        bounded_resource = MagicMock()
+        db_handler = DatabaseHandler(table_name="test_table")
+        bounded_resource.batch_get_item.return_value = {'Responses': {'test_table': [{'id': '1'}]}}
+        with patch("app.core.database_handler.AwsClients.resource", return_value=bounded_resource) as resource:
+            db_handler.put_item_with_condition({'id': '1'}, MagicMock(), deadline=Deadline.after(1.5))
+            assert db_handler.batch_get_items([{'id': '1'}], deadline=Deadline.after(1.5)) == [{'id': '1'}]
+
+        assert resource.call_args.kwargs['timeout'] == pytest.approx(1.5, abs=0.1)
+        bounded_resource.Table.return_value.put_item.assert_called_once()
+
+    @patch("app.core.database_handler.time.sleep")
+    def test_unprocessed_keys_are_resent_after_a_growing_backoff(self, mock_sleep, db_handler, mock_boto3_resource):
+        unprocessed = {'test_table': {'Keys': [{'id': '2'}]}}
+        mock_boto3_resource.batch_get_item.side_effect = [
+            {'Responses': {'test_table': [{'id': '1'}]}, 'UnprocessedKeys': unprocessed},
+            {'Responses': {}, 'UnprocessedKeys': unprocessed},
+            {'Responses': {'test_table': [{'id': '2'}]}},
+        ]
+
+        with patch("app.core.database_handler.decorrelated_jitter", side_effect=[0.05, 0.15]):
+            assert db_handler.batch_get_items([{'id': '1'}, {'id': '2'}]) == [{'id': '1'}, {'id': '2'}]
+
+        assert [call.args[0] for call in mock_sleep.call_args_list] == [0.05, 0.15]
+
+    @patch("app.core.database_handler.time.sleep")
+    def test_unprocessed_keys_backoff_stops_at_the_deadline(self, mock_sleep, db_handler, mock_boto3_resource):
+        mock_boto3_resource.batch_get_item.return_value = {'Responses': {}, 'UnprocessedKeys': {'test_table': {'Keys': [{'id': '1'}]}}}
+
+        with patch("app.core.database_handler.decorrelated_jitter", return_value=1), pytest.raises(DeadlineExceededError):
+            db_handler.batch_get_items([{'id': '1'}], deadline=Deadline.after(0.5))
+
+        mock_sleep.assert_not_called()
+
+    def test_calls_under_an_unbounded_deadline_use_the_shared_resource(self):
+        db_handler = DatabaseHandler(table_name="test_table")
+        with patch("app.core.database_handler.AwsClients.resource") as resource:
+            assert db_handler._resource_within(Deadline.unbounded(), "put") is db_handler.dynamodb
+
+        resource.assert_not_called()
+
+    def test_calls_without_time_left_are_not_started(self, db_handler, mock_dynamodb_table):
+        with pytest.raises(DeadlineExceededError):
+            db_handler.put_item_with_condition({'id': '1'}, MagicMock(), deadline=Deadline.after(-1))
+        mock_dynamodb_table.put_item.assert_not_called()
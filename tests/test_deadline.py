@@ -0,0 +1,58 @@
+import math, pytest
+from unittest.mock import MagicMock
+from app.common.deadline import Deadline
+from app.core.exceptions import DeadlineExceededError
+
+class FakeClock:
+    def __init__(self, now: float = 100.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+class TestDeadline:
+    def test_from_lambda_context_keeps_safety_margin(self):
+        context = MagicMock()
+        context.get_remaining_time_in_millis.return_value = 10_000
+
+        deadline = Deadline.from_lambda_context(context, safety_margin=1.0)
+
+        assert 8.5 < deadline.remaining() <= 9.0
+
+    def test_from_lambda_context_without_lambda_is_unbounded(self):
+        assert math.isinf(Deadline.from_lambda_context(None).remaining())
+        assert math.isinf(Deadline.from_lambda_context(MagicMock()).remaining())
+
+    def test_timeout_is_capped_by_remaining_time(self):
+        clock = FakeClock()
+        deadline = Deadline(clock.now + 3, clock)
+
+        assert deadline.timeout(cap=10) == 3
+        assert deadline.timeout(cap=2) == 2
+        assert deadline.timeout(cap=10, reserve=1) == 2
+
+    def test_timeout_raises_when_expired(self):
+        clock = FakeClock()
+        deadline = Deadline(clock.now + 1, clock)
+        clock.now += 2
+
+        with pytest.raises(DeadlineExceededError):
+            deadline.timeout(cap=5)
+        assert deadline.timeout(cap=5, minimum=1) == 1
+
+    def test_unbounded_timeout_uses_cap(self):
+        deadline = Deadline.unbounded()
+        assert deadline.timeout(cap=5) == 5
+        assert deadline.timeout() is None
+
+    def test_check_and_with_reserve(self):
+        clock = FakeClock()
+        deadline = Deadline(clock.now + 4, clock)
+        work_deadline = deadline.with_reserve(3)
+
+        work_deadline.check("fetch")
+        clock.now += 2
+
+        with pytest.raises(DeadlineExceededError):
+            work_deadline.check("fetch")
+        deadline.check("send")
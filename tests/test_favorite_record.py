@@ -0,0 +1,37 @@
+import pytest
+from app.services.tgtg_service.exceptions import TgtgAPIParsingError
+from app.services.tgtg_service.favorite_record import FavoriteRecord, Price
+
+class TestFavoriteRecord:
+    def test_from_raw_matches_validated_model(self, mock_item_details):
+        record = FavoriteRecord.from_raw(mock_item_details.model_dump())
+
+        assert record == FavoriteRecord.from_item_details(mock_item_details)
+        assert record.store_id == "123"
+        assert record.address_line == "123 Test Street"
+        assert str(record.price) == "5.99€"
+
+    def test_from_raw_optional_fields(self, mock_item_details):
+        raw_item = mock_item_details.model_dump()
+        raw_item["pickup_interval"] = None
+        del raw_item["pickup_location"]
+
+        record = FavoriteRecord.from_raw(raw_item)
+
+        assert (record.pickup_start, record.pickup_end, record.address_line) == (None, None, None)
+
+    @pytest.mark.parametrize("broken", [{}, {"item": None, "store": {}}, {"invalid_key": "value"}])
+    def test_from_raw_invalid_payload(self, broken):
+        with pytest.raises(TgtgAPIParsingError):
+            FavoriteRecord.from_raw(broken)
+
+    def test_record_is_frozen_and_slotted(self, mock_item_details):
+        record = FavoriteRecord.from_item_details(mock_item_details)
+
+        with pytest.raises(AttributeError):
+            record.items_available = 0
+        assert not hasattr(record, "__dict__")
+
+    def test_price_format(self):
+        assert str(Price(1599, 2, "USD")) == "15.99$"
+        assert str(Price(500, 2, "GBP")) == "5.00GBP"
@@ -1,5 +1,6 @@
-import pytest
+import json, pytest
 from unittest.mock import patch, MagicMock, AsyncMock
+from app.common.metrics import METRICS
 from app.handlers import tgtg_monitoring_handler, lambda_scheduler, run_telegram_webhook
 
 class TestHandlers:
@@ -15,8 +16,12 @@ class TestHandlers:
     def mock_context(self):
         return MagicMock()
 
+    @pytest.fixture(autouse=True)
+    def reset_cached_telegram_service(self, monkeypatch):
+        monkeypatch.setattr("app.handlers._TELEGRAM_SERVICE", None)
+
     def test_tgtg_monitoring_handler_valid_event(self, mock_event, mock_context):
-        with patch('app.handlers.TgtgServiceMonitor') as mock_monitoring_service:
+        with patch('app.services.tgtg_service_monitor.TgtgServiceMonitor') as mock_monitoring_service:
             mock_monitoring_instance = mock_monitoring_service.return_value
 
             tgtg_monitoring_handler(mock_event, mock_context)
@@ -24,16 +29,28 @@ class TestHandlers:
             mock_monitoring_service.assert_called_once()
             mock_monitoring_instance.start_monitoring.assert_called_once()
 
+    def test_tgtg_monitoring_handler_flushes_stage_metrics(self, mock_event, mock_context, emitted_metrics):
+        with patch('app.services.tgtg_service_monitor.TgtgServiceMonitor') as mock_monitoring_service:
+            mock_monitoring_service.return_value.start_monitoring.side_effect = lambda *args, **kwargs: METRICS.record_latency("TgtgFavorites", 12.5)
+
+            tgtg_monitoring_handler(mock_event, mock_context)
+
+        assert len(emitted_metrics) == 1
+        document = json.loads(emitted_metrics[0])
+        assert document["Handler"] == "Monitoring"
+        assert document["TgtgFavoritesLatency"] == [12.5]
+        assert document["MonitoringCalls"] == 1
+
     def test_tgtg_monitoring_handler_invalid_event(self, mock_context):
         invalid_event = {'resources': ['some-other-resource']}
         
-        with patch('app.handlers.TgtgServiceMonitor') as mock_monitoring_service:
+        with patch('app.services.tgtg_service_monitor.TgtgServiceMonitor') as mock_monitoring_service:
             tgtg_monitoring_handler(invalid_event, mock_context)
             
             mock_monitoring_service.assert_not_called()
 
     def test_lambda_scheduler(self, mock_event, mock_context):
-        with patch('app.handlers.Scheduler') as mock_scheduler:
+        with patch('app.core.scheduler.Scheduler') as mock_scheduler:
             mock_scheduler_instance = mock_scheduler.return_value
             
             lambda_scheduler(mock_event, mock_context)
@@ -45,7 +62,7 @@ class TestHandlers:
     async def test_telegram_webhook_handler(self):
         test_event = {'body': '{"message": {"text": "/start", "chat": {"id": 123456789}}}'}
         
-        with patch('app.handlers.TelegramService') as mock_telegram_service, patch('app.handlers.TgtgServiceMonitor'):
+        with patch('app.services.telegram_service.TelegramService') as mock_telegram_service, patch('app.services.tgtg_service_monitor.TgtgServiceMonitor'):
             mock_telegram_instance = mock_telegram_service.return_value
             mock_telegram_instance.process_webhook = AsyncMock()
             
@@ -54,11 +71,25 @@ class TestHandlers:
             assert response['statusCode'] == 200
             mock_telegram_instance.process_webhook.assert_called_once_with(test_event)
 
+    @pytest.mark.asyncio
+    async def test_telegram_webhook_reuses_telegram_service(self):
+        test_event = {'body': '{"message": {"text": "/start", "chat": {"id": 123456789}}}'}
+
+        with patch('app.services.telegram_service.TelegramService') as mock_telegram_service, patch('app.core.scheduler.Scheduler') as mock_scheduler:
+            mock_telegram_service.return_value.process_webhook = AsyncMock()
+
+            await run_telegram_webhook(test_event, None)
+            await run_telegram_webhook(test_event, None)
+
+            mock_telegram_service.assert_called_once()
+            mock_scheduler.assert_called_once()
+            assert mock_telegram_service.return_value.process_webhook.await_count == 2
+
     @pytest.mark.asyncio
     async def test_telegram_webhook_handler_error(self):
         test_event = {'body': '{"message": {"text": "/start", "chat": {"id": 123456789}}}'}
         
-        with patch('app.handlers.TelegramService') as mock_telegram_service, patch('app.handlers.TgtgServiceMonitor'):
+        with patch('app.services.telegram_service.TelegramService') as mock_telegram_service, patch('app.services.tgtg_service_monitor.TgtgServiceMonitor'):
             mock_telegram_instance = mock_telegram_service.return_value
             mock_telegram_instance.process_webhook = AsyncMock(side_effect=Exception("Test error"))
             
@@ -0,0 +1,50 @@
+import copy, pytest
+from pydantic import ValidationError
+from unittest.mock import patch
+from app.services.tgtg_service.item_details_cache import ItemDetailsCache
+
+class TestItemDetailsCache:
+    @pytest.fixture
+    def raw_item(self, mock_item_details):
+        return mock_item_details.model_dump()
+
+    def test_unchanged_item_is_not_validated_again(self, raw_item):
+        first = ItemDetailsCache.parse(raw_item)
+
+        with patch("app.services.tgtg_service.item_details_cache.ItemDetails") as mock_item_details_class:
+            second = ItemDetailsCache.parse(copy.deepcopy(raw_item))
+
+        mock_item_details_class.assert_not_called()
+        assert second is first
+        assert ItemDetailsCache.reset_stats() == (1, 1)
+
+    def test_changed_item_is_validated(self, raw_item):
+        ItemDetailsCache.parse(raw_item)
+        changed = copy.deepcopy(raw_item)
+        changed["items_available"] = 0
+
+        assert ItemDetailsCache.parse(changed).items_available == 0
+        assert ItemDetailsCache.parse(changed).items_available == 0
+        assert ItemDetailsCache.reset_stats() == (1, 2)
+
+    def test_invalid_item_raises_and_is_not_cached(self, raw_item):
+        invalid = copy.deepcopy(raw_item)
+        del invalid["store"]
+
+        for _ in range(2):
+            with pytest.raises(ValidationError):
+                ItemDetailsCache.parse(invalid)
+
+    def test_capacity_evicts_least_recently_seen(self, raw_item, monkeypatch):
+        monkeypatch.setattr(ItemDetailsCache, "capacity", 2)
+        items = []
+        for item_id in ("1", "2", "3"):
+            item = copy.deepcopy(raw_item)
+            item["item"]["item_id"] = item_id
+            items.append(item)
+            ItemDetailsCache.parse(item)
+        ItemDetailsCache.reset_stats()
+
+        ItemDetailsCache.parse(items[2])
+        ItemDetailsCache.parse(items[0])
+        assert ItemDetailsCache.reset_stats() == (1, 1)
@@ -0,0 +1,49 @@
+import json, pytest
+from unittest.mock import MagicMock, PropertyMock
+from app.common import json_codec
+from app.common.json_codec import decode_response, extract
+
+BODY = {"state": "SUCCESS", "order": {"id": "1"}, "mobile_bucket": {"items": [{"item": {"item_id": "1"}}]}}
+
+@pytest.fixture(params=["orjson", "json"])
+def backend(request, monkeypatch):
+    if request.param == "orjson":
+        pytest.importorskip("orjson")
+    else:
+        monkeypatch.setattr(json_codec, "orjson", None)
+    return request.param
+
+def response_with(body):
+    response = MagicMock()
+    content = PropertyMock(return_value=json.dumps(body).encode())
+    type(response).content = content
+    return response, content
+
+class TestJsonCodec:
+    def test_loads_bytes_and_str(self, backend):
+        assert json_codec.loads(json.dumps(BODY).encode()) == BODY
+        assert json_codec.loads(json.dumps(BODY)) == BODY
+
+    def test_invalid_document_raises_value_error(self, backend):
+        with pytest.raises(ValueError):
+            json_codec.loads(b"not json")
+
+    def test_decode_response_parses_body_once(self, backend):
+        response, content = response_with(BODY)
+
+        assert decode_response(response, "state") == "SUCCESS"
+        assert decode_response(response, "order") == {"id": "1"}
+        assert decode_response(response) == BODY
+        assert content.call_count == 1
+
+    def test_decode_response_subtree(self, backend):
+        response, _ = response_with(BODY)
+
+        assert decode_response(response, "mobile_bucket.items") == [{"item": {"item_id": "1"}}]
+        assert decode_response(response, "mobile_bucket.missing", default=[]) == []
+        with pytest.raises(KeyError):
+            decode_response(response, "state.nested")
+
+    def test_extract(self):
+        assert extract({"a": {"b": 1}}, "a.b") == 1
+        assert extract({"a": [1]}, "a.b", default=None) is None
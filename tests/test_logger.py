@@ -0,0 +1,68 @@
+import json, logging, os, pytest
+from unittest.mock import MagicMock, patch
+from app.common.logger import JsonFormatter, PayloadSample, configure_logging, parse_module_levels, redact
+
+def make_record(message, *args, level=logging.INFO, fields=None) -> logging.LogRecord:
+    record = logging.LogRecord("app.test", level, __file__, 1, message, args, None)
+    if fields:
+        record.fields = fields
+    return record
+
+@pytest.fixture
+def restore_logging():
+    yield
+    logging.getLogger("app.core.database_handler").setLevel(logging.NOTSET)
+    configure_logging()
+
+class TestLogger:
+    def test_record_is_one_json_document(self):
+        document = json.loads(JsonFormatter().format(make_record("Parsed %d favorite items.", 3, fields={"store_id": "123", "count": 3})))
+
+        assert document["level"] == "INFO"
+        assert document["logger"] == "app.test"
+        assert document["message"] == "Parsed 3 favorite items."
+        assert document["store_id"] == "123"
+        assert document["count"] == 3
+
+    @pytest.mark.parametrize("message", [
+        "Credentials(access_token='abc.def', refresh_token='ghi', cookie='datadome=xyz')",
+        '{"access_token": "abc.def", "refresh_token": "ghi", "cookie": "datadome=xyz"}',
+        "https://api.telegram.org/bot123456789:AAHdqTcvCH1vGWJxfSeofSAs0K5PALDsaw/sendMessage",
+    ])
+    def test_secrets_are_redacted(self, message):
+        redacted = redact(message)
+
+        for secret in ("abc.def", "ghi", "xyz", "AAHdqTcvCH1vGWJxfSeofSAs0K5PALDsaw"):
+            assert secret not in redacted
+
+    def test_secret_fields_are_redacted(self):
+        document = json.loads(JsonFormatter().format(make_record("Login", fields={"refresh_token": "ghi", "email": "a@b.c"})))
+
+        assert document["refresh_token"] == "***"
+        assert document["email"] == "a@b.c"
+
+    def test_long_message_is_truncated(self):
+        document = json.loads(JsonFormatter(max_field_length=10).format(make_record("x" * 25)))
+
+        assert document["message"] == "x" * 10 + "... (15 more chars)"
+
+    def test_payload_sample_renders_first_items(self):
+        assert str(PayloadSample(list(range(10)), max_items=2)) == "[0, 1] ... (8 more items)"
+        assert str(PayloadSample({"items": []})) == "{'items': []}"
+
+    def test_filtered_record_is_never_formatted(self):
+        sample = MagicMock(spec=PayloadSample)
+        logging.getLogger("app.test").debug("Raw API response: %s", sample)
+
+        sample.__str__.assert_not_called()
+
+    def test_module_levels(self, restore_logging):
+        with patch.dict(os.environ, {"LOG_LEVEL": "WARNING", "LOG_LEVELS": "app.core.database_handler=debug, bad-entry"}):
+            root = configure_logging()
+            configure_logging()
+
+        assert parse_module_levels("a=info,b=") == {"a": "INFO"}
+        assert root.level == logging.WARNING
+        assert logging.getLogger("app.core.database_handler").isEnabledFor(logging.DEBUG)
+        assert not logging.getLogger("app.core.storage_backend").isEnabledFor(logging.INFO)
+        assert sum(isinstance(handler.formatter, JsonFormatter) for handler in root.handlers) == 1
@@ -0,0 +1,100 @@
+import json, pytest
+from app.common.metrics import MAX_METRICS_PER_DOCUMENT, Metrics
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+@pytest.fixture
+def lines():
+    return []
+
+@pytest.fixture
+def metrics(clock, lines):
+    return Metrics(namespace="Test", sink=lines.append, enabled=True, clock=clock)
+
+class TestMetrics:
+    def test_timer_records_latency_and_calls(self, metrics, clock, lines):
+        for duration in (0.25, 0.5):
+            with metrics.timer("TgtgLogin"):
+                clock.now += duration
+        metrics.add_bytes("TgtgResponseBytes", 300)
+        metrics.increment("StockEvents", 2)
+
+        metrics.flush(Handler="Monitoring")
+
+        document = json.loads(lines[0])
+        assert document["TgtgLoginLatency"] == [250.0, 500.0]
+        assert document["TgtgLoginCalls"] == 2
+        assert document["TgtgResponseBytes"] == 300
+        assert document["StockEvents"] == 2
+        assert document["Handler"] == "Monitoring"
+        directive = document["_aws"]["CloudWatchMetrics"][0]
+        assert directive["Namespace"] == "Test"
+        assert directive["Dimensions"] == [["Handler"]]
+        assert {"Name": "TgtgLoginLatency", "Unit": "Milliseconds"} in directive["Metrics"]
+        assert {"Name": "TgtgResponseBytes", "Unit": "Bytes"} in directive["Metrics"]
+
+    def test_observation_properties_are_not_dimensions(self, metrics):
+        metrics.observe("TimeToNotify", 30, "Seconds", properties={"StoreId": "123"}, Window="morning")
+        metrics.observe("TimeToNotify", 60, "Seconds", properties={"StoreId": "456"}, Window="morning")
+
+        documents = [json.loads(line) for line in metrics.flush(Handler="Monitoring")]
+        assert [(document["StoreId"], document["TimeToNotify"]) for document in documents] == [("123", [30]), ("456", [60])]
+        assert all(document["_aws"]["CloudWatchMetrics"][0]["Dimensions"] == [["Handler", "Window"]] for document in documents)
+
+    def test_timer_counts_errors_and_reraises(self, metrics, lines):
+        with pytest.raises(ValueError):
+            with metrics.timer("SnapshotWrite"):
+                raise ValueError("boom")
+
+        document = json.loads(metrics.flush()[0])
+        assert document["SnapshotWriteErrors"] == 1
+        assert document["SnapshotWriteCalls"] == 1
+
+    def test_timer_as_decorator(self, metrics, clock):
+        @metrics.timer("TgtgLogin")
+        def login():
+            clock.now += 0.1
+
+        login()
+        login()
+
+        assert json.loads(metrics.flush()[0])["TgtgLoginCalls"] == 2
+
+    def test_flush_resets_and_skips_empty(self, metrics, lines):
+        metrics.increment("Favorites")
+        metrics.flush()
+
+        assert metrics.flush() == []
+        assert len(lines) == 1
+
+    def test_documents_respect_emf_metric_limit(self, metrics):
+        for index in range(MAX_METRICS_PER_DOCUMENT + 1):
+            metrics.increment(f"Counter{index}")
+
+        documents = [json.loads(line) for line in metrics.flush()]
+        assert [len(document["_aws"]["CloudWatchMetrics"][0]["Metrics"]) for document in documents] == [MAX_METRICS_PER_DOCUMENT, 1]
+
+    def test_invocation_flushes_when_handler_raises(self, metrics, lines):
+        with pytest.raises(RuntimeError):
+            with metrics.invocation("Scheduler"):
+                raise RuntimeError("boom")
+
+        document = json.loads(lines[0])
+        assert document["Handler"] == "Scheduler"
+        assert document["SchedulerErrors"] == 1
+
+    def test_disabled_metrics_emit_nothing(self, lines):
+        metrics = Metrics(sink=lines.append, enabled=False)
+        with metrics.invocation("Monitoring"):
+            metrics.increment("Favorites")
+
+        assert lines == []
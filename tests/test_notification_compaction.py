@@ -0,0 +1,67 @@
+import pytest, pytz
+from datetime import datetime
+from app.core.storage_backend import InMemoryStorageBackend
+from app.services.tgtg_service.change_detector import ChangeDetector
+from app.services.tgtg_service.notification_compaction import LEGACY_KEY_NAMES, compact_notification_history
+from app.services.tgtg_service.tgtg_service import TgtgService
+
+NOW = datetime(2024, 3, 20, 12, 0, tzinfo=pytz.utc)
+
+@pytest.fixture(autouse=True)
+def reset_in_memory_tables():
+    InMemoryStorageBackend.clear()
+    yield
+    InMemoryStorageBackend.clear()
+
+@pytest.fixture
+def source():
+    source = InMemoryStorageBackend("UserNotifications", LEGACY_KEY_NAMES)
+    source.batch_put_items([
+        {"storeId": "1", "lastNotificationDate": "2024-03-18", "notifiedAt": "2024-03-18T10:00:00+00:00", "itemsAvailable": "1"},
+        {"storeId": "1", "lastNotificationDate": "2024-03-19", "notifiedAt": "2024-03-19T10:00:00+00:00", "itemsAvailable": "4"},
+        {"storeId": "2", "lastNotificationDate": "2024-02-01", "notifiedAt": "2024-02-01T10:00:00+00:00", "itemsAvailable": "2"},
+        {"storeId": "3", "lastNotificationDate": "2024-03-17"},
+    ])
+    return source
+
+@pytest.fixture
+def target():
+    return InMemoryStorageBackend(TgtgService.NOTIFICATIONS_TABLE_NAME, TgtgService.NOTIFICATIONS_KEY_NAMES)
+
+class TestCompactNotificationHistory:
+    def test_keeps_latest_row_per_store_with_expiry(self, source, target):
+        result = compact_notification_history(source, target, now=NOW)
+
+        assert (result.rows_read, result.stores_written, result.stores_expired, result.rows_deleted) == (4, 2, 1, 4)
+        store_1 = target.get_item({"storeId": "1"})
+        assert store_1["lastNotificationDate"] == "2024-03-19"
+        assert store_1["itemsAvailable"] == 0
+        assert store_1["expiresAt"] == int((datetime(2024, 3, 19, 10, tzinfo=pytz.utc) + ChangeDetector.SNAPSHOT_RETENTION).timestamp())
+        assert target.get_item({"storeId": "3"})["expiresAt"] == int((datetime(2024, 3, 17, tzinfo=pytz.utc) + ChangeDetector.SNAPSHOT_RETENTION).timestamp())
+        assert target.get_item({"storeId": "2"}) is None
+        assert list(source.scan_items()) == []
+
+    def test_only_rows_notified_today_keep_their_bags(self, source, target):
+        source.put_item({"storeId": "4", "lastNotificationDate": "2024-03-20", "notifiedAt": "2024-03-20T08:00:00+00:00", "itemsAvailable": "3"})
+
+        compact_notification_history(source, target, now=NOW)
+
+        assert target.get_item({"storeId": "4"})["itemsAvailable"] == "3"
+        assert target.get_item({"storeId": "1"})["itemsAvailable"] == 0
+        assert target.get_item({"storeId": "3"})["itemsAvailable"] == 0
+
+    def test_does_not_overwrite_newer_state(self, source, target):
+        target.put_item({"storeId": "1", "lastNotificationDate": "2024-03-20"})
+
+        result = compact_notification_history(source, target, now=NOW)
+
+        assert result.stores_written == 1
+        assert target.get_item({"storeId": "1"})["lastNotificationDate"] == "2024-03-20"
+
+    def test_dry_run_and_keep_source(self, source, target):
+        assert compact_notification_history(source, target, dry_run=True, now=NOW).stores_written == 2
+        assert list(target.scan_items()) == []
+
+        compact_notification_history(source, target, delete_source=False, now=NOW)
+        assert len(list(source.scan_items())) == 4
+        assert len(list(target.scan_items())) == 2
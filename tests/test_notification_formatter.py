@@ -1,3 +1,4 @@
+from dataclasses import replace
 from freezegun import freeze_time
 from app.services.tgtg_service.notification_formatter import NotificationFormatter
 from app.services.tgtg_service.models import PickupInterval
@@ -50,8 +51,8 @@ class TestNotificationFormatter:
         interval_str = NotificationFormatter.format_pickup_interval(None, "Europe/Paris")
         assert interval_str == "Pickup time unavailable"
 
-    def test_format_message_complete(self, mock_item_details):
-        message = NotificationFormatter.format_message(mock_item_details)
+    def test_format_message_complete(self, mock_favorite):
+        message = NotificationFormatter.format_message(mock_favorite)
         assert "Test Store" in message
         assert "2 nouveaux paniers disponibles" in message
         assert "Test Description" in message
@@ -59,7 +60,6 @@ class TestNotificationFormatter:
         assert "15.99" in message
         assert "123 Test Street" in message
 
-    def test_format_message_missing_location(self, mock_item_details):
-        mock_item_details.pickup_location = None
-        message = NotificationFormatter.format_message(mock_item_details)
+    def test_format_message_missing_location(self, mock_favorite):
+        message = NotificationFormatter.format_message(replace(mock_favorite, address_line=None))
         assert "Unknown location" in message
\ No newline at end of file
@@ -0,0 +1,174 @@
+import pytest, sqlite3
+from unittest.mock import MagicMock, patch
+from app.common.deadline import Deadline
+from app.core.exceptions import DeadlineExceededError
+from app.core.outbox import DynamoDBOutbox, SQLiteOutbox, PENDING_INDEX_NAME
+from app.services.tgtg_service.tgtg_service import Notification
+from app.services.tgtg_service_monitor import TgtgServiceMonitor
+
+class TestSQLiteOutbox:
+    @pytest.fixture
+    def outbox(self, tmp_path):
+        return SQLiteOutbox(str(tmp_path / "outbox.db"), max_attempts=2)
+
+    def test_enqueued_messages_are_pending_until_delivered(self, outbox):
+        first = outbox.enqueue("first")
+        second = outbox.enqueue("second", chat_id="42")
+
+        assert [message.text for message in outbox.pending()] == ["first", "second"]
+        assert outbox.pending()[1].chat_id == "42"
+
+        outbox.mark_delivered(first)
+        assert [message.message_id for message in outbox.pending()] == [second.message_id]
+
+    def test_time_to_notify_fields_round_trip(self, outbox):
+        outbox.enqueue("restock", store_id="123", observed_at=1710936000, appeared_after=1710935700)
+
+        pending = outbox.pending()[0]
+        assert (pending.store_id, pending.observed_at, pending.appeared_after) == ("123", 1710936000, 1710935700)
+
+    def test_database_without_time_to_notify_columns_is_migrated(self, tmp_path):
+        path = str(tmp_path / "legacy.db")
+        connection = sqlite3.connect(path)
+        connection.execute(
+            "CREATE TABLE outbox (message_id TEXT PRIMARY KEY, text TEXT NOT NULL, chat_id TEXT, created_at TEXT NOT NULL, "
+            "attempts INTEGER NOT NULL DEFAULT 0, status TEXT NOT NULL, updated_at TEXT)"
+        )
+        connection.execute("INSERT INTO outbox (message_id, text, created_at, status) VALUES ('1', 'old', '2024-03-20', 'PENDING')")
+        connection.commit()
+        connection.close()
+
+        outbox = SQLiteOutbox(path)
+        outbox.enqueue("new", store_id="123", observed_at=1710936000)
+
+        assert [(message.text, message.observed_at) for message in outbox.pending()] == [("old", None), ("new", 1710936000)]
+
+    def test_first_seen_column_is_renamed_in_place(self, tmp_path):
+        path = str(tmp_path / "legacy.db")
+        connection = sqlite3.connect(path)
+        connection.execute(
+            "CREATE TABLE outbox (message_id TEXT PRIMARY KEY, text TEXT NOT NULL, chat_id TEXT, created_at TEXT NOT NULL, "
+            "attempts INTEGER NOT NULL DEFAULT 0, status TEXT NOT NULL, updated_at TEXT, store_id TEXT, first_seen_at INTEGER)"
+        )
+        connection.execute(
+            "INSERT INTO outbox (message_id, text, created_at, status, first_seen_at) VALUES ('1', 'old', '2024-03-20', 'PENDING', 1710936000)"
+        )
+        connection.commit()
+        connection.close()
+
+        assert SQLiteOutbox(path).pending()[0].observed_at == 1710936000
+
+    def test_failed_message_is_retried_until_max_attempts(self, outbox):
+        outbox.enqueue("flaky")
+
+        outbox.record_failure(outbox.pending()[0])
+        assert outbox.pending()[0].attempts == 1
+
+        outbox.record_failure(outbox.pending()[0])
+        assert outbox.pending() == []
+
+    def test_message_is_claimed_by_a_single_run(self, outbox):
+        outbox.record_failure(outbox.enqueue("retry"))
+        other_run = SQLiteOutbox(outbox.path)
+
+        assert [message.text for message in outbox.claim(outbox.pending())] == ["retry"]
+        assert other_run.claim(other_run.pending()) == []
+
+    def test_enqueued_message_is_leased_to_its_sender_until_it_fails(self, outbox):
+        message = outbox.enqueue("fresh")
+        assert outbox.claim(outbox.pending()) == []
+
+        outbox.record_failure(message)
+        assert [claimed.message_id for claimed in outbox.claim(outbox.pending())] == [message.message_id]
+
+    def test_expired_lease_can_be_claimed_again(self, tmp_path):
+        outbox = SQLiteOutbox(str(tmp_path / "outbox.db"), lease_seconds=-1)
+        outbox.enqueue("crashed sender")
+
+        assert len(outbox.claim(outbox.pending())) == 1
+
+    def test_write_is_not_started_past_the_deadline(self, outbox):
+        with pytest.raises(DeadlineExceededError):
+            outbox.enqueue("late", deadline=Deadline.after(-1))
+
+        assert outbox.pending() == []
+
+class TestDynamoDBOutbox:
+    def test_pending_queries_sparse_index(self):
+        database_handler = MagicMock()
+        database_handler.query_items.return_value = [
+            {"messageId": "m1", "text": "hello", "createdAt": "2024-03-20T10:00:00+00:00", "attempts": 1}
+        ]
+        outbox = DynamoDBOutbox(database_handler=database_handler)
+
+        pending = outbox.pending(limit=5)
+
+        assert pending[0].message_id == "m1"
+        assert pending[0].attempts == 1
+        database_handler.query_items.assert_called_once_with("pendingShard", "PENDING", index_name=PENDING_INDEX_NAME, limit=5, deadline=None)
+
+    def test_pending_reads_messages_written_with_first_seen_at(self):
+        database_handler = MagicMock()
+        database_handler.query_items.return_value = [
+            {"messageId": "m1", "text": "hello", "createdAt": "2024-03-20T10:00:00+00:00", "firstSeenAt": 1710936000}
+        ]
+
+        assert DynamoDBOutbox(database_handler=database_handler).pending()[0].observed_at == 1710936000
+
+    def test_lease_and_deadline_reach_the_database(self):
+        database_handler = MagicMock()
+        outbox = DynamoDBOutbox(database_handler=database_handler, lease_seconds=5)
+        deadline = Deadline.after(30)
+
+        with patch("app.core.outbox.time.time", return_value=1000):
+            message = outbox.enqueue("hello", deadline=deadline)
+        outbox.mark_delivered(message, deadline=deadline)
+
+        assert database_handler.put_item.call_args[0][0]["leaseUntil"] == 1005
+        assert database_handler.put_item.call_args.kwargs["deadline"] is deadline
+        assert database_handler.update_item.call_args.kwargs["deadline"] is deadline
+
+    def test_mark_delivered_removes_message_from_index(self):
+        database_handler = MagicMock()
+        outbox = DynamoDBOutbox(database_handler=database_handler)
+
+        outbox.mark_delivered(outbox.enqueue("hello"))
+
+        inserted_item = database_handler.put_item.call_args[0][0]
+        assert inserted_item["pendingShard"] == "PENDING"
+        update_expression = database_handler.update_item.call_args[0][1]
+        assert "REMOVE pendingShard" in update_expression
+
+    def test_claim_skips_messages_leased_by_another_run(self):
+        database_handler = MagicMock()
+        database_handler.update_item_with_condition.side_effect = [True, False]
+        outbox = DynamoDBOutbox(database_handler=database_handler)
+        messages = [outbox.enqueue("first"), outbox.enqueue("second")]
+
+        assert outbox.claim(messages) == messages[:1]
+        condition = database_handler.update_item_with_condition.call_args[0][2]
+        assert "leaseUntil < :now" in condition and "attribute_exists(pendingShard)" in condition
+
+class TestMonitorOutboxDelivery:
+    @patch("app.services.tgtg_service_monitor.Utils.send_telegram_messages")
+    def test_failed_notifications_are_retried_on_next_run(self, mock_send, local_outbox):
+        monitor = TgtgServiceMonitor()
+        mock_send.side_effect = lambda texts, **kwargs: [text != "lost" for text in texts]
+
+        monitor._send_notifications([Notification("sent"), Notification("lost")], MagicMock())
+        assert [message.text for message in local_outbox.pending()] == ["lost"]
+
+        mock_send.side_effect = lambda texts, **kwargs: [True] * len(texts)
+        monitor.deliver_pending_notifications(MagicMock())
+
+        assert mock_send.call_args[0][0] == ["lost"]
+        assert local_outbox.pending() == []
+
+    @patch("app.services.tgtg_service_monitor.Utils.send_telegram_messages")
+    def test_overlapping_runs_do_not_resend_a_claimed_message(self, mock_send, local_outbox):
+        local_outbox.record_failure(local_outbox.enqueue("retry"))
+        local_outbox.claim(local_outbox.pending())
+
+        TgtgServiceMonitor().deliver_pending_notifications(MagicMock())
+
+        mock_send.assert_not_called()
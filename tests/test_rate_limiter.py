@@ -0,0 +1,76 @@
+import pytest
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+from app.common.rate_limiter import AdaptiveRateLimiter, TokenBucket, decorrelated_jitter, parse_retry_after
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+class TestTokenBucket:
+    def test_burst_then_wait(self):
+        clock = FakeClock()
+        bucket = TokenBucket(rate=2, capacity=2, clock=clock)
+
+        assert bucket.try_acquire() == 0
+        assert bucket.try_acquire() == 0
+        assert bucket.try_acquire() == pytest.approx(0.5)
+
+        clock.now += 0.5
+        assert bucket.try_acquire() == 0
+
+    def test_acquire_times_out(self):
+        bucket = TokenBucket(rate=0.1, capacity=1, clock=FakeClock())
+        assert bucket.acquire() is True
+        assert bucket.acquire(timeout=1) is False
+
+    def test_block_for(self):
+        clock = FakeClock()
+        bucket = TokenBucket(rate=10, capacity=10, clock=clock)
+        bucket.block_for(3)
+        assert bucket.try_acquire() == pytest.approx(3)
+        clock.now += 3
+        assert bucket.try_acquire() == 0
+
+class TestAdaptiveRateLimiter:
+    def test_throttle_shrinks_rate_and_success_grows_it(self):
+        limiter = AdaptiveRateLimiter(rate=1.0, capacity=1, min_rate=0.1, max_rate=1.2, increase_step=0.1, clock=FakeClock())
+
+        limiter.on_throttle()
+        assert limiter.rate == pytest.approx(0.5)
+
+        for _ in range(20):
+            limiter.on_success()
+        assert limiter.rate == pytest.approx(1.2)
+
+    def test_throttle_never_goes_below_min_rate(self):
+        limiter = AdaptiveRateLimiter(rate=0.2, capacity=1, min_rate=0.1, max_rate=1, clock=FakeClock())
+        for _ in range(5):
+            limiter.on_throttle()
+        assert limiter.rate == pytest.approx(0.1)
+
+    def test_throttle_honours_retry_after(self):
+        clock = FakeClock()
+        limiter = AdaptiveRateLimiter(rate=100, capacity=100, min_rate=1, max_rate=100, clock=clock)
+        limiter.on_throttle(retry_after=5)
+        assert limiter.try_acquire() == pytest.approx(5)
+
+class TestRetryHelpers:
+    def test_parse_retry_after_seconds(self):
+        assert parse_retry_after("3") == 3.0
+
+    def test_parse_retry_after_http_date(self):
+        retry_at = datetime.now(timezone.utc) + timedelta(seconds=30)
+        assert parse_retry_after(format_datetime(retry_at, usegmt=True)) == pytest.approx(30, abs=2)
+
+    def test_parse_retry_after_invalid(self):
+        assert parse_retry_after(None) is None
+        assert parse_retry_after("soon") is None
+
+    def test_decorrelated_jitter_bounds(self):
+        for previous in (None, 0.5, 2.0, 100.0):
+            delay = decorrelated_jitter(previous, base=0.5, cap=8)
+            assert 0.5 <= delay <= 8
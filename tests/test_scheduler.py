@@ -7,40 +7,42 @@ from freezegun import freeze_time
 
 class TestScheduler:
     @pytest.fixture
-    def scheduler(self):
-        with patch('boto3.client') as mock_boto3_client:
-            scheduler = Scheduler()
-            scheduler.lambda_arn = "test_arn"
-            scheduler.events_client = MagicMock()
-            scheduler.lambda_client = MagicMock()
-            return scheduler
+    def scheduler(self, local_state_store):
+        scheduler = Scheduler(state_store=local_state_store, events_client=MagicMock())
+        scheduler.lambda_arn = "test_arn"
+        return scheduler
 
     def test_is_in_cooldown_active(self, scheduler):
-        future_time = datetime.now(pytz.utc) + timedelta(minutes=15)
-        scheduler.lambda_client.get_function_configuration.return_value = {
-            'Environment': {
-                'Variables': {
-                    'COOLDOWN_END_TIME': future_time.isoformat()
-                }
-            }
-        }
+        scheduler.activate_cooldown(cooldown_minutes=15)
         is_in_cooldown, remaining_time = scheduler._is_in_cooldown()
         assert is_in_cooldown is True
         assert remaining_time == pytest.approx(900, abs=1)  # Allowing a 1 second tolerance
 
-    def test_is_in_cooldown_expired(self, scheduler):
+    def test_is_in_cooldown_expired(self, scheduler, local_state_store):
         past_time = datetime.now(pytz.utc) - timedelta(minutes=15)
-        scheduler.lambda_client.get_function_configuration.return_value = {
-            'Environment': {
-                'Variables': {
-                    'COOLDOWN_END_TIME': past_time.isoformat()
-                }
-            }
-        }
+        local_state_store.put("cooldown", {
+            'cooldown_end_time': past_time.isoformat(),
+            'cooldown_end_timestamp': past_time.timestamp()
+        })
         is_in_cooldown, remaining_time = scheduler._is_in_cooldown()
         assert is_in_cooldown is False
         assert remaining_time is None
 
+    def test_is_in_cooldown_not_set(self, scheduler):
+        assert scheduler._is_in_cooldown() == (False, None)
+
+    def test_is_in_cooldown_is_cached(self, scheduler, local_state_store):
+        scheduler.activate_cooldown(cooldown_minutes=15)
+        with patch.object(local_state_store, '_read') as mock_read:
+            for _ in range(10):
+                scheduler.is_bot_paused()
+            mock_read.assert_not_called()
+
+    def test_remove_cooldown(self, scheduler):
+        scheduler.activate_cooldown(cooldown_minutes=15)
+        scheduler.remove_cooldown()
+        assert scheduler.is_bot_paused() is False
+
     def test_convert_datetime_to_cron_expression(self, scheduler):
         dt = datetime(2024, 3, 20, 14, 30, tzinfo=pytz.UTC)
         cron = scheduler._convert_datetime_to_cron_expression(dt)
@@ -84,24 +86,28 @@ class TestScheduler:
     def test_get_time_window(self, scheduler, current_hour, expected_window):
         assert scheduler._get_time_window(current_hour) == expected_window
 
+    @pytest.mark.parametrize("moment,expected_name", [
+        (datetime(2024, 3, 20, 11, 30, tzinfo=pytz.UTC), "morning"),
+        (datetime(2024, 3, 20, 13, 30, tzinfo=pytz.timezone("Etc/GMT-2")), "morning"),  # 11:30 UTC
+        (datetime(2024, 3, 20, 18, 59, tzinfo=pytz.UTC), "afternoon"),
+        (datetime(2024, 3, 20, 21, 0, tzinfo=pytz.UTC), "off_peak"),
+    ])
+    def test_window_name_at(self, moment, expected_name):
+        assert Scheduler.window_name_at(moment) == expected_name
+
     def test_calculate_next_invocation_time_sunday(self, scheduler):
         sunday = datetime(2024, 3, 24, 12, 0, tzinfo=pytz.UTC)  # A Sunday
         with freeze_time(sunday):
             assert scheduler._calculate_next_invocation_time() is None
 
     @patch('app.common.utils.Utils.update_lambda_env_vars')
-    def test_activate_cooldown(self, mock_update_lambda_env_vars, scheduler):
-        current_vars = {'EXISTING_VAR': 'value'}
-        scheduler.lambda_client.get_function_configuration.return_value = {
-            'Environment': {'Variables': current_vars}
-        }
-
+    def test_activate_cooldown(self, mock_update_lambda_env_vars, scheduler, local_state_store):
         scheduler.activate_cooldown(cooldown_minutes=30)
 
-        mock_update_lambda_env_vars.assert_called_once()
-        call_args = mock_update_lambda_env_vars.call_args[0]
-        new_vars = call_args[1]      
-        assert 'COOLDOWN_END_TIME' in new_vars
+        mock_update_lambda_env_vars.assert_not_called()
+        record = local_state_store.get("cooldown", max_age=0)
+        assert 'cooldown_end_time' in record.value
+        assert record.expires_at is not None
 
     def test_schedule_next_invocation_with_cooldown(self, scheduler):
         scheduler._is_in_cooldown = MagicMock(return_value=(True, 1234))
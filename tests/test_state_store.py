@@ -0,0 +1,77 @@
+import time, pytest
+from unittest.mock import MagicMock
+from app.core.state_store import DynamoDBStateStore, LocalFileStateStore
+
+class TestLocalFileStateStore:
+    @pytest.fixture
+    def state_store(self, tmp_path):
+        return LocalFileStateStore(str(tmp_path / "state.json"))
+
+    def test_put_and_get(self, state_store):
+        state_store.put("key", {"value": 1})
+        state_store.invalidate()
+        record = state_store.get("key")
+        assert record.value == {"value": 1}
+
+    def test_get_missing_key(self, state_store):
+        assert state_store.get("missing") is None
+
+    def test_put_if_absent(self, state_store):
+        assert state_store.put_if_absent("key", {"value": 1}) is True
+        assert state_store.put_if_absent("key", {"value": 2}) is False
+        assert state_store.get("key", max_age=0).value == {"value": 1}
+
+    def test_put_if_absent_replaces_expired_record(self, state_store):
+        state_store.put("key", {"value": 1}, ttl_seconds=1)
+        state_store.invalidate()
+        time.sleep(1.1)
+        assert state_store.get("key") is None
+        assert state_store.put_if_absent("key", {"value": 2}) is True
+
+    def test_compare_and_swap(self, state_store):
+        record = state_store.put("key", {"value": 1})
+        assert state_store.compare_and_swap("key", {"value": 2}, expected_version=record.version) is True
+        assert state_store.compare_and_swap("key", {"value": 3}, expected_version=record.version) is False
+        assert state_store.get("key", max_age=0).value == {"value": 2}
+
+    def test_reads_are_cached(self, state_store, tmp_path):
+        state_store.put("key", {"value": 1})
+        other_writer = LocalFileStateStore(str(tmp_path / "state.json"))
+        other_writer.put("key", {"value": 2})
+
+        assert state_store.get("key").value == {"value": 1}
+        assert state_store.get("key", max_age=0).value == {"value": 2}
+
+    def test_delete(self, state_store):
+        state_store.put("key", {"value": 1})
+        state_store.delete("key")
+        assert state_store.get("key", max_age=0) is None
+
+class TestDynamoDBStateStore:
+    @pytest.fixture
+    def database_handler(self):
+        return MagicMock()
+
+    @pytest.fixture
+    def state_store(self, database_handler):
+        return DynamoDBStateStore(database_handler=database_handler)
+
+    def test_get_deserializes_item(self, state_store, database_handler):
+        database_handler.get_item.return_value = {"stateKey": "key", "value": '{"a": 1}', "version": "v1"}
+        record = state_store.get("key")
+        assert record.value == {"a": 1}
+        assert record.version == "v1"
+        database_handler.get_item.assert_called_once_with({"stateKey": "key"})
+
+    def test_get_uses_cache(self, state_store, database_handler):
+        database_handler.get_item.return_value = None
+        state_store.get("key")
+        state_store.get("key")
+        database_handler.get_item.assert_called_once()
+
+    def test_compare_and_swap_uses_condition(self, state_store, database_handler):
+        database_handler.put_item_with_condition.return_value = False
+        assert state_store.compare_and_swap("key", {"a": 2}, expected_version="v1") is False
+        item, condition = database_handler.put_item_with_condition.call_args[0]
+        assert item["stateKey"] == "key"
+        assert condition is not None
@@ -0,0 +1,178 @@
+import pytest, sqlite3
+from decimal import Decimal
+from unittest.mock import MagicMock, patch
+from boto3.dynamodb.conditions import Attr
+from app.common.deadline import Deadline
+from app.core.database_handler import DatabaseHandler
+from app.core.exceptions import DatabaseQueryError, DeadlineExceededError
+from app.core.storage_backend import InMemoryStorageBackend, SQLiteStorageBackend, create_storage_backend, evaluate_condition
+from app.services.tgtg_service.tgtg_service import TgtgService
+
+KEY_NAMES = ("storeId", "lastNotificationDate")
+
+@pytest.fixture(autouse=True)
+def reset_local_backends():
+    InMemoryStorageBackend.clear()
+    yield
+    InMemoryStorageBackend.clear()
+    SQLiteStorageBackend.close_all()
+
+@pytest.fixture(params=["memory", "sqlite"])
+def backend(request, tmp_path):
+    if request.param == "memory":
+        return InMemoryStorageBackend("UserNotifications", KEY_NAMES)
+    return SQLiteStorageBackend("UserNotifications", KEY_NAMES, str(tmp_path / "storage.db"))
+
+def notification(store_id: str, date: str, **attributes):
+    return {"storeId": store_id, "lastNotificationDate": date, **attributes}
+
+class TestLocalStorageBackends:
+    def test_put_and_get_item(self, backend):
+        backend.put_item(notification("1", "2024-03-20", itemsAvailable=3))
+
+        assert backend.get_item({"storeId": "1", "lastNotificationDate": "2024-03-20"})["itemsAvailable"] == 3
+        assert backend.get_item({"storeId": "1", "lastNotificationDate": "2024-03-21"}) is None
+
+    def test_batch_put_and_get_items(self, backend):
+        backend.batch_put_items([notification(str(i), "2024-03-20") for i in range(1000)])
+
+        keys = [{"storeId": str(i), "lastNotificationDate": "2024-03-20"} for i in range(0, 1200, 2)]
+        items = backend.batch_get_items(keys)
+        assert sorted(int(item["storeId"]) for item in items) == list(range(0, 1000, 2))
+
+    def test_put_item_if_absent_once_per_key(self, backend):
+        assert backend.put_item_if_absent(notification("1", "2024-03-20"), key_name="storeId") is True
+        assert backend.put_item_if_absent(notification("1", "2024-03-20"), key_name="storeId") is False
+        assert backend.put_item_if_absent(notification("1", "2024-03-21"), key_name="storeId") is True
+
+    def test_put_item_with_condition_compares_numbers_like_dynamodb(self, backend):
+        backend.put_item(notification("1", "2024-03-20", version=Decimal(2)))
+
+        assert backend.put_item_with_condition(notification("1", "2024-03-20", version=3), Attr("version").eq(1)) is False
+        assert backend.put_item_with_condition(notification("1", "2024-03-20", version=3), Attr("version").eq(2)) is True
+        assert backend.get_item({"storeId": "1", "lastNotificationDate": "2024-03-20"})["version"] == 3
+
+    def test_put_item_with_condition_checks_deadline(self, backend):
+        with pytest.raises(DeadlineExceededError):
+            backend.put_item_if_absent(notification("1", "2024-03-20"), key_name="storeId", deadline=Deadline.after(0))
+        assert backend.get_items("storeId", "1") == []
+
+    def test_sqlite_tables_of_a_file_share_its_connection_and_lock(self, tmp_path):
+        path = str(tmp_path / "storage.db")
+        notifications = SQLiteStorageBackend("UserNotifications", KEY_NAMES, path)
+        snapshots = SQLiteStorageBackend(TgtgService.NOTIFICATIONS_TABLE_NAME, TgtgService.NOTIFICATIONS_KEY_NAMES, path)
+
+        assert notifications._connection is snapshots._connection
+        assert notifications._lock is snapshots._lock
+
+    def test_sqlite_conditional_put_holds_the_database_write_lock(self, tmp_path):
+        path = str(tmp_path / "storage.db")
+        storage = SQLiteStorageBackend("UserNotifications", KEY_NAMES, path)
+        other_process = sqlite3.connect(path, timeout=0, isolation_level=None)
+
+        def evaluate_while_another_process_writes(condition, item):
+            with pytest.raises(sqlite3.OperationalError, match="locked"):
+                other_process.execute("BEGIN IMMEDIATE")
+            return True
+
+        with patch("app.core.storage_backend.evaluate_condition", side_effect=evaluate_while_another_process_writes):
+            assert storage.put_item_if_absent(notification("1", "2024-03-20"), key_name="storeId") is True
+        other_process.execute("BEGIN IMMEDIATE")
+        other_process.execute("ROLLBACK")
+        other_process.close()
+
+    def test_get_items_and_delete_item(self, backend):
+        backend.batch_put_items([notification("1", "2024-03-20"), notification("1", "2024-03-21"), notification("2", "2024-03-21")])
+
+        assert len(backend.get_items("storeId", "1")) == 2
+        assert len(backend.get_items("lastNotificationDate", "2024-03-21")) == 2
+
+        backend.delete_item("storeId", "1")
+        assert backend.get_items("storeId", "1") == []
+        assert len(backend.get_items("storeId", "2")) == 1
+
+    def test_scan_and_batch_delete_items(self, backend):
+        backend.batch_put_items([notification(str(i), "2024-03-20") for i in range(10)])
+
+        assert len(list(backend.scan_items())) == 10
+        backend.batch_delete_items([{"storeId": str(i), "lastNotificationDate": "2024-03-20"} for i in range(5)])
+        assert sorted(item["storeId"] for item in backend.scan_items()) == [str(i) for i in range(5, 10)]
+
+    def test_missing_key_attribute_raises(self, backend):
+        with pytest.raises(DatabaseQueryError):
+            backend.put_item({"storeId": "1"})
+
+    def test_sqlite_backend_persists_across_instances(self, tmp_path):
+        path = str(tmp_path / "storage.db")
+        SQLiteStorageBackend("UserNotifications", KEY_NAMES, path).put_item(notification("1", "2024-03-20", price=Decimal("5.99")))
+        SQLiteStorageBackend.close_all()
+
+        item = SQLiteStorageBackend("UserNotifications", KEY_NAMES, path).get_item({"storeId": "1", "lastNotificationDate": "2024-03-20"})
+        assert item["price"] == Decimal("5.99")
+
+class TestEvaluateCondition:
+    def test_logical_operators(self):
+        item = {"status": "PENDING", "attempts": Decimal(2)}
+        condition = (Attr("status").eq("PENDING") & Attr("attempts").lt(3)) | Attr("missing").exists()
+
+        assert evaluate_condition(condition, item) is True
+        assert evaluate_condition(~condition, item) is False
+        assert evaluate_condition(Attr("attempts").between(3, 5), item) is False
+        assert evaluate_condition(Attr("status").is_in(["PENDING", "FAILED"]), item) is True
+        assert evaluate_condition(Attr("status").begins_with("PEN"), item) is True
+
+    def test_comparisons_on_missing_attribute_fail(self):
+        assert evaluate_condition(Attr("attempts").lt(3), {}) is False
+
+class TestCreateStorageBackend:
+    def test_defaults_to_dynamodb(self):
+        assert isinstance(create_storage_backend("UserNotifications", KEY_NAMES), DatabaseHandler)
+
+    def test_selects_local_backends(self, monkeypatch, tmp_path):
+        monkeypatch.setenv("STORAGE_BACKEND", "memory")
+        assert isinstance(create_storage_backend("UserNotifications", KEY_NAMES), InMemoryStorageBackend)
+
+        monkeypatch.setenv("STORAGE_BACKEND", "sqlite")
+        monkeypatch.setenv("STORAGE_SQLITE_PATH", str(tmp_path / "storage.db"))
+        assert isinstance(create_storage_backend("UserNotifications", KEY_NAMES), SQLiteStorageBackend)
+
+    def test_unknown_backend(self, monkeypatch):
+        monkeypatch.setenv("STORAGE_BACKEND", "redis")
+        with pytest.raises(ValueError):
+            create_storage_backend("UserNotifications", KEY_NAMES)
+
+class TestTgtgServiceWithLocalStorage:
+    @pytest.mark.parametrize("backend_class", [InMemoryStorageBackend, SQLiteStorageBackend])
+    def test_notifies_each_store_once_per_day(self, backend_class, tmp_path, mock_favorite):
+        if backend_class is SQLiteStorageBackend:
+            storage = SQLiteStorageBackend(TgtgService.NOTIFICATIONS_TABLE_NAME, TgtgService.NOTIFICATIONS_KEY_NAMES, str(tmp_path / "storage.db"))
+        else:
+            storage = InMemoryStorageBackend(TgtgService.NOTIFICATIONS_TABLE_NAME, TgtgService.NOTIFICATIONS_KEY_NAMES)
+        tgtg_service = TgtgService(storage=storage)
+
+        with patch("app.services.tgtg_service.tgtg_service.NotificationFormatter.format_message", return_value="message"):
+            assert tgtg_service.get_notification_messages([mock_favorite]) == ["message"]
+            assert tgtg_service.get_notification_messages([mock_favorite]) == []
+        assert len(list(storage.scan_items())) == 1
+
+class TestDatabaseHandlerBatches:
+    def test_batch_get_items_chunks_and_retries_unprocessed_keys(self, mock_boto3_resource):
+        keys = [{"storeId": str(i), "lastNotificationDate": "2024-03-20"} for i in range(150)]
+        mock_boto3_resource.batch_get_item.side_effect = [
+            {"Responses": {"UserNotifications": keys[:90]}, "UnprocessedKeys": {"UserNotifications": {"Keys": keys[90:100]}}},
+            {"Responses": {"UserNotifications": keys[90:100]}},
+            {"Responses": {"UserNotifications": keys[100:]}},
+        ]
+        db_handler = DatabaseHandler(table_name="UserNotifications", dynamodb=mock_boto3_resource)
+
+        assert db_handler.batch_get_items(keys) == keys
+        assert mock_boto3_resource.batch_get_item.call_count == 3
+        assert len(mock_boto3_resource.batch_get_item.call_args_list[0].kwargs["RequestItems"]["UserNotifications"]["Keys"]) == 100
+
+    def test_batch_put_items_uses_batch_writer(self, mock_boto3_resource, mock_dynamodb_table):
+        writer = MagicMock()
+        mock_dynamodb_table.batch_writer.return_value.__enter__.return_value = writer
+        db_handler = DatabaseHandler(table_name="UserNotifications", dynamodb=mock_boto3_resource)
+
+        db_handler.batch_put_items([notification("1", "2024-03-20"), notification("2", "2024-03-20")])
+        assert writer.put_item.call_count == 2
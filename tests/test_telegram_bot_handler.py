@@ -0,0 +1,98 @@
+import json, pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+from telegram.error import NetworkError
+from app.core.telegram_bot_handler import TelegramBotHandler, BOT_COMMANDS_STATE_KEY
+
+class TestTelegramBotHandler:
+    @pytest.fixture
+    def bot_handler(self, mock_scheduler, local_state_store):
+        with patch.dict("os.environ", {"TELEGRAM_BOT_TOKEN": "123:secret"}):
+            handler = TelegramBotHandler(mock_scheduler, state_store=local_state_store)
+        handler.application = MagicMock()
+        handler.application.initialize = AsyncMock()
+        handler.application.process_update = AsyncMock()
+        handler.application.bot.set_my_commands = AsyncMock()
+        return handler
+
+    @staticmethod
+    def _event(update_id: int):
+        return {"body": json.dumps({"update_id": update_id})}
+
+    @pytest.mark.asyncio
+    async def test_application_is_initialized_once_across_updates(self, bot_handler):
+        await bot_handler.start(self._event(1))
+        await bot_handler.start(self._event(2))
+
+        bot_handler.application.initialize.assert_awaited_once()
+        bot_handler.application.bot.set_my_commands.assert_awaited_once()
+        assert bot_handler.application.process_update.await_count == 2
+        bot_handler.application.shutdown.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_commands_are_not_republished_by_a_new_container(self, bot_handler, mock_scheduler, local_state_store):
+        await bot_handler.start(self._event(1))
+
+        with patch.dict("os.environ", {"TELEGRAM_BOT_TOKEN": "123:secret"}):
+            cold_handler = TelegramBotHandler(mock_scheduler, state_store=local_state_store)
+        cold_handler.application = MagicMock()
+        cold_handler.application.initialize = AsyncMock()
+        cold_handler.application.process_update = AsyncMock()
+        cold_handler.application.bot.set_my_commands = AsyncMock()
+        await cold_handler.start(self._event(2))
+
+        cold_handler.application.bot.set_my_commands.assert_not_awaited()
+
+    @pytest.mark.asyncio
+    async def test_commands_are_republished_when_language_changes(self, bot_handler, local_state_store):
+        await bot_handler.start(self._event(1))
+        first_hash = local_state_store.get(BOT_COMMANDS_STATE_KEY).value["hash"]
+
+        bot_handler.user_language = "fr"
+        await bot_handler.start(self._event(2))
+
+        assert bot_handler.application.bot.set_my_commands.await_count == 2
+        assert local_state_store.get(BOT_COMMANDS_STATE_KEY).value["hash"] != first_hash
+
+    @pytest.mark.asyncio
+    async def test_update_is_processed_when_publishing_commands_fails(self, bot_handler, local_state_store):
+        bot_handler.application.bot.set_my_commands.side_effect = [NetworkError("Telegram unavailable"), None]
+
+        await bot_handler.start(self._event(1))
+        assert bot_handler.application.process_update.await_count == 1
+        assert local_state_store.get(BOT_COMMANDS_STATE_KEY) is None
+
+        await bot_handler.start(self._event(2))
+        assert bot_handler.application.bot.set_my_commands.await_count == 2
+        assert local_state_store.get(BOT_COMMANDS_STATE_KEY) is not None
+
+    @pytest.mark.asyncio
+    async def test_duplicate_update_is_skipped(self, bot_handler):
+        await bot_handler.start(self._event(1))
+        await bot_handler.start(self._event(1))
+
+        assert bot_handler.application.process_update.await_count == 1
+
+    @pytest.mark.asyncio
+    async def test_transient_failure_is_released_for_redelivery(self, bot_handler):
+        bot_handler.application.process_update.side_effect = [NetworkError("Telegram unavailable"), None]
+
+        with pytest.raises(NetworkError, match="Telegram unavailable"):
+            await bot_handler.start(self._event(1))
+        await bot_handler.start(self._event(1))
+
+        assert bot_handler.application.process_update.await_count == 2
+
+    @pytest.mark.asyncio
+    async def test_deterministic_failure_keeps_the_claim(self, bot_handler):
+        bot_handler.application.process_update.side_effect = [KeyError("message"), None]
+
+        await bot_handler.start(self._event(1))
+        await bot_handler.start(self._event(1))
+
+        assert bot_handler.application.process_update.await_count == 1
+
+    def test_deduplication_is_in_process_unless_shared_is_enabled(self, mock_scheduler, local_state_store):
+        with patch.dict("os.environ", {"TELEGRAM_BOT_TOKEN": "123:secret"}):
+            assert TelegramBotHandler(mock_scheduler, state_store=local_state_store).update_deduplicator.state_store is None
+        with patch.dict("os.environ", {"TELEGRAM_BOT_TOKEN": "123:secret", "TELEGRAM_SHARED_DEDUP": "true"}):
+            assert TelegramBotHandler(mock_scheduler, state_store=local_state_store).update_deduplicator.state_store is local_state_store
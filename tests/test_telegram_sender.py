@@ -0,0 +1,66 @@
+import json, threading, pytest
+from unittest.mock import MagicMock
+from app.common import telegram_sender as telegram_sender_module
+from app.common.telegram_sender import TelegramSender, CHAT_RATE, GROUP_CHAT_RATE
+
+class TestTelegramSender:
+    @pytest.fixture
+    def sender(self):
+        sender = TelegramSender("123:secret")
+        sender.session = MagicMock()
+        return sender
+
+    @staticmethod
+    def _response(status_code=200, body=None):
+        response = MagicMock()
+        response.status_code = status_code
+        response.headers = {}
+        response.content = json.dumps(body or {"ok": True}).encode()
+        return response
+
+    def test_send_posts_json_body(self, sender):
+        sender.session.post.return_value = self._response()
+
+        assert sender.send("42", "Hello *world*") is True
+
+        args, kwargs = sender.session.post.call_args
+        assert args[0].endswith("/bot123:secret/sendMessage")
+        assert kwargs["json"] == {"chat_id": "42", "text": "Hello *world*", "parse_mode": "Markdown", "disable_web_page_preview": True}
+
+    def test_send_retries_after_telegram_retry_after(self, sender, monkeypatch):
+        sleeps = []
+        monkeypatch.setattr(telegram_sender_module.time, "sleep", sleeps.append)
+        sender._chat_limiter("42").block_for = MagicMock()
+        sender.session.post.side_effect = [
+            self._response(429, {"ok": False, "error_code": 429, "parameters": {"retry_after": 3}}),
+            self._response(),
+        ]
+
+        assert sender.send("42", "Hello") is True
+        assert sleeps == [3.0]
+        sender._chat_limiter("42").block_for.assert_called_once_with(3.0)
+
+    def test_send_returns_false_on_http_error(self, sender):
+        response = self._response(400)
+        response.raise_for_status.side_effect = telegram_sender_module.requests.HTTPError("Bad Request")
+        sender.session.post.return_value = response
+
+        assert sender.send("42", "Hello") is False
+
+    def test_send_many_sends_concurrently_and_keeps_order(self, sender):
+        barrier = threading.Barrier(3, timeout=2)
+
+        def post(url, json, timeout):
+            barrier.wait()
+            return self._response()
+
+        sender.session.post.side_effect = post
+
+        assert sender.send_many("42", ["a", "b", "c"]) == [True, True, True]
+
+    def test_group_chats_get_lower_quota(self, sender):
+        assert sender._chat_limiter("-100123").rate == GROUP_CHAT_RATE
+        assert sender._chat_limiter("42").rate == CHAT_RATE
+
+    def test_for_bot_reuses_sender(self):
+        assert TelegramSender.for_bot("123:secret") is TelegramSender.for_bot("123:secret")
@@ -0,0 +1,165 @@
+import datetime, json, threading, time, pytest
+from unittest.mock import MagicMock
+from app.common.deadline import Deadline
+from app.common.metrics import METRICS
+from app.common.rate_limiter import AdaptiveRateLimiter
+from app.core.exceptions import DeadlineExceededError
+from app.services.tgtg_service import tgtg_client as tgtg_client_module
+from app.services.tgtg_service.tgtg_client import TgtgClient
+from app.services.tgtg_service.exceptions import TgtgAPIError
+
+class TestTgtgClient:
+    @pytest.fixture
+    def tgtg_client(self):
+        client = TgtgClient(
+            access_token="access_token",
+            refresh_token="refresh_token",
+            cookie="cookie",
+            last_time_token_refreshed=datetime.datetime.now(datetime.timezone.utc),
+        )
+        client.session = MagicMock()
+        return client
+
+    @pytest.fixture
+    def fast_retries(self, monkeypatch, tgtg_client):
+        monkeypatch.setattr(tgtg_client_module, "RETRY_BASE_DELAY", 0.001)
+        monkeypatch.setattr(tgtg_client_module, "RETRY_MAX_DELAY", 0.001)
+        tgtg_client.rate_limiter = AdaptiveRateLimiter(rate=1000, capacity=1000, min_rate=100, max_rate=1000)
+        return tgtg_client.rate_limiter
+
+    @staticmethod
+    def _favorites_response(items, status_code=200, headers=None):
+        response = MagicMock()
+        response.status_code = status_code
+        response.headers = headers or {}
+        response.content = json.dumps({"mobile_bucket": {"items": items}}).encode()
+        return response
+
+    def _requested_pages(self, tgtg_client):
+        return [call.kwargs["json"]["paging"]["page"] for call in tgtg_client.session.post.call_args_list]
+
+    def test_iter_favorites_stops_at_first_short_page(self, tgtg_client):
+        tgtg_client.session.post.side_effect = [
+            self._favorites_response([{"id": 1}, {"id": 2}]),
+            self._favorites_response([{"id": 3}, {"id": 4}]),
+            self._favorites_response([{"id": 5}]),
+        ]
+
+        pages = list(tgtg_client.iter_favorites(page_size=2))
+
+        assert pages == [[{"id": 1}, {"id": 2}], [{"id": 3}, {"id": 4}], [{"id": 5}]]
+        assert self._requested_pages(tgtg_client) == [0, 1, 2]
+
+    def test_iter_favorites_prefetches_next_page(self, tgtg_client):
+        tgtg_client.session.post.side_effect = [
+            self._favorites_response([{"id": 1}, {"id": 2}]),
+            self._favorites_response([]),
+        ]
+
+        pages = tgtg_client.iter_favorites(page_size=2)
+        first_page = next(pages)
+        # Page 1 is requested before the consumer asks for it
+        for _ in range(100):
+            if tgtg_client.session.post.call_count == 2:
+                break
+            time.sleep(0.01)
+
+        assert first_page == [{"id": 1}, {"id": 2}]
+        assert tgtg_client.session.post.call_count == 2
+        assert list(pages) == [[]]
+
+    def test_iter_favorites_does_not_wait_for_prefetch_when_closed_early(self, tgtg_client):
+        released = threading.Event()
+        def post(*args, **kwargs):
+            if tgtg_client.session.post.call_count > 1:
+                released.wait(5)
+            return self._favorites_response([{"id": 1}, {"id": 2}])
+        tgtg_client.session.post.side_effect = post
+
+        pages = tgtg_client.iter_favorites(page_size=2)
+        next(pages)
+        start = time.monotonic()
+        pages.close()
+        released.set()
+
+        assert time.monotonic() - start < 1
+
+    def test_iter_favorites_does_not_prefetch_close_to_the_deadline(self, tgtg_client):
+        tgtg_client.session.post.side_effect = [self._favorites_response([{"id": 1}, {"id": 2}]), self._favorites_response([])]
+        tgtg_client.deadline = Deadline.after(1)
+
+        pages = tgtg_client.iter_favorites(page_size=2)
+        next(pages)
+        time.sleep(0.05)
+
+        assert tgtg_client.session.post.call_count == 1
+        assert list(pages) == [[]]
+
+    def test_iter_favorites_respects_max_pages(self, tgtg_client):
+        tgtg_client.session.post.side_effect = [self._favorites_response([{"id": i}]) for i in range(5)]
+
+        pages = list(tgtg_client.iter_favorites(page_size=1, max_pages=3))
+
+        assert len(pages) == 3
+        assert self._requested_pages(tgtg_client) == [0, 1, 2]
+        assert json.loads(METRICS.flush()[0])["FavoritesTruncated"] == 1
+
+    def test_iter_favorites_short_last_page_is_not_truncated(self, tgtg_client):
+        tgtg_client.session.post.side_effect = [self._favorites_response([{"id": 0}, {"id": 1}]), self._favorites_response([{"id": 2}])]
+
+        assert len(list(tgtg_client.iter_favorites(page_size=2, max_pages=2))) == 2
+        assert all("FavoritesTruncated" not in json.loads(document) for document in METRICS.flush())
+
+    def test_iter_favorites_error(self, tgtg_client):
+        tgtg_client.session.post.return_value = self._favorites_response([], status_code=500)
+
+        with pytest.raises(TgtgAPIError):
+            list(tgtg_client.iter_favorites())
+
+    def test_post_retries_on_429(self, tgtg_client, fast_retries):
+        tgtg_client.session.post.side_effect = [
+            self._favorites_response([], status_code=429, headers={"Retry-After": "0"}),
+            self._favorites_response([{"id": 1}]),
+        ]
+
+        assert tgtg_client.get_favorites() == [{"id": 1}]
+        assert tgtg_client.session.post.call_count == 2
+        assert fast_retries.rate < 1000
+
+    def test_post_gives_up_after_max_retries(self, tgtg_client, fast_retries):
+        tgtg_client.session.post.return_value = self._favorites_response([], status_code=429)
+
+        with pytest.raises(TgtgAPIError):
+            tgtg_client.get_favorites()
+        assert tgtg_client.session.post.call_count == tgtg_client_module.MAX_RETRIES + 1
+
+    def test_post_does_not_retry_retry_after_beyond_budget(self, tgtg_client, fast_retries):
+        tgtg_client.session.post.return_value = self._favorites_response([], status_code=429, headers={"Retry-After": "120"})
+
+        with pytest.raises(TgtgAPIError):
+            tgtg_client.get_favorites()
+        tgtg_client.session.post.assert_called_once()
+
+    def test_post_forbidden_slows_down_without_retry(self, tgtg_client, fast_retries):
+        tgtg_client.session.post.return_value = self._favorites_response([], status_code=403)
+
+        with pytest.raises(TgtgAPIError):
+            tgtg_client.get_favorites()
+        tgtg_client.session.post.assert_called_once()
+        assert fast_retries.rate == 500
+
+    def test_request_timeout_follows_deadline(self, tgtg_client):
+        tgtg_client.timeout = 10
+        tgtg_client.deadline = Deadline.after(2)
+        tgtg_client.session.post.return_value = self._favorites_response([])
+
+        tgtg_client.get_favorites()
+
+        assert tgtg_client.session.post.call_args.kwargs["timeout"] <= 2
+
+    def test_expired_deadline_stops_requests(self, tgtg_client):
+        tgtg_client.deadline = Deadline.after(-1)
+
+        with pytest.raises(DeadlineExceededError):
+            tgtg_client.get_favorites()
+        tgtg_client.session.post.assert_not_called()
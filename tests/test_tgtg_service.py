@@ -1,9 +1,14 @@
 import pytest, pytz
+from dataclasses import replace
 from unittest.mock import patch, MagicMock
 from app.services.tgtg_service.tgtg_service import TgtgService
 from app.services.tgtg_service.exceptions import TgtgAPIParsingError, ForbiddenError
-from app.services.tgtg_service.models import ItemDetails
+from app.services.tgtg_service.favorite_record import FavoriteRecord, Price
+from app.core.exceptions import DatabaseQueryError, DeadlineExceededError
+from app.core.storage_backend import InMemoryStorageBackend
+from app.services.tgtg_service.change_detector import ChangeDetector
 from datetime import datetime
+from freezegun import freeze_time
 
 class TestTgtgService:
     @pytest.fixture
@@ -13,7 +18,7 @@ class TestTgtgService:
     def test_init(self, tgtg_service):
         assert tgtg_service.credentials is None
 
-    @patch('app.services.tgtg_service.tgtg_service.TgtgClient')
+    @patch('app.services.tgtg_service.client_registry.TgtgClient')
     def test_get_favorites_items_success(self, mock_tgtg_client, mock_item_details, tgtg_service):
         mock_instance = MagicMock()
         mock_instance.get_credentials.return_value = {
@@ -21,7 +26,7 @@ class TestTgtgService:
             "refresh_token": "refresh_token", 
             "cookie": "cookie"
         }
-        mock_instance.get_favorites.return_value = [mock_item_details.dict()]
+        mock_instance.iter_favorites.return_value = iter([[mock_item_details.dict()]])
         mock_tgtg_client.return_value = mock_instance
 
         items = tgtg_service.get_favorites_items_list(
@@ -32,14 +37,82 @@ class TestTgtgService:
             last_time_token_refreshed_str=None
         )
 
-        assert len(items) == 1
-        assert isinstance(items[0], ItemDetails)
+        assert items == [FavoriteRecord.from_item_details(mock_item_details)]
         assert items[0].items_available == 2
 
-    @patch('app.services.tgtg_service.tgtg_service.TgtgClient')
+    @patch('app.services.tgtg_service.client_registry.TgtgClient')
+    def test_get_favorites_items_strict_validation(self, mock_tgtg_client, mock_item_details):
+        mock_instance = MagicMock()
+        raw_item = mock_item_details.model_dump()
+        raw_item["store"]["logo_picture"] = None
+        mock_instance.iter_favorites.return_value = iter([[raw_item]])
+        mock_tgtg_client.return_value = mock_instance
+
+        with pytest.raises(TgtgAPIParsingError):
+            TgtgService(strict_validation=True).get_favorites_items_list(
+                email="test@example.com",
+                access_token="access_token",
+                refresh_token="refresh_token",
+                cookie="cookie",
+                last_time_token_refreshed_str=None
+            )
+
+        mock_instance.iter_favorites.return_value = iter([[raw_item]])
+        items = TgtgService(strict_validation=False).get_favorites_items_list(
+            email="test@example.com",
+            access_token="access_token",
+            refresh_token="refresh_token",
+            cookie="cookie",
+            last_time_token_refreshed_str=None
+        )
+        assert items == [FavoriteRecord.from_item_details(mock_item_details)]
+
+    def test_strict_validation_from_environment(self, monkeypatch):
+        monkeypatch.setenv("TGTG_STRICT_VALIDATION", "true")
+        assert TgtgService().strict_validation is True
+
+    @patch('app.services.tgtg_service.client_registry.TgtgClient')
+    def test_get_favorites_items_multiple_pages(self, mock_tgtg_client, mock_item_details, tgtg_service):
+        mock_instance = MagicMock()
+        first_page = [mock_item_details.dict()] * 2
+        mock_instance.iter_favorites.return_value = iter([first_page, [mock_item_details.dict()]])
+        mock_tgtg_client.return_value = mock_instance
+
+        items = tgtg_service.get_favorites_items_list(
+            email="test@example.com",
+            access_token="access_token",
+            refresh_token="refresh_token",
+            cookie="cookie",
+            last_time_token_refreshed_str=None
+        )
+
+        assert len(items) == 3
+        mock_instance.get_favorites.assert_not_called()
+
+    @patch('app.services.tgtg_service.client_registry.TgtgClient')
+    def test_get_favorites_items_returns_pages_fetched_before_deadline(self, mock_tgtg_client, mock_item_details, tgtg_service):
+        def pages():
+            yield [mock_item_details.dict()] * 2
+            raise DeadlineExceededError()
+
+        mock_instance = MagicMock()
+        mock_instance.iter_favorites.return_value = pages()
+        mock_tgtg_client.return_value = mock_instance
+
+        items = tgtg_service.get_favorites_items_list(
+            email="test@example.com",
+            access_token="access_token",
+            refresh_token="refresh_token",
+            cookie="cookie",
+            last_time_token_refreshed_str=None
+        )
+
+        assert len(items) == 2
+
+    @patch('app.services.tgtg_service.client_registry.TgtgClient')
     def test_get_favorites_items_validation_error(self, mock_tgtg_client, tgtg_service):
         mock_instance = MagicMock()
-        mock_instance.get_favorites.return_value = [{"invalid_key": "value"}]
+        mock_instance.iter_favorites.return_value = iter([[{"invalid_key": "value"}]])
         mock_tgtg_client.return_value = mock_instance
 
         with pytest.raises(TgtgAPIParsingError):
@@ -51,10 +124,10 @@ class TestTgtgService:
                 last_time_token_refreshed_str=None
             )
 
-    @patch('app.services.tgtg_service.tgtg_service.TgtgClient')
+    @patch('app.services.tgtg_service.client_registry.TgtgClient')
     def test_get_favorites_items_forbidden_error(self, mock_tgtg_client, tgtg_service):
         mock_instance = MagicMock()
-        mock_instance.get_favorites.side_effect = Exception("captcha required")
+        mock_instance.iter_favorites.side_effect = Exception("captcha required")
         mock_tgtg_client.return_value = mock_instance
 
         with pytest.raises(ForbiddenError):
@@ -66,21 +139,84 @@ class TestTgtgService:
                 last_time_token_refreshed_str=None
             )
 
-    def test_get_notification_messages(self, tgtg_service, mock_item_details):
-        mock_db_instance = MagicMock()
-        tgtg_service.database_handler = mock_db_instance
-        mock_db_instance.get_items.return_value = []
+    @pytest.fixture
+    def storage(self):
+        InMemoryStorageBackend.clear()
+        yield InMemoryStorageBackend(TgtgService.NOTIFICATIONS_TABLE_NAME, TgtgService.NOTIFICATIONS_KEY_NAMES)
+        InMemoryStorageBackend.clear()
 
-        messages = tgtg_service.get_notification_messages([mock_item_details])
+    def test_get_notification_messages(self, storage, mock_favorite):
+        messages = TgtgService(storage=storage).get_notification_messages([mock_favorite])
 
         assert len(messages) == 1
         assert "Test Store" in messages[0]
+        assert storage.get_item({"storeId": "123"})["itemsAvailable"] == 2
+
+    def test_get_notifications_carry_time_to_notify_fields(self, storage, mock_favorite):
+        tgtg_service = TgtgService(storage=storage)
+        with freeze_time("2024-03-20 10:53:20"):
+            tgtg_service.get_notifications([replace(mock_favorite, items_available=0)])
+        with freeze_time("2024-03-20 11:00:00"):
+            notifications = tgtg_service.get_notifications([mock_favorite])
+
+        assert len(notifications) == 1
+        assert notifications[0].store_id == "123"
+        assert notifications[0].observed_at == 1710932400
+        assert notifications[0].appeared_after == 1710932000
+
+    def test_get_notification_messages_unchanged_store(self, storage, mock_favorite):
+        TgtgService(storage=storage).get_notification_messages([mock_favorite])
 
-    def test_is_notification_sent_today(self, tgtg_service):
-        today_date = datetime.now(pytz.UTC).date()
-        notifications = [{"lastNotificationDate": today_date.isoformat()}]
+        assert TgtgService(storage=storage).get_notification_messages([mock_favorite]) == []
 
-        assert tgtg_service._is_notification_sent_today(notifications) is True
+    def test_get_notification_messages_reports_restock_after_sell_out(self, storage, mock_favorite):
+        tgtg_service = TgtgService(storage=storage)
+        sold_out = replace(mock_favorite, items_available=0)
 
-        notifications = [{"lastNotificationDate": "2023-01-01T00:00:00Z"}]
-        assert tgtg_service._is_notification_sent_today(notifications) is False
\ No newline at end of file
+        assert len(tgtg_service.get_notification_messages([mock_favorite])) == 1
+        assert tgtg_service.get_notification_messages([sold_out]) == []
+        assert len(tgtg_service.get_notification_messages([mock_favorite])) == 1
+
+    def test_get_notification_messages_counts_every_bag_of_a_store(self, storage, mock_favorite):
+        tgtg_service = TgtgService(storage=storage)
+        sold_out_bag = replace(mock_favorite, item_id="A", items_available=0)
+        other_bag = replace(mock_favorite, item_id="B", items_available=4)
+
+        messages = tgtg_service.get_notification_messages([sold_out_bag, other_bag])
+
+        assert len(messages) == 1
+        assert storage.get_item({"storeId": "123"})["itemsAvailable"] == 4
+        assert tgtg_service.get_notification_messages([sold_out_bag, replace(other_bag, items_available=0)]) == []
+        assert len(tgtg_service.get_notification_messages([replace(sold_out_bag, items_available=1), replace(other_bag, items_available=0)])) == 1
+
+    def test_get_notification_messages_one_message_per_store(self, storage, mock_favorite):
+        tgtg_service = TgtgService(storage=storage)
+        tgtg_service.get_notification_messages([mock_favorite])
+        changed = replace(mock_favorite, pickup_start="2024-03-21T14:00:00Z", pickup_end="2024-03-21T18:00:00Z", price=Price(499, 2, "EUR"))
+
+        messages = tgtg_service.get_notification_messages([changed])
+
+        assert len(messages) == 1
+        assert "Nouveau créneau" in messages[0]
+        assert "Nouveau prix : 4.99€ (avant 5.99€)" in messages[0]
+
+    def test_get_notification_messages_database_error(self, tgtg_service, mock_favorite):
+        mock_db_instance = MagicMock()
+        mock_db_instance.batch_get_items.side_effect = DatabaseQueryError("Read failed")
+        tgtg_service.change_detector = ChangeDetector(mock_db_instance)
+
+        assert tgtg_service.get_notification_messages([mock_favorite]) == []
+        mock_db_instance.put_item_with_condition.assert_not_called()
+
+    def test_get_notification_messages_stops_at_deadline(self, tgtg_service, mock_favorite):
+        mock_db_instance = MagicMock()
+        mock_db_instance.batch_get_items.return_value = []
+        mock_db_instance.put_item_with_condition.side_effect = [True, DeadlineExceededError()]
+        tgtg_service.change_detector = ChangeDetector(mock_db_instance)
+        other_store = replace(mock_favorite, store_id="456")
+        third_store = replace(mock_favorite, store_id="789")
+
+        messages = tgtg_service.get_notification_messages([mock_favorite, other_store, third_store])
+
+        assert len(messages) == 1
+        assert mock_db_instance.put_item_with_condition.call_count == 2
@@ -0,0 +1,37 @@
+import json
+from app.common.metrics import METRICS
+from app.core.outbox import OutboxMessage
+from app.services.tgtg_service.time_to_notify import estimated_change_time, record_time_to_notify
+
+OBSERVED_AT = 1710932400  # 2024-03-20 11:00 UTC, in the morning window
+
+def outbox_message(store_id="123", observed_at=OBSERVED_AT, appeared_after=None) -> OutboxMessage:
+    return OutboxMessage("id", "text", None, "2024-03-20T11:00:00+00:00", store_id=store_id, observed_at=observed_at, appeared_after=appeared_after)
+
+def documents_by_store() -> dict:
+    documents = [json.loads(line) for line in METRICS.flush(Handler="Monitoring")]
+    return {document["StoreId"]: document for document in documents if "StoreId" in document}
+
+class TestRecordTimeToNotify:
+    def test_latency_per_window_with_store_as_property(self):
+        latencies = record_time_to_notify(
+            [outbox_message(appeared_after=OBSERVED_AT - 600), outbox_message(store_id="456"), outbox_message(observed_at=None)],
+            delivered_at=OBSERVED_AT + 30
+        )
+
+        assert latencies == [330, 30]
+        documents = documents_by_store()
+        assert documents["123"]["TimeToNotify"] == [330]
+        assert documents["123"]["TimeToNotifyUpperBound"] == [630]
+        assert documents["456"]["TimeToNotify"] == [30]
+        assert "TimeToNotifyUpperBound" not in documents["456"]
+        for document in documents.values():
+            assert document["Window"] == "morning"
+            assert document["_aws"]["CloudWatchMetrics"][0]["Dimensions"] == [["Handler", "Window"]]
+
+    def test_retried_message_counts_from_the_observation(self):
+        assert record_time_to_notify([outbox_message()], delivered_at=OBSERVED_AT + 3600) == [3600]
+
+    def test_change_is_estimated_halfway_between_polls(self):
+        assert estimated_change_time(OBSERVED_AT, OBSERVED_AT - 180) == OBSERVED_AT - 90
+        assert estimated_change_time(OBSERVED_AT) == OBSERVED_AT
@@ -0,0 +1,78 @@
+import datetime, threading, time, pytest
+from app.services.tgtg_service.token_manager import TokenManager
+
+LIFETIME = 3600
+
+class TestTokenManager:
+    @staticmethod
+    def _manager(refreshed_seconds_ago: float) -> TokenManager:
+        return TokenManager(
+            access_token="access",
+            refresh_token="refresh",
+            cookie="cookie",
+            last_time_token_refreshed=datetime.datetime.now(datetime.timezone.utc) - datetime.timedelta(seconds=refreshed_seconds_ago),
+            access_token_lifetime=LIFETIME,
+            refresh_ahead=600
+        )
+
+    def test_naive_refresh_time_is_treated_as_utc(self):
+        manager = TokenManager(
+            access_token="access",
+            last_time_token_refreshed=datetime.datetime(2024, 3, 20, 10, 0),
+            access_token_lifetime=LIFETIME
+        )
+        assert manager.valid_until == datetime.datetime(2024, 3, 20, 11, 0, tzinfo=datetime.timezone.utc)
+
+    def test_unknown_refresh_time_is_invalid(self):
+        manager = TokenManager(access_token="access", access_token_lifetime=LIFETIME)
+        assert manager.is_valid() is False
+        assert manager.valid_until is None
+
+    def test_ensure_valid_skips_refresh_when_valid(self):
+        manager = self._manager(refreshed_seconds_ago=60)
+        calls = []
+        manager.ensure_valid(lambda: calls.append(1))
+        assert calls == []
+
+    def test_ensure_valid_refreshes_expired_token(self):
+        manager = self._manager(refreshed_seconds_ago=LIFETIME + 1)
+        manager.ensure_valid(lambda: manager.update("new_access", "new_refresh"))
+        assert manager.access_token == "new_access"
+        assert manager.is_valid()
+
+    def test_concurrent_refreshes_are_coalesced(self):
+        manager = self._manager(refreshed_seconds_ago=LIFETIME + 1)
+        calls = []
+
+        def refresh():
+            calls.append(1)
+            time.sleep(0.05)
+            manager.update("new_access", "new_refresh")
+
+        threads = [threading.Thread(target=manager.ensure_valid, args=(refresh,)) for _ in range(5)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert len(calls) == 1
+        assert manager.access_token == "new_access"
+
+    def test_refresh_ahead_runs_in_background(self):
+        manager = self._manager(refreshed_seconds_ago=LIFETIME - 300)
+        started = threading.Event()
+
+        def refresh():
+            started.set()
+            manager.update("new_access", "new_refresh")
+
+        future = manager.refresh_ahead_in_background(refresh)
+
+        assert future is not None
+        manager.wait_for_refresh()
+        assert started.is_set()
+        assert manager.access_token == "new_access"
+
+    def test_refresh_ahead_noop_when_far_from_expiry(self):
+        manager = self._manager(refreshed_seconds_ago=60)
+        assert manager.refresh_ahead_in_background(lambda: None) is None
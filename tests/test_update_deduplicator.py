@@ -0,0 +1,39 @@
+from unittest.mock import MagicMock
+from app.core.update_deduplicator import UpdateDeduplicator
+
+class TestUpdateDeduplicator:
+    def test_in_process_duplicates_are_rejected(self):
+        deduplicator = UpdateDeduplicator()
+
+        assert deduplicator.claim(1) is True
+        assert deduplicator.claim(1) is False
+        assert deduplicator.claim(2) is True
+
+    def test_lru_evicts_oldest_update(self):
+        deduplicator = UpdateDeduplicator(capacity=2)
+        for update_id in (1, 2, 3):
+            deduplicator.claim(update_id)
+
+        assert deduplicator.claim(1) is True
+        assert deduplicator.claim(3) is False
+
+    def test_duplicates_from_other_containers_are_rejected(self, local_state_store):
+        first_container = UpdateDeduplicator(local_state_store)
+        second_container = UpdateDeduplicator(local_state_store)
+
+        assert first_container.claim(42) is True
+        assert second_container.claim(42) is False
+
+    def test_state_store_failure_does_not_block_processing(self):
+        state_store = MagicMock()
+        state_store.put_if_absent.side_effect = Exception("DynamoDB unavailable")
+
+        assert UpdateDeduplicator(state_store).claim(7) is True
+
+    def test_released_update_can_be_claimed_again(self, local_state_store):
+        deduplicator = UpdateDeduplicator(local_state_store)
+        deduplicator.claim(42)
+
+        deduplicator.release(42)
+        assert deduplicator.claim(42) is True
+        assert UpdateDeduplicator(local_state_store).claim(42) is False
@@ -50,33 +50,37 @@ class TestUtils:
         value = Utils.get_environment_variable("NON_EXISTENT_VAR")
         assert value is None
 
-    @patch("requests.get")
+    @patch("requests.Session.post")
     def test_send_telegram_message_success(self, mock_requests, mock_env_vars):
         mock_response = MagicMock()
+        mock_response.status_code = 200
         mock_response.raise_for_status.return_value = None
         mock_requests.return_value = mock_response
 
-        Utils.send_telegram_message("Test message")
+        assert Utils.send_telegram_message("Test message") is True
         mock_requests.assert_called_once()
         args, kwargs = mock_requests.call_args
         assert "test_bot_token" in args[0]
-        assert "test_chat_id" in args[0]
+        assert kwargs["json"]["chat_id"] == "test_chat_id"
+        assert kwargs["json"]["text"] == "Test message"
 
-    @patch("requests.get", side_effect=Exception("Network error"))
+    @patch("requests.Session.post", side_effect=Exception("Network error"))
     @patch("app.common.utils.Utils.get_environment_variable", side_effect=["test_bot_token", "test_chat_id"])
-    @patch("app.common.logger.LOGGER.error")
+    @patch("app.common.telegram_sender.LOGGER.error")
     def test_send_telegram_message_failure(self, mock_logger, mock_env_vars, mock_requests):
         Utils.send_telegram_message("Test message")
         mock_requests.assert_called_once()
-        mock_logger.assert_called_once_with("Unexpected error while sending Telegram message: Network error")
+        mock_logger.assert_called_once()
+        message, *args = mock_logger.call_args[0]
+        assert message % tuple(args) == "Unexpected error while sending Telegram message: Network error"
 
-    @patch("requests.get")
+    @patch("requests.Session.post")
     def test_send_telegram_message_missing_bot_token(self, mock_requests):
         with patch.dict(os.environ, {}, clear=True):
             Utils.send_telegram_message("Test message")
             mock_requests.assert_not_called()
 
-    @patch("requests.get")
+    @patch("requests.Session.post")
     def test_send_telegram_message_missing_chat_id(self, mock_requests):
         with patch.dict(os.environ, {"TELEGRAM_BOT_TOKEN": "test_bot_token"}, clear=True):
             Utils.send_telegram_message("Test message")